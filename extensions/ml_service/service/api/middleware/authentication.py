@@ -17,7 +17,10 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 import hashlib
+import hmac
 import time
+from time import perf_counter
+from functools import lru_cache
 from werkzeug.wrappers import Request, Response
 
 
@@ -26,7 +29,15 @@ class AuthenticationMiddleware:
     Middleware to check the request is valid & acceptable
     """
 
-    def __init__(self, app, config):
+    # The key of the WSGI environ where the authentication diagnostics of the request
+    # are kept for the endpoints
+    environ_key = "ml_service.auth_info"
+
+    # The key of the WSGI environ where the time taken by the authentication of the
+    # request is kept
+    seconds_key = "ml_service.auth_seconds"
+
+    def __init__(self, app, config, metrics=None):
         """
         Class constructor method
 
@@ -35,14 +46,21 @@ class AuthenticationMiddleware:
         :param config: An instance of the class that contains base configurations of
             the ML Service
         :type config: An instance of configuration class
+        :param metrics: The metrics of the service, where the rejected requests are
+            counted, defaults to None
+        :type metrics: ServiceMetrics, optional
         """
         self.app = app
         self.config = config
-        self.skip = [
+        self.metrics = metrics
+        skip = [
             "/favicon.ico",
             "/",
+            "/ready",
         ]
-        self.config["auth_info"] = {}
+        if str(config.get("METRICS_PUBLIC", "false")).lower() == "true":
+            skip.append("/metrics")
+        self.skip = frozenset(skip)
 
     def __call__(self, environ, start_response):
         """
@@ -50,7 +68,9 @@ class AuthenticationMiddleware:
         that are made on the endpoints mentioned in skip parameter of the class or
         have valid authentication headers are forwarded to the specific endpoints.
         The requests that don't have valid authentication headers don't pass from this
-        layer and are responded with status code 401 and a message
+        layer and are responded with status code 401 and a message. The headers are
+        read straight from the WSGI environ, and the diagnostics of the check are kept
+        in the environ of the request under `environ_key`
 
         :param environ: The WSGI environ is generated by the WSGI server and contains
             information about the server configuration and client request
@@ -60,62 +80,75 @@ class AuthenticationMiddleware:
         :return: An application iterator
         :rtype: Iterable[bytes]
         """
-        request = Request(environ)
-
-        relative_url = "/" + request.url.replace(request.url_root, "")
-        if relative_url in self.skip:
+        started = perf_counter()
+        if environ.get("PATH_INFO", "/") in self.skip:
             return self.app(environ, start_response)
 
         # Check both the user agent & key is expected.
         # Note, we currently only support the Totara CURL client, if that changes
         # then the user agent check here must also change
-        request_user_agent = request.headers.get("User-Agent", "")
-        request_totara_key = request.headers.get("X-Totara-Ml-Key", "")
-        request_totara_time = request.headers.get("X-Totara-Time", "0")
+        request_user_agent = environ.get("HTTP_USER_AGENT", "")
+        request_totara_key = environ.get("HTTP_X_TOTARA_ML_KEY", "")
+        request_totara_time = environ.get("HTTP_X_TOTARA_TIME", "0")
 
+        auth_info = {}
+        environ[self.environ_key] = auth_info
         valid_user_agent = (
             request_user_agent == "TotaraBot/1.0"
             or self.config.get("APP_MODE", "") == "Development"
         )
         valid_timestamp = request_totara_time and self.validate_timestamp(
-            request_totara_time
+            request_totara_time, auth_info
         )
-        valid_key = request_totara_key and self.validate_key(
-            request_totara_key, request_totara_time
+        valid_key = (
+            valid_timestamp
+            and request_totara_key
+            and self.validate_key(request_totara_key, request_totara_time)
         )
 
         if valid_user_agent and valid_key and valid_timestamp:
+            environ[self.seconds_key] = perf_counter() - started
             return self.app(environ, start_response)
 
+        if self.metrics is not None:
+            self.metrics.inc(name="ml_service_rejected_requests_total")
+
         message = "Invalid access\n"
         if not valid_timestamp:
             message += "The clocks were not in sync\n"
 
-        message += "\n" + str(request.headers)
+        message += "\n" + str(Request(environ).headers)
 
-        for key, value in self.config["auth_info"].items():
+        for key, value in auth_info.items():
             message += f"\n{key}: {value}"
 
         res_builder = Response(bytes(message.encode("utf-8")), status=401)
         return res_builder(environ, start_response)
 
-    def validate_timestamp(self, request_timestamp) -> bool:
+    @staticmethod
+    def validate_timestamp(request_timestamp, auth_info) -> bool:
         """
         Validate the timestamp provided is recent to a given acceptable variance
 
         :param request_timestamp: The timestamp received in the headers of the request
         :type request_timestamp: str
+        :param auth_info: The diagnostics of the request, where the time of the service
+            and the variance of the timestamp are added
+        :type auth_info: dict
         :return: Whether the timestamp is valid or not
         :rtype: bool
         """
         current_timestamp = int(time.time())
-        self.info("service_time", current_timestamp)
-        rq_time = int(request_timestamp)
+        auth_info["service_time"] = current_timestamp
+        try:
+            rq_time = int(request_timestamp)
+        except ValueError:
+            return False
 
-        diff = max(current_timestamp, rq_time) - min(current_timestamp, rq_time)
-        self.info("variance", diff)
+        diff = abs(current_timestamp - rq_time)
+        auth_info["variance"] = diff
 
-        return 30 > diff > -30
+        return 30 > diff
 
     def validate_key(self, request_key, request_timestamp) -> bool:
         """
@@ -129,20 +162,27 @@ class AuthenticationMiddleware:
         :rtype: bool
         """
         totara_key = self.config.get("TOTARA_KEY") or ""
-        expected = hashlib.sha256(
-            str(request_timestamp + totara_key).encode("utf8")
-        ).hexdigest()
+        if not totara_key:
+            return False
 
-        return totara_key and expected == request_key
+        expected = self.expected_key(request_timestamp, totara_key)
+        return hmac.compare_digest(expected.encode("utf8"), request_key.encode("utf8"))
 
-    def info(self, key, value) -> None:
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def expected_key(request_timestamp, totara_key) -> str:
         """
-        This adds key-value pair in config['auth_info'] parameter (dictionary) of the
-        class
+        To compute the hashed key expected with a timestamp. Only the timestamps that
+        are within the acceptable variance reach here, so the few recent ones are kept
+        in a small bounded cache shared by the requests made in the same second
 
-        :param key: Key at which the value needs to be added
-        :type key: str
-        :type value: Value that needs to be added on the specified key
-        :type value: any obj
+        :param request_timestamp: The timestamp received in headers of the request
+        :type request_timestamp: str
+        :param totara_key: The secret key shared with Totara
+        :type totara_key: str
+        :return: The expected hashed key as a hexadecimal string
+        :rtype: str
         """
-        self.config["auth_info"][key] = value
+        return hashlib.sha256(
+            str(request_timestamp + totara_key).encode("utf8")
+        ).hexdigest()
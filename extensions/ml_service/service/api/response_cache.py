@@ -0,0 +1,150 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    An in-process least recently used cache of the responses of the recommendation
+    endpoints. The entries expire after a time to live and are tagged with the
+    generation of the models they were computed from, so that no entry survives the
+    models being replaced
+    """
+
+    def __init__(self, max_bytes=0, ttl=3600):
+        """
+        Class constructor method
+
+        :param max_bytes: The approximate memory bound of the cached entries in bytes.
+            Nothing is cached when this is 0, defaults to 0
+        :type max_bytes: int, optional
+        :param ttl: The number of seconds an entry is served for, defaults to 3600
+        :type ttl: float, optional
+        """
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.size_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def entry_size(key, value):
+        """
+        To estimate the memory taken by an entry, i.e., the key and either the encoded
+        response body or the list of (`totara_id`, `score`) tuples
+
+        :param key: The key of the entry
+        :type key: tuple
+        :param value: The encoded response body or the list of (`totara_id`, `score`)
+            tuples
+        :type value: bytes or list
+        :return: The approximate size of the entry in bytes
+        :rtype: int
+        """
+        size = sys.getsizeof(key) + sum(sys.getsizeof(x) for x in key)
+        size += sys.getsizeof(value)
+        if isinstance(value, bytes):
+            return size
+        for pair in value:
+            size += sys.getsizeof(pair) + sum(sys.getsizeof(x) for x in pair)
+        return size
+
+    def get(self, key, generation):
+        """
+        To find the cached value of the `key` if it was computed from the models of the
+        given generation and has not expired
+
+        :param key: The key of the entry, e.g., (tenant, endpoint, id, item_type,
+            n_items)
+        :type key: tuple
+        :param generation: The generation of the models the request is served from
+        :type generation: int
+        :return: The cached value, or None if there is no valid entry
+        :rtype: bytes or list
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != generation or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, generation):
+        """
+        To cache the `value` of the `key`, evicting the least recently used entries
+        beyond the memory bound. Values computed from the models of an older
+        generation are not cached
+
+        :param key: The key of the entry
+        :type key: tuple
+        :param value: The encoded response body or the list of (`totara_id`, `score`)
+            tuples
+        :type value: bytes or list
+        :param generation: The generation of the models the value was computed from
+        :type generation: int
+        """
+        size = self.entry_size(key=key, value=value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            old_entry = self.entries.pop(key, None)
+            if old_entry is not None:
+                self.size_bytes -= old_entry[3]
+            self.entries[key] = (generation, time.monotonic() + self.ttl, value, size)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                __, evicted = self.entries.popitem(last=False)
+                self.size_bytes -= evicted[3]
+
+    def new_generation(self):
+        """
+        To drop all the entries once the models have been replaced, so that the
+        responses are computed from the new models
+        """
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        """
+        To summarise the use of the cache
+
+        :return: The hit and miss counts, the number of entries, their approximate size
+            in bytes and the current generation
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "size_bytes": self.size_bytes,
+                "generation": self.generation,
+            }
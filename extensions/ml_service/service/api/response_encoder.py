@@ -0,0 +1,71 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import json
+
+import numpy as np
+from flask import Response
+
+
+class ResponseEncoder:
+    """
+    To build the bodies of the successful recommendation responses. The scores are
+    formatted with a single vectorised call and the body is encoded once, so that it
+    can be cached and sent as it is
+    """
+
+    @staticmethod
+    def format_items(items):
+        """
+        To pair the ids of the items with their scores formatted as strings with 4
+        decimals and a leading space for the positive ones, e.g., `" 0.1234"`
+
+        :param items: A list of (`totara_id`, `score`) tuples
+        :type items: list
+        :return: A list of (`totara_id`, `formatted_score`) tuples
+        :rtype: list
+        """
+        if not items:
+            return []
+        ids, scores = zip(*items)
+        formatted = np.char.mod("% .4f", np.asarray(scores, dtype=np.float64))
+        return list(zip(ids, formatted.tolist()))
+
+    @staticmethod
+    def encode(payload):
+        """
+        To encode a response payload as compact JSON
+
+        :param payload: The response payload
+        :type payload: dict
+        :return: The JSON encoded payload
+        :rtype: bytes
+        """
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def response(body):
+        """
+        To build the response of an encoded body
+
+        :param body: The JSON encoded payload
+        :type body: bytes
+        :return: The response
+        :rtype: `flask.wrappers.Response`
+        """
+        return Response(response=body, mimetype="application/json")
@@ -17,61 +17,71 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 import socket
+import threading
+import time
 from datetime import datetime
-from flask import current_app, jsonify, make_response
+from flask import current_app, jsonify, make_response, request
 from flask.views import View
 import requests.exceptions
 from urllib import parse
 
+from service.api.middleware.authentication import AuthenticationMiddleware
 from service.communicator.totara_graphql import TotaraGraphql
 from service.recommender.recommender_health_check import RecommenderHealthCheck
 
 
 def resolve_with_errors(errors: list, totara_info: dict):
     """
-    To prepare a response as json object when there are errors in communication with
-    Totara
+    To prepare the result of a health check when there are errors in communication
+    with Totara
 
     :param errors: A list of errors
     :type errors: list
     :param totara_info: A key-value pair of information about Totara
     :type totara_info: dict
-    :return: A json object to be returned
-    :rtype: json object
+    :return: The result of the health check
+    :rtype: dict
     """
-    return make_response(
-        jsonify({"success": False, "errors": errors, "totara": totara_info})
-    )
+    return {"success": False, "errors": errors, "totara": totara_info}
 
 
-class HealthCheck(View):
+class HealthProber:
     """
-    Perform a health check of the instance, including if we can communicate with Totara
+    To check the health of the instance, including if we can communicate with Totara,
+    and keep the result. Once started, the health is checked on an interval in the
+    background, so that the health checks are answered without waiting for Totara
     """
 
-    methods = ["GET"]
-
-    def __init__(self):
+    def __init__(self, app, interval=30):
         """
         Class constructor method
-        """
-        self.time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.totara_url = current_app.config.get("TOTARA_URL")
-        self.logs_dir = current_app.config.get("LOGS_DIR")
-        self.recommender_model = current_app.recommender
 
-    def dispatch_request(self):
+        :param app: The Flask object
+        :type app: Flask
+        :param interval: The number of seconds between the background checks,
+            defaults to 30
+        :type interval: float, optional
         """
-        This overrides the `dispatch_request` method of the parent class. This matches
-        the URL and does the request dispatching.
+        self.app = app
+        self.interval = float(interval)
+        self.lock = threading.Lock()
+        self.result = None
+        self.checked_at = None
+        self.started = False
+
+    def probe(self):
+        """
+        To check the health of the instance now
 
-        :return: The return value of the view or error handler
-        :rtype: `flask.wrappers.Response`
+        :return: The result of the health check, with the 'success' and 'totara' keys,
+            and the 'errors' key when it was not successful
+        :rtype: dict
         """
-        totara_info = {"url": self.totara_url}
+        totara_url = self.app.config.get("TOTARA_URL")
+        totara_info = {"url": totara_url}
 
         # Check that we're able to resolve the totara hostname
-        totara_hostname = parse.urlparse(self.totara_url).hostname
+        totara_hostname = parse.urlparse(totara_url).hostname
 
         if not totara_hostname:
             return resolve_with_errors(
@@ -89,7 +99,7 @@ class HealthCheck(View):
 
         # We need to see if we're able to communicate with the Totara instance
         # This is checked by calling the ml_service Graphql API
-        q = TotaraGraphql(self.totara_url)
+        q = TotaraGraphql(totara_url)
 
         try:
             check, elapsed = q.check()
@@ -113,9 +123,6 @@ class HealthCheck(View):
                 [f"Unable to communicate with Totara: {str(cto)}"], totara_info
             )
 
-        auth_info = current_app.config.get("auth_info", {})
-        totara_info = {**totara_info, **auth_info}
-
         if not check:
             return resolve_with_errors(
                 [
@@ -128,8 +135,86 @@ class HealthCheck(View):
             )
 
         # To get some information on the recommendation model
-        r = RecommenderHealthCheck(self.recommender_model, self.logs_dir)
+        r = RecommenderHealthCheck(
+            self.app.recommender, self.app.config.get("LOGS_DIR")
+        )
         recommender_health = r.recommender_health()
         totara_info = {**totara_info, **recommender_health}
 
-        return make_response(jsonify({"success": True, "totara": totara_info}))
+        return {"success": True, "totara": totara_info}
+
+    def refresh(self):
+        """
+        To check the health of the instance now and keep the result
+
+        :return: The result of the health check and its age in seconds, i.e., 0
+        :rtype: tuple
+        """
+        result = self.probe()
+        with self.lock:
+            self.result = result
+            self.checked_at = time.monotonic()
+        return result, 0.0
+
+    def start(self):
+        """
+        To mark the health as checked in the background, so that the kept result is
+        answered from then on. The caller schedules `refresh` every `interval` seconds
+        """
+        self.started = True
+
+    def snapshot(self, fresh=False):
+        """
+        To find the result of the last health check, or to check the health now when
+        it is requested `fresh`, when the health is not checked in the background or
+        when the last result is older than twice the interval
+
+        :param fresh: Whether to check the health now, defaults to False
+        :type fresh: bool, optional
+        :return: The result of the health check and its age in seconds
+        :rtype: tuple
+        """
+        with self.lock:
+            result, checked_at = self.result, self.checked_at
+        if fresh or not self.started or result is None:
+            return self.refresh()
+        age = time.monotonic() - checked_at
+        if age > 2 * self.interval:
+            return self.refresh()
+        return result, age
+
+
+class HealthCheck(View):
+    """
+    Perform a health check of the instance, including if we can communicate with Totara
+    """
+
+    methods = ["GET"]
+
+    def __init__(self):
+        """
+        Class constructor method
+        """
+        self.time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.fresh = request.args.get("fresh", "0").lower() in ("1", "true")
+
+    def dispatch_request(self):
+        """
+        This overrides the `dispatch_request` method of the parent class. This matches
+        the URL and does the request dispatching. The result of the last background
+        check is returned with its age in seconds, unless the `fresh` argument is 1
+
+        :return: The return value of the view or error handler
+        :rtype: `flask.wrappers.Response`
+        """
+        result, age = current_app.health_prober.snapshot(fresh=self.fresh)
+        auth_info = request.environ.get(AuthenticationMiddleware.environ_key, {})
+        return make_response(
+            jsonify(
+                {
+                    **result,
+                    "totara": {**result["totara"], **auth_info},
+                    "age_seconds": round(age, 3),
+                }
+            )
+        )
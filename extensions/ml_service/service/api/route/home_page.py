@@ -49,8 +49,16 @@ class HomePage(View):
             "timestamp": self.time,
             "endpoints": {
                 "url_health_check": url_for(endpoint="health_check", _external=True),
+                "url_ready": url_for(endpoint="ready", _external=True),
+                "url_metrics": url_for(endpoint="metrics", _external=True),
                 "url_similar_items": url_for(endpoint="s_items", _external=True),
+                "url_batch_similar_items": url_for(
+                    endpoint="batch_s_items", _external=True
+                ),
                 "url_user_items": url_for(endpoint="user_items", _external=True),
+                "url_batch_user_items": url_for(
+                    endpoint="batch_user_items", _external=True
+                ),
             },
             "config": {"totara_url": current_app.config.get("TOTARA_URL")},
         }
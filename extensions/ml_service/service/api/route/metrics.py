@@ -0,0 +1,134 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+from flask import Response, current_app
+from flask.views import View
+
+from service.recommender.model_artifacts import TenantModels
+
+
+class Metrics(View):
+    """
+    A view class for the endpoint of ML Service that exports its metrics in the
+    Prometheus text exposition format. It is inherited from the `flask.views.View`
+    """
+
+    methods = ["GET"]
+
+    @staticmethod
+    def gauges():
+        """
+        To collect the state of the response cache and of the served models when the
+        metrics are exported
+
+        :return: A list of (name, type, description, labels, value) samples
+        :rtype: list
+        """
+        cache = current_app.response_cache.stats()
+        lookups = cache["hits"] + cache["misses"]
+        samples = [
+            (
+                "ml_service_response_cache_hits_total",
+                "counter",
+                "The number of responses served from the cache",
+                (),
+                cache["hits"],
+            ),
+            (
+                "ml_service_response_cache_misses_total",
+                "counter",
+                "The number of responses that were not in the cache",
+                (),
+                cache["misses"],
+            ),
+            (
+                "ml_service_response_cache_hit_ratio",
+                "gauge",
+                "The ratio of the responses served from the cache",
+                (),
+                cache["hits"] / lookups if lookups else 0.0,
+            ),
+            (
+                "ml_service_response_cache_bytes",
+                "gauge",
+                "The approximate size of the cached responses",
+                (),
+                cache["size_bytes"],
+            ),
+            (
+                "ml_service_model_generation",
+                "gauge",
+                "The number of times the served models have been replaced",
+                (),
+                cache["generation"],
+            ),
+            (
+                "ml_service_models_info",
+                "gauge",
+                "The version of the served models",
+                (("version", current_app.models_version or ""),),
+                int(current_app.recommender is not None),
+            ),
+        ]
+        recommender = current_app.recommender
+        if isinstance(recommender, TenantModels):
+            stats = recommender.stats()
+            samples += [
+                (
+                    "ml_service_model_resident_bytes",
+                    "gauge",
+                    "The approximate size of the tenant models loaded in memory",
+                    (),
+                    stats["resident_bytes"],
+                ),
+                (
+                    "ml_service_model_tenants_loaded",
+                    "gauge",
+                    "The number of tenant models loaded in memory",
+                    (),
+                    stats["loaded"],
+                ),
+                (
+                    "ml_service_model_loads_total",
+                    "counter",
+                    "The number of times a tenant model was read from the disk",
+                    (),
+                    stats["loads"],
+                ),
+                (
+                    "ml_service_model_evictions_total",
+                    "counter",
+                    "The number of tenant models dropped to stay within the budget",
+                    (),
+                    stats["evictions"],
+                ),
+            ]
+        return samples
+
+    def dispatch_request(self):
+        """
+        This overrides the `dispatch_request` method of the parent class. This matches
+        the URL and does the request dispatching.
+
+        :return: The metrics of this process in the text exposition format
+        :rtype: `flask.wrappers.Response`
+        """
+        return Response(
+            response=current_app.metrics.render(gauges=self.gauges()),
+            mimetype="text/plain; version=0.0.4",
+        )
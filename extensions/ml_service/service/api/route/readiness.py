@@ -0,0 +1,71 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+from flask import current_app, jsonify, make_response, request
+from flask.views import View
+
+from service.recommender.model_artifacts import TenantModels
+
+
+class Readiness(View):
+    """
+    A view class for the endpoint of ML Service that reports whether the recommender
+    models are loaded, so that the traffic is only routed to the service once they
+    are. It is inherited from the `flask.views.View`
+    """
+
+    methods = ["GET"]
+
+    def __init__(self):
+        """
+        Class constructor method
+        """
+        self.tenants = request.args.getlist("tenant")
+
+    def dispatch_request(self):
+        """
+        This overrides the `dispatch_request` method of the parent class. This matches
+        the URL and does the request dispatching. The service is ready once the tenant
+        models have been warmed up, or once the models of the `tenant` arguments are
+        loaded when there are any
+
+        :return: The loading progress, with the status code 200 when the service is
+            ready and 503 otherwise
+        :rtype: `flask.wrappers.Response`
+        """
+        recommender = current_app.recommender
+        if recommender is None:
+            progress = {"ready": False, "models_version": None}
+        elif isinstance(recommender, TenantModels):
+            progress = recommender.stats()
+            if self.tenants:
+                ready = all(
+                    recommender.is_loaded(tenant=tenant)
+                    for tenant in self.tenants
+                    if tenant in recommender
+                )
+            else:
+                ready = not progress["warming_up"]
+            progress = {
+                "ready": ready,
+                "models_version": current_app.models_version,
+                **progress,
+            }
+        else:
+            progress = {"ready": True, "models_version": current_app.models_version}
+        return make_response(jsonify(progress), 200 if progress["ready"] else 503)
@@ -0,0 +1,195 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+from flask import jsonify, make_response, request, current_app
+from flask.views import View
+
+from service.api.response_encoder import ResponseEncoder
+from service.api.service_metrics import StageTimer
+from service.recommender.model_artifacts import TenantNotReadyError
+from service.recommender.predict_recommender import PredictRecommender
+from service.recommender.config import Config
+
+
+class RequestBatchSimilarItems(View):
+    """
+    A view class for the endpoint of ML Service that returns similar items to many items
+    of a tenant at once in response to a valid request. It is inherited from the
+    `flask.views.View` class
+    """
+
+    methods = ["POST"]
+
+    def __init__(self):
+        """
+        Class constructor method
+        """
+        payload = request.get_json(silent=True) or {}
+        self.tenant = payload.get("tenant")
+        if self.tenant is not None:
+            self.tenant = str(self.tenant)
+        self.params_dict = {
+            "totara_item_ids": [str(x) for x in payload.get("totara_item_ids") or []],
+            "n_items": int(payload.get("n_items", 10)),
+        }
+        self.max_size = Config().get_property(property_name="batch")["max_size"]
+
+    @staticmethod
+    def success_response(items: dict, unknown_ids: list) -> dict:
+        """
+        To prepare a response when items are successfully fetched
+
+        :param items: The lists of items to be returned keyed by the Totara item ids
+        :type items: dict
+        :param unknown_ids: The requested Totara item ids that are not known to the model
+        :type unknown_ids: list
+        :return: The response object with 'success' code as True, the given items and
+            the unknown item ids
+        :rtype: dict
+        """
+        return {"success": True, "items": items, "unknown_item_ids": unknown_ids}
+
+    @staticmethod
+    def error_response(message: str) -> dict:
+        """
+        To prepare a response with error
+
+        :param message: The message to be returned
+        :type message: str
+        :return: Error object with the 'success' code as False and the given message
+        :rtype: dict
+        """
+        return {"success": False, "message": message, "items": {}}
+
+    @staticmethod
+    def resolve_id(totara_item_id: str, item_mapping: dict) -> str:
+        """
+        To find the id under which the requested item is known to the model. Articles
+        may have been trained as micro-learnings, so the article id is swapped for the
+        micro-learning one when the former is not known
+
+        :param totara_item_id: The requested Totara item id
+        :type totara_item_id: str
+        :param item_mapping: A dictionary where keys are Totara item ids and values are
+            internal item ids
+        :type item_mapping: dict
+        :return: The item id known to the model, or None if there is no such item
+        :rtype: str
+        """
+        if totara_item_id not in item_mapping:
+            totara_item_id = totara_item_id.replace("article", "microlearning")
+        if totara_item_id not in item_mapping:
+            return None
+        return totara_item_id
+
+    def dispatch_request(self):
+        """
+        This overrides the `dispatch_request` method of the parent `View` class. This
+        matches the URL and does the request dispatching.
+
+        :return: The return value of the view or error handler
+        :rtype: `flask.wrappers.Response`
+        """
+        timer = StageTimer.of(environ=request.environ)
+        if current_app.recommender is None:
+            no_model_response = jsonify(
+                self.error_response("The recommender model is not ready yet")
+            )
+            return make_response(no_model_response)
+
+        if self.tenant not in current_app.recommender:
+            no_tenant_response = jsonify(
+                self.error_response("Bad request: no such tenant")
+            )
+            return make_response(no_tenant_response)
+        timer.tenant = self.tenant
+
+        try:
+            tenant_model = current_app.recommender[self.tenant]
+        except TenantNotReadyError:
+            not_ready_response = jsonify(
+                self.error_response("The recommender model is not ready yet")
+            )
+            return make_response(not_ready_response)
+
+        if tenant_model["msg"] != "success":
+            message = (
+                f"Message: The model for tenant {self.tenant} is not trained, "
+                "probably for insufficient data"
+            )
+            no_success_response = jsonify(self.error_response(message))
+            return make_response(no_success_response)
+
+        if len(self.params_dict["totara_item_ids"]) > self.max_size:
+            too_many_response = jsonify(
+                self.error_response(
+                    f"Bad request: at most {self.max_size} items can be requested"
+                )
+            )
+            return make_response(too_many_response)
+
+        timer.lap(stage="validation")
+        model = tenant_model["model"]
+        algorithm = current_app.config.get("RECOMMENDATION_ALGORITHM")
+        mappings = tenant_model["mappings"]
+        item_features = tenant_model["item_features"]
+        num_threads = int(current_app.config.get("NUM_THREADS"))
+
+        resolved_ids = {}
+        unknown_ids = []
+        for totara_item_id in self.params_dict["totara_item_ids"]:
+            resolved_id = self.resolve_id(
+                totara_item_id=totara_item_id, item_mapping=mappings[2]
+            )
+            if resolved_id is None:
+                unknown_ids.append(totara_item_id)
+            else:
+                resolved_ids[totara_item_id] = resolved_id
+
+        predictor = PredictRecommender(
+            model=model,
+            algorithm=algorithm,
+            mappings=mappings,
+            items_features=item_features,
+            num_threads=num_threads,
+            item_representations=tenant_model.get("item_representations"),
+            item_unit_embeddings=tenant_model.get("item_unit_embeddings"),
+            item_ids=tenant_model.get("item_ids"),
+            clean_item_ids=tenant_model.get("clean_item_ids"),
+            ann_index=tenant_model.get("ann_index"),
+        )
+        items_similar = predictor.get_batch_similar_items(
+            totara_ids=list(dict.fromkeys(resolved_ids.values())),
+            n_items=self.params_dict["n_items"],
+        )
+        timer.lap(stage="scoring")
+        items_formatted = {
+            totara_item_id: ResponseEncoder.format_items(
+                items=items_similar[resolved_id]
+            )
+            for totara_item_id, resolved_id in resolved_ids.items()
+        }
+        response = ResponseEncoder.response(
+            body=ResponseEncoder.encode(
+                payload=self.success_response(
+                    items=items_formatted, unknown_ids=unknown_ids
+                )
+            )
+        )
+        timer.lap(stage="serialisation")
+        return response
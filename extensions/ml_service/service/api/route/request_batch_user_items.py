@@ -0,0 +1,180 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+from flask import jsonify, make_response, request, current_app
+from flask.views import View
+
+from service.api.response_encoder import ResponseEncoder
+from service.api.service_metrics import StageTimer
+from service.recommender.model_artifacts import TenantNotReadyError
+from service.recommender.predict_recommender import PredictRecommender
+from service.recommender.config import Config
+
+
+class RequestBatchUserItems(View):
+    """
+    A view class for the endpoint of ML Service that returns recommended items for many
+    users of a tenant at once in response to a valid request. It is inherited from the
+    `flask.views.View` class
+    """
+
+    methods = ["POST"]
+
+    def __init__(self):
+        """
+        Class constructor method
+        """
+        payload = request.get_json(silent=True) or {}
+        self.tenant = payload.get("tenant")
+        if self.tenant is not None:
+            self.tenant = str(self.tenant)
+        self.params_dict = {
+            "totara_user_ids": [str(x) for x in payload.get("totara_user_ids") or []],
+            "n_items": int(payload.get("n_items", 10)),
+            "item_type": payload.get("item_type"),
+        }
+        cfg = Config()
+        self.item_types_allowed = cfg.get_property(property_name="item_types")
+        self.max_size = cfg.get_property(property_name="batch")["max_size"]
+
+    @staticmethod
+    def success_response(items: dict, unknown_ids: list) -> dict:
+        """
+        To prepare a response when items are successfully fetched
+
+        :param items: The lists of items to be returned keyed by the Totara user ids
+        :type items: dict
+        :param unknown_ids: The requested Totara user ids that are not known to the model
+        :type unknown_ids: list
+        :return: The response object with 'success' code as True, the given items and
+            the unknown user ids
+        :rtype: dict
+        """
+        return {"success": True, "items": items, "unknown_user_ids": unknown_ids}
+
+    @staticmethod
+    def error_response(message: str) -> dict:
+        """
+        To prepare a response with error
+
+        :param message: The message to be returned
+        :type message: str
+        :return: Error object with the 'success' code as False and the given message
+        :rtype: dict
+        """
+        return {"success": False, "message": message, "items": {}}
+
+    def dispatch_request(self):
+        """
+        This overrides the `dispatch_request` method of the parent `View` class. This
+        matches the URL and does the request dispatching.
+
+        :return: The return value of the view or error handler
+        :rtype: `flask.wrappers.Response`
+        """
+        timer = StageTimer.of(environ=request.environ)
+        if current_app.recommender is None:
+            no_model_response = jsonify(
+                self.error_response("The recommender model is not ready yet")
+            )
+            return make_response(no_model_response)
+
+        if self.tenant not in current_app.recommender:
+            no_tenant_response = jsonify(
+                self.error_response("Bad request: no such tenant")
+            )
+            return make_response(no_tenant_response)
+        timer.tenant = self.tenant
+
+        try:
+            tenant_model = current_app.recommender[self.tenant]
+        except TenantNotReadyError:
+            not_ready_response = jsonify(
+                self.error_response("The recommender model is not ready yet")
+            )
+            return make_response(not_ready_response)
+
+        if tenant_model["msg"] != "success":
+            message = (
+                f"Message: The model for tenant {self.tenant} is not trained, "
+                "probably for insufficient data"
+            )
+            no_success_response = jsonify(self.error_response(message))
+            return make_response(no_success_response)
+
+        if self.params_dict["item_type"] not in self.item_types_allowed:
+            wrong_type_response = jsonify(
+                self.error_response("Bad request: no such item type is available")
+            )
+            return make_response(wrong_type_response)
+
+        if len(self.params_dict["totara_user_ids"]) > self.max_size:
+            too_many_response = jsonify(
+                self.error_response(
+                    f"Bad request: at most {self.max_size} users can be requested"
+                )
+            )
+            return make_response(too_many_response)
+
+        timer.lap(stage="validation")
+        model = tenant_model["model"]
+        algorithm = current_app.config.get("RECOMMENDATION_ALGORITHM")
+        mappings = tenant_model["mappings"]
+        user_features = tenant_model["user_features"]
+        item_features = tenant_model["item_features"]
+        item_type_map = tenant_model["item_type_map"]
+        positive_inter_map = tenant_model["positive_interactions_map"]
+        num_threads = int(current_app.config.get("NUM_THREADS"))
+        predictor = PredictRecommender(
+            model=model,
+            algorithm=algorithm,
+            mappings=mappings,
+            items_features=item_features,
+            num_threads=num_threads,
+            item_ids=tenant_model.get("item_ids"),
+            clean_item_ids=tenant_model.get("clean_item_ids"),
+            user_ids=tenant_model.get("user_ids"),
+            item_type_index=tenant_model.get("item_type_index"),
+            item_representations=tenant_model.get("item_representations"),
+            user_representations=tenant_model.get("user_representations"),
+        )
+        users_items = predictor.get_batch_user_recommendations(
+            totara_ids=self.params_dict["totara_user_ids"],
+            n_items=self.params_dict["n_items"],
+            items_type=self.params_dict["item_type"],
+            user_features=user_features,
+            item_type_map=item_type_map,
+            positive_inter_map=positive_inter_map,
+        )
+        timer.lap(stage="scoring")
+        items_formatted = {
+            user_id: ResponseEncoder.format_items(items=items)
+            for user_id, items in users_items.items()
+        }
+        unknown_ids = [
+            x for x in self.params_dict["totara_user_ids"] if x not in users_items
+        ]
+        response = ResponseEncoder.response(
+            body=ResponseEncoder.encode(
+                payload=self.success_response(
+                    items=items_formatted, unknown_ids=unknown_ids
+                )
+            )
+        )
+        timer.lap(stage="serialisation")
+        return response
@@ -19,6 +19,9 @@ Please contact [licensing@totaralearning.com] for more information.
 from flask import jsonify, make_response, request, current_app
 from flask.views import View
 
+from service.api.response_encoder import ResponseEncoder
+from service.api.service_metrics import StageTimer
+from service.recommender.model_artifacts import TenantNotReadyError
 from service.recommender.predict_recommender import PredictRecommender
 
 
@@ -72,6 +75,9 @@ class RequestSimilarItems(View):
         :return: The return value of the view or error handler
         :rtype: `flask.wrappers.Response`
         """
+        timer = StageTimer.of(environ=request.environ)
+        response_cache = current_app.response_cache
+        generation = response_cache.generation
         if current_app.recommender is None:
             no_model_response = jsonify(
                 self.error_response("The recommender model is not ready yet")
@@ -83,8 +89,17 @@ class RequestSimilarItems(View):
                 self.error_response("Bad request: no such tenant")
             )
             return make_response(no_tenant_response)
+        timer.tenant = self.tenant
 
-        if current_app.recommender[self.tenant]["msg"] != "success":
+        try:
+            tenant_model = current_app.recommender[self.tenant]
+        except TenantNotReadyError:
+            not_ready_response = jsonify(
+                self.error_response("The recommender model is not ready yet")
+            )
+            return make_response(not_ready_response)
+
+        if tenant_model["msg"] != "success":
             message = (
                 f"Message: The model for tenant {self.tenant} is not trained, "
                 "probably for insufficient data"
@@ -92,39 +107,55 @@ class RequestSimilarItems(View):
             no_success_response = jsonify(self.error_response(message))
             return make_response(no_success_response)
 
-        if (
-            self.params_dict["totara_item_id"]
-            not in current_app.recommender[self.tenant]["mappings"][2]
-        ):
+        if self.params_dict["totara_item_id"] not in tenant_model["mappings"][2]:
             self.params_dict["totara_item_id"] = self.params_dict[
                 "totara_item_id"
             ].replace("article", "microlearning")
 
-        if (
-            self.params_dict["totara_item_id"]
-            not in current_app.recommender[self.tenant]["mappings"][2]
-        ):
+        if self.params_dict["totara_item_id"] not in tenant_model["mappings"][2]:
             no_id_response = jsonify(
                 self.error_response("Bad request: no such item id")
             )
             return make_response(no_id_response)
 
-        model = current_app.recommender[self.tenant]["model"]
-        algorithm = current_app.config.get("RECOMMENDATION_ALGORITHM")
-        mappings = current_app.recommender[self.tenant]["mappings"]
-        item_features = current_app.recommender[self.tenant]["item_features"]
-        num_threads = int(current_app.config.get("NUM_THREADS"))
-        predictor = PredictRecommender(
-            model=model,
-            algorithm=algorithm,
-            mappings=mappings,
-            items_features=item_features,
-            num_threads=num_threads,
-        )
-        items = predictor.get_similar_items(
-            totara_id=self.params_dict["totara_item_id"],
-            n_items=self.params_dict["n_items"],
+        timer.lap(stage="validation")
+        cache_key = (
+            self.tenant,
+            "similar_items",
+            self.params_dict["totara_item_id"],
+            None,
+            self.params_dict["n_items"],
         )
-        items_formatted = [(idx, f"{val: .4f}") for idx, val in items]
-        json_response = self.success_response(items_formatted)
-        return make_response(json_response)
+        body = response_cache.get(key=cache_key, generation=generation)
+        timer.lap(stage="cache")
+        if body is None:
+            model = tenant_model["model"]
+            algorithm = current_app.config.get("RECOMMENDATION_ALGORITHM")
+            mappings = tenant_model["mappings"]
+            item_features = tenant_model["item_features"]
+            num_threads = int(current_app.config.get("NUM_THREADS"))
+            predictor = PredictRecommender(
+                model=model,
+                algorithm=algorithm,
+                mappings=mappings,
+                items_features=item_features,
+                num_threads=num_threads,
+                item_representations=tenant_model.get("item_representations"),
+                item_unit_embeddings=tenant_model.get("item_unit_embeddings"),
+                item_ids=tenant_model.get("item_ids"),
+                ann_index=tenant_model.get("ann_index"),
+                clean_item_ids=tenant_model.get("clean_item_ids"),
+                similar_items_store=tenant_model.get("similar_items_store"),
+            )
+            items = predictor.get_similar_items(
+                totara_id=self.params_dict["totara_item_id"],
+                n_items=self.params_dict["n_items"],
+            )
+            timer.lap(stage="scoring")
+            body = ResponseEncoder.encode(
+                payload=self.success_response(ResponseEncoder.format_items(items=items))
+            )
+            response_cache.put(key=cache_key, value=body, generation=generation)
+        response = ResponseEncoder.response(body=body)
+        timer.lap(stage="serialisation")
+        return response
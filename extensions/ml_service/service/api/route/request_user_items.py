@@ -19,6 +19,9 @@ Please contact [licensing@totaralearning.com] for more information.
 from flask import jsonify, make_response, request, current_app
 from flask.views import View
 
+from service.api.response_encoder import ResponseEncoder
+from service.api.service_metrics import StageTimer
+from service.recommender.model_artifacts import TenantNotReadyError
 from service.recommender.predict_recommender import PredictRecommender
 from service.recommender.config import Config
 
@@ -76,6 +79,9 @@ class RequestUserItems(View):
         :return: The return value of the view or error handler
         :rtype: `flask.wrappers.Response`
         """
+        timer = StageTimer.of(environ=request.environ)
+        response_cache = current_app.response_cache
+        generation = response_cache.generation
         if current_app.recommender is None:
             no_model_response = jsonify(
                 self.error_response("The recommender model is not ready yet")
@@ -87,8 +93,17 @@ class RequestUserItems(View):
                 self.error_response("Bad request: no such tenant")
             )
             return make_response(no_tenant_response)
+        timer.tenant = self.tenant
 
-        if current_app.recommender[self.tenant]["msg"] != "success":
+        try:
+            tenant_model = current_app.recommender[self.tenant]
+        except TenantNotReadyError:
+            not_ready_response = jsonify(
+                self.error_response("The recommender model is not ready yet")
+            )
+            return make_response(not_ready_response)
+
+        if tenant_model["msg"] != "success":
             message = (
                 f"Message: The model for tenant {self.tenant} is not trained, "
                 "probably for insufficient data"
@@ -96,10 +111,7 @@ class RequestUserItems(View):
             no_success_response = jsonify(self.error_response(message))
             return make_response(no_success_response)
 
-        if (
-            self.params_dict["totara_user_id"]
-            not in current_app.recommender[self.tenant]["mappings"][0]
-        ):
+        if self.params_dict["totara_user_id"] not in tenant_model["mappings"][0]:
             no_id_response = jsonify(
                 self.error_response("Bad request: no such user id")
             )
@@ -111,31 +123,53 @@ class RequestUserItems(View):
             )
             return make_response(wrong_type_response)
 
-        model = current_app.recommender[self.tenant]["model"]
-        algorithm = current_app.config.get("RECOMMENDATION_ALGORITHM")
-        mappings = current_app.recommender[self.tenant]["mappings"]
-        user_features = current_app.recommender[self.tenant]["user_features"]
-        item_features = current_app.recommender[self.tenant]["item_features"]
-        item_type_map = current_app.recommender[self.tenant]["item_type_map"]
-        positive_inter_map = current_app.recommender[self.tenant][
-            "positive_interactions_map"
-        ]
-        num_threads = int(current_app.config.get("NUM_THREADS"))
-        predictor = PredictRecommender(
-            model=model,
-            algorithm=algorithm,
-            mappings=mappings,
-            items_features=item_features,
-            num_threads=num_threads,
-        )
-        items = predictor.get_user_recommendations(
-            totara_id=self.params_dict["totara_user_id"],
-            n_items=self.params_dict["n_items"],
-            items_type=self.params_dict["item_type"],
-            user_features=user_features,
-            item_type_map=item_type_map,
-            positive_inter_map=positive_inter_map,
+        timer.lap(stage="validation")
+        cache_key = (
+            self.tenant,
+            "user_items",
+            self.params_dict["totara_user_id"],
+            self.params_dict["item_type"],
+            self.params_dict["n_items"],
         )
-        items_formatted = [(idx, f"{val: .4f}") for idx, val in items]
-        success_response = jsonify(self.success_response(items_formatted))
-        return make_response(success_response)
+        body = response_cache.get(key=cache_key, generation=generation)
+        timer.lap(stage="cache")
+        if body is None:
+            model = tenant_model["model"]
+            algorithm = current_app.config.get("RECOMMENDATION_ALGORITHM")
+            mappings = tenant_model["mappings"]
+            user_features = tenant_model["user_features"]
+            item_features = tenant_model["item_features"]
+            item_type_map = tenant_model["item_type_map"]
+            positive_inter_map = tenant_model["positive_interactions_map"]
+            num_threads = int(current_app.config.get("NUM_THREADS"))
+            predictor = PredictRecommender(
+                model=model,
+                algorithm=algorithm,
+                mappings=mappings,
+                items_features=item_features,
+                num_threads=num_threads,
+                item_ids=tenant_model.get("item_ids"),
+                clean_item_ids=tenant_model.get("clean_item_ids"),
+                user_ids=tenant_model.get("user_ids"),
+                item_type_index=tenant_model.get("item_type_index"),
+                item_representations=tenant_model.get("item_representations"),
+                user_representations=tenant_model.get("user_representations"),
+                user_items_stores=tenant_model.get("user_items_stores"),
+                mips_indexes=tenant_model.get("mips_indexes"),
+            )
+            items = predictor.get_user_recommendations(
+                totara_id=self.params_dict["totara_user_id"],
+                n_items=self.params_dict["n_items"],
+                items_type=self.params_dict["item_type"],
+                user_features=user_features,
+                item_type_map=item_type_map,
+                positive_inter_map=positive_inter_map,
+            )
+            timer.lap(stage="scoring")
+            body = ResponseEncoder.encode(
+                payload=self.success_response(ResponseEncoder.format_items(items=items))
+            )
+            response_cache.put(key=cache_key, value=body, generation=generation)
+        response = ResponseEncoder.response(body=body)
+        timer.lap(stage="serialisation")
+        return response
@@ -0,0 +1,284 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+
+class StageTimer:
+    """
+    To time the stages a request goes through, e.g., its validation, scoring and
+    serialisation. An instance is kept in the environ of each request, so that the
+    timings are local to the request
+    """
+
+    # The key of the WSGI environ where the timer of the request is kept
+    environ_key = "ml_service.stage_timer"
+
+    def __init__(self):
+        """
+        Class constructor method
+        """
+        self.started = perf_counter()
+        self.last = self.started
+        self.stages = {}
+        self.tenant = ""
+
+    def lap(self, stage):
+        """
+        To add the time elapsed since the previous lap to the given stage
+
+        :param stage: The name of the stage that has just ended
+        :type stage: str
+        """
+        now = perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+    @classmethod
+    def of(cls, environ):
+        """
+        To find the timer of a request, or a detached one when the request is not
+        tracked so that the endpoints can time their stages unconditionally
+
+        :param environ: The WSGI environ of the request
+        :type environ: dict
+        :return: The timer of the request
+        :rtype: StageTimer
+        """
+        timer = environ.get(cls.environ_key)
+        return cls() if timer is None else timer
+
+
+class ServiceMetrics:
+    """
+    In-process counters and latency histograms of the ML Service, exported in the
+    Prometheus text exposition format. The updates only take a lock around a few
+    dictionary operations. Every sample has a `worker` label, so that the series of
+    the serving processes stay apart and can be summed across them
+    """
+
+    # The upper bounds in seconds of the buckets of the latency histograms
+    buckets = (
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    )
+
+    descriptions = {
+        "ml_service_requests_total": (
+            "counter",
+            "The number of requests by endpoint, tenant and status code",
+        ),
+        "ml_service_rejected_requests_total": (
+            "counter",
+            "The number of requests rejected by the authentication",
+        ),
+        "ml_service_request_duration_seconds": (
+            "histogram",
+            "The time taken to respond to the requests",
+        ),
+        "ml_service_stage_duration_seconds": (
+            "histogram",
+            "The time taken by each stage of the requests, i.e., auth, validation, "
+            "cache, scoring and serialisation",
+        ),
+        "ml_service_requests_in_flight": (
+            "gauge",
+            "The number of requests being responded to",
+        ),
+    }
+
+    def __init__(self, worker=None):
+        """
+        Class constructor method
+
+        :param worker: The value of the `worker` label of the samples, defaults to the
+            id of the process
+        :type worker: str, optional
+        """
+        self.worker = str(os.getpid()) if worker is None else str(worker)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.in_flight = 0
+
+    def inc(self, name, labels=(), value=1):
+        """
+        To increment a counter
+
+        :param name: The name of the counter
+        :type name: str
+        :param labels: The (label, value) pairs of the counter, defaults to ()
+        :type labels: tuple, optional
+        :param value: The increment, defaults to 1
+        :type value: float, optional
+        """
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        """
+        To record a latency in a histogram
+
+        :param name: The name of the histogram
+        :type name: str
+        :param labels: The (label, value) pairs of the histogram
+        :type labels: tuple
+        :param seconds: The observed latency in seconds
+        :type seconds: float
+        """
+        bucket = bisect_left(self.buckets, seconds)
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self.histograms[key] = histogram
+            histogram[0][bucket] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def request_started(self):
+        """
+        To count a request as being responded to
+        """
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self, endpoint, status, timer, auth_seconds=None):
+        """
+        To record a request once it has been responded to
+
+        :param endpoint: The URL rule of the endpoint
+        :type endpoint: str
+        :param status: The status code of the response
+        :type status: int
+        :param timer: The timer of the request
+        :type timer: StageTimer
+        :param auth_seconds: The time taken by the authentication of the request, or
+            None when it was not authenticated, defaults to None
+        :type auth_seconds: float, optional
+        """
+        elapsed = perf_counter() - timer.started
+        labels = (("endpoint", endpoint), ("tenant", timer.tenant))
+        stages = dict(timer.stages)
+        if auth_seconds is not None:
+            stages["auth"] = auth_seconds
+            elapsed += auth_seconds
+        with self.lock:
+            self.in_flight -= 1
+        self.inc(
+            name="ml_service_requests_total",
+            labels=labels + (("status", str(status)),),
+        )
+        self.observe(
+            name="ml_service_request_duration_seconds", labels=labels, seconds=elapsed
+        )
+        for stage, seconds in stages.items():
+            self.observe(
+                name="ml_service_stage_duration_seconds",
+                labels=labels + (("stage", stage),),
+                seconds=seconds,
+            )
+
+    @staticmethod
+    def format_labels(labels):
+        """
+        To format the labels of a sample
+
+        :param labels: The (label, value) pairs of the sample
+        :type labels: tuple
+        :return: The labels between braces, or an empty string when there are none
+        :rtype: str
+        """
+        if not labels:
+            return ""
+        escaped = (
+            (label, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+            for label, value in labels
+        )
+        return "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+    def render(self, gauges=()):
+        """
+        To export the metrics in the Prometheus text exposition format
+
+        :param gauges: Additional (name, type, description, labels, value) samples
+            collected when the metrics are exported, defaults to ()
+        :type gauges: iterable, optional
+        :return: The metrics in the text exposition format
+        :rtype: str
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (list(value[0]), value[1], value[2])
+                for key, value in self.histograms.items()
+            }
+            in_flight = self.in_flight
+
+        worker = (("worker", self.worker),)
+        samples = {}
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, []).append(
+                f"{name}{self.format_labels(worker + labels)} {value}"
+            )
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            labels = worker + labels
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                bucket_labels = self.format_labels(labels + (("le", bound),))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{self.format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self.format_labels(labels)} {count}")
+        samples["ml_service_requests_in_flight"] = [
+            f"ml_service_requests_in_flight{self.format_labels(worker)} {in_flight}"
+        ]
+
+        descriptions = dict(self.descriptions)
+        for name, kind, description, labels, value in gauges:
+            descriptions.setdefault(name, (kind, description))
+            samples.setdefault(name, []).append(
+                f"{name}{self.format_labels(worker + tuple(labels))} {value}"
+            )
+
+        exposition = []
+        for name, lines in samples.items():
+            kind, description = descriptions.get(name, ("untyped", name))
+            exposition.append(f"# HELP {name} {description}")
+            exposition.append(f"# TYPE {name} {kind}")
+            exposition.extend(lines)
+        return "\n".join(exposition) + "\n"
@@ -16,15 +16,19 @@ Please contact [licensing@totaralearning.com] for more information.
 @package ml_service
 """
 
+import csv
+import hashlib
 import io
 import os
 import nltk
 import pandas as pd
-import pickle
 from flask import current_app
 from datetime import datetime
 
+from service.recommender.model_artifacts import TenantModels
+from service.recommender.prepare_serving import PrepareServing
 from service.recommender.train_recommender import TrainRecommender
+from service.recommender.train_telemetry import TrainTelemetry
 from service.communicator.totara_files import TotaraFiles
 
 
@@ -34,14 +38,24 @@ class TrainRecommenderModel:
     scheduled times
     """
 
-    def __init__(self, application):
+    def __init__(self, application, model_artifacts=None, warm_up=True):
         """
         Class constructor method
 
         :param application: The Flask object
         :type application: Flask
+        :param model_artifacts: Where to save the trained models, so that they can be
+            reloaded in case of service crashing and by the serving worker processes,
+            defaults to None
+        :type model_artifacts: ModelArtifacts, optional
+        :param warm_up: Whether to load the saved tenant models before serving them,
+            which the service does not need when it does not serve them, defaults to
+            True
+        :type warm_up: bool, optional
         """
         self.application = application
+        self.model_artifacts = model_artifacts
+        self.warm_up = warm_up
         with application.app_context():
             self.totara_url = current_app.config.get("TOTARA_URL")
             self.totara_key = current_app.config.get("TOTARA_KEY")
@@ -49,22 +63,40 @@ class TrainRecommenderModel:
             self.models_path = current_app.config.get("MODELS_DIR")
             self.algorithm = current_app.config.get("RECOMMENDATION_ALGORITHM")
             self.num_threads = int(current_app.config.get("NUM_THREADS"))
+            self.train_workers = int(current_app.config.get("TRAIN_WORKERS", "1"))
+            self.store_size = int(
+                current_app.config.get("RECOMMENDATION_STORE_SIZE", "0")
+            )
+            self.model_memory_bytes = (
+                float(current_app.config.get("MODEL_MEMORY_MB", "0")) * 1024 * 1024
+            )
+            self.full_retrain_freq = float(
+                current_app.config.get("RECOMMENDATION_FULL_RETRAIN_FREQ", "0")
+            )
         self.time_stamp = datetime.now().strftime("%d-%b-%Y (%H:%M:%S)")
         if self.models_path not in nltk.data.path:
             nltk.data.path.append(self.models_path)
 
-    def fetch_data(self) -> dict:
+    def fetch_data(self, telemetry=None) -> dict:
         """
         This method fetches data from Totara
 
-        :return: A dictionary that contains data content with relevant keys
+        :param telemetry: Where the download and the parsing of the data of each tenant
+            are timed, defaults to None
+        :type telemetry: TrainTelemetry, optional
+        :return: A dictionary that contains data content with relevant keys. The
+            `fingerprint_{tenant}` key of each tenant holds the fingerprint of its
+            data, which is not parsed when it is the fingerprint of the tenant's
+            previous model
         :rtype: dict
         """
+        telemetry = telemetry or TrainTelemetry()
         training_data = {"data_status": "success"}
         files_fetcher = TotaraFiles(
             totara_url=self.totara_url, totara_key=self.totara_key
         )
-        tenants_download = files_fetcher.download(filename="tenants.csv")
+        with telemetry.stage(name="download"):
+            tenants_download = files_fetcher.download(filename="tenants.csv")
         if tenants_download["status"] == "success":
             tenants = pd.read_csv(
                 filepath_or_buffer=io.StringIO(
@@ -76,94 +108,187 @@ class TrainRecommenderModel:
             )
             training_data["tenants"] = tenants
             for tenant in tenants.tenants.tolist():
-                interactions_download = files_fetcher.download(
-                    filename=f"user_interactions_{tenant}.csv"
-                )
-                user_data_download = files_fetcher.download(
-                    filename=f"user_data_{tenant}.csv"
-                )
-                item_data_download = files_fetcher.download(
-                    filename=f"item_data_{tenant}.csv"
-                )
+                tenant_telemetry = telemetry.for_tenant(tenant=tenant)
+                with tenant_telemetry.stage(name="download") as details:
+                    interactions_download = files_fetcher.download(
+                        filename=f"user_interactions_{tenant}.csv"
+                    )
+                    user_data_download = files_fetcher.download(
+                        filename=f"user_data_{tenant}.csv"
+                    )
+                    item_data_download = files_fetcher.download(
+                        filename=f"item_data_{tenant}.csv"
+                    )
+                    details["bytes"] = sum(
+                        len(x["content"]) if isinstance(x["content"], bytes) else 0
+                        for x in [
+                            interactions_download,
+                            user_data_download,
+                            item_data_download,
+                        ]
+                    )
                 if (
                     interactions_download["status"] == "success"
                     and user_data_download["status"] == "success"
                     and item_data_download["status"] == "success"
                 ):
-                    training_data[f"user_interactions_{tenant}"] = pd.read_csv(
-                        filepath_or_buffer=io.StringIO(
-                            interactions_download["content"].decode(encoding="utf-8")
-                        ),
-                        sep=",",
-                        encoding="utf-8",
-                    )
-                    training_data[f"user_interactions_{tenant}"][
-                        "user_id"
-                    ] = training_data[f"user_interactions_{tenant}"]["user_id"].astype(
-                        str
-                    )
-                    training_data[f"user_data_{tenant}"] = pd.read_csv(
-                        filepath_or_buffer=io.StringIO(
-                            user_data_download["content"].decode(encoding="utf-8")
-                        ),
-                        sep=",",
-                        encoding="utf-8",
-                        index_col="user_id",
-                    )
-                    training_data[f"user_data_{tenant}"].index = training_data[
-                        f"user_data_{tenant}"
-                    ].index.map(str)
-                    training_data[f"item_data_{tenant}"] = pd.read_csv(
-                        filepath_or_buffer=io.StringIO(
-                            item_data_download["content"].decode(encoding="utf-8")
-                        ),
-                        sep=",",
-                        encoding="utf-8",
-                        index_col="item_id",
+                    fingerprint = self.fingerprint(
+                        contents=[
+                            interactions_download["content"],
+                            user_data_download["content"],
+                            item_data_download["content"],
+                        ]
                     )
+                    training_data[f"fingerprint_{tenant}"] = fingerprint
+                    if fingerprint == self.previous_fingerprint(tenant=tenant):
+                        # The previous model of the tenant is kept as it is, so its
+                        # data does not need to be parsed
+                        continue
+                    with tenant_telemetry.stage(name="parse"):
+                        training_data[f"user_interactions_{tenant}"] = pd.read_csv(
+                            filepath_or_buffer=io.StringIO(
+                                interactions_download["content"].decode(
+                                    encoding="utf-8"
+                                )
+                            ),
+                            sep=",",
+                            encoding="utf-8",
+                        )
+                        training_data[f"user_interactions_{tenant}"][
+                            "user_id"
+                        ] = training_data[f"user_interactions_{tenant}"][
+                            "user_id"
+                        ].astype(
+                            str
+                        )
+                        training_data[f"user_data_{tenant}"] = pd.read_csv(
+                            filepath_or_buffer=io.StringIO(
+                                user_data_download["content"].decode(encoding="utf-8")
+                            ),
+                            sep=",",
+                            encoding="utf-8",
+                            index_col="user_id",
+                        )
+                        training_data[f"user_data_{tenant}"].index = training_data[
+                            f"user_data_{tenant}"
+                        ].index.map(str)
+                        training_data[f"item_data_{tenant}"] = pd.read_csv(
+                            filepath_or_buffer=io.StringIO(
+                                item_data_download["content"].decode(encoding="utf-8")
+                            ),
+                            sep=",",
+                            encoding="utf-8",
+                            index_col="item_id",
+                        )
                 else:
                     training_data["data_status"] = "fail"
         else:
             training_data["data_status"] = "fail"
         return training_data
 
+    def fingerprint(self, contents):
+        """
+        To compute the fingerprint of a tenant's exported data, i.e., its interactions,
+        user data and item data, together with the algorithm its model is trained with
+
+        :param contents: The contents of the tenant's exported files
+        :type contents: list
+        :return: The SHA-256 hex digest of the algorithm and the contents
+        :rtype: str
+        """
+        digest = hashlib.sha256(str(self.algorithm).encode("utf-8"))
+        for content in contents:
+            # The length of each content is hashed so that moving bytes from one
+            # file to the next changes the fingerprint
+            digest.update(len(content).to_bytes(length=8, byteorder="big"))
+            digest.update(content)
+        return digest.hexdigest()
+
+    def previous_fingerprint(self, tenant):
+        """
+        To find the fingerprint of the data the tenant's served model was trained on
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: The fingerprint, or None when the tenant has no model or its model has
+            no fingerprint
+        :rtype: str
+        """
+        served = self.application.recommender
+        if served is None or tenant not in served:
+            return None
+        if isinstance(served, TenantModels):
+            return served.fingerprint(tenant=tenant)
+        return served[tenant].get("fingerprint")
+
+    def previous_model(self, tenant):
+        """
+        To read a tenant's model from the models served when the training started, to
+        be kept when the tenant's data has not changed or to be updated incrementally.
+        The tenant is read from the disk without being loaded into the served models
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: The tenant's model, or None when there is none
+        :rtype: dict
+        """
+        served = self.application.recommender
+        if served is None or tenant not in served:
+            return None
+        if isinstance(served, TenantModels):
+            return served.load_tenant(tenant=tenant)[0]
+        return served[tenant]
+
     def train_model(self) -> None:
         """
         This method uses the data fetched from totara and trains recommendation models
         for all tenants
         """
-        training_data = self.fetch_data()
+        telemetry = TrainTelemetry()
+        training_data = self.fetch_data(telemetry=telemetry)
         if training_data["data_status"] == "success":
             # In case data fetch was a success
             trainer = TrainRecommender(
-                data=training_data, query=self.algorithm, num_threads=self.num_threads
+                data=training_data,
+                query=self.algorithm,
+                num_threads=self.num_threads,
+                telemetry=telemetry,
+                previous_model=self.previous_model,
+                full_retrain_freq=self.full_retrain_freq,
+                workers=self.train_workers,
             )
             models = trainer.train_models()
             models["algorithm"] = self.algorithm
 
-            # Add models to service cache
-            self.application.recommender = models
-
-            # Write models to hard disk so they can be reloaded in case of service
-            # crashing
-            if self.models_path:
-                recommender_model_dir_path = os.path.join(
-                    self.models_path, "recommender"
+            # Prepare the data reused at serving time and the recommendations
+            # precomputed for the next requests
+            prepared = PrepareServing(store_size=self.store_size).prepare_models(
+                models=models, telemetry=telemetry
+            )
+            if self.model_artifacts is not None:
+                # Write models to hard disk so they can be reloaded in case of service
+                # crashing, and serve them mapped from there
+                version = self.model_artifacts.save(
+                    models=prepared, telemetry=telemetry
                 )
-                recommender_model_path = os.path.join(
-                    recommender_model_dir_path, "recommender_model.sav"
+                prepared = self.model_artifacts.load(
+                    store_size=self.store_size, max_bytes=self.model_memory_bytes
                 )
-                if not os.path.isdir(recommender_model_dir_path):
-                    os.mkdir(path=recommender_model_dir_path)
-                    with open(file=recommender_model_path, mode="wb") as handle:
-                        pickle.dump(
-                            obj=models, file=handle, protocol=pickle.HIGHEST_PROTOCOL
-                        )
-                else:
-                    with open(file=recommender_model_path, mode="wb") as handle:
-                        pickle.dump(
-                            obj=models, file=handle, protocol=pickle.HIGHEST_PROTOCOL
-                        )
+                # Load the tenants most recently requested from the served models
+                # before serving the new ones
+                served = self.application.recommender
+                if self.warm_up:
+                    prepared.warm_up(
+                        priority=served.recently_requested()
+                        if isinstance(served, TenantModels)
+                        else ()
+                    )
+                self.application.models_version = version
+
+            # Add models to service cache
+            self.application.recommender = prepared
+            # Drop the responses computed from the replaced models
+            self.application.response_cache.new_generation()
 
             # Gather list of logging parameters
             summary_list = []
@@ -216,34 +341,25 @@ class TrainRecommenderModel:
                 }
             ]
 
-        # Write training logs to the file
-        summaries_log_exists = os.path.exists(
-            os.path.join(self.logs_path, "train_summary.log")
-        )
-        if summaries_log_exists:
-            log_summaries = pd.read_csv(
-                os.path.join(self.logs_path, "train_summary.log"),
-                sep=",",
-                dtype={
-                    "TIMESTAMP": str,
-                    "ALGORITHM": str,
-                    "TENANT_ID": str,
-                    "MSG": str,
-                    "EPOCHS": str,
-                    "N_EMBEDDINGS": str,
-                    "SCORE": str,
-                },
-            )
-            log_summaries = log_summaries.append(
-                other=pd.DataFrame(data=summary_list), ignore_index=True
-            ).tail(100)
-        else:
-            log_summaries = pd.DataFrame(data=summary_list)
-
-        log_summaries.to_csv(
-            os.path.join(self.logs_path, "train_summary.log"),
-            sep=",",
-            header=True,
-            index=False,
-            mode="w",
-        )
+        # Append the training logs to the file
+        log_file = os.path.join(self.logs_path, "train_summary.log")
+        fieldnames = [
+            "TIMESTAMP",
+            "ALGORITHM",
+            "TENANT_ID",
+            "MSG",
+            "EPOCHS",
+            "N_EMBEDDINGS",
+            "SCORE",
+        ]
+        if os.path.exists(log_file) and os.path.getsize(log_file) > 1024 * 1024:
+            os.replace(log_file, f"{log_file}.1")
+        write_header = not os.path.exists(log_file)
+        with open(file=log_file, mode="a", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(f=handle, fieldnames=fieldnames)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(summary_list)
+
+        # Append the timing of each stage of the training to the telemetry log
+        telemetry.write(logs_dir=self.logs_path)
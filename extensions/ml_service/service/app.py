@@ -17,67 +17,222 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 import os
+import threading
 from datetime import datetime, timezone
-from flask import Flask, jsonify, make_response
+from flask import Flask, jsonify, make_response, request
 from flask_apscheduler import APScheduler
-import pickle
 
 import service.settings as settings
 from service.api.train_recommender_model import TrainRecommenderModel
 from service.api.middleware.authentication import AuthenticationMiddleware
+from service.api.response_cache import ResponseCache
+from service.api.service_metrics import ServiceMetrics, StageTimer
 from service.api.route.favicon import Favicon
 from service.api.route.home_page import HomePage
+from service.api.route.metrics import Metrics
+from service.api.route.request_batch_similar_items import RequestBatchSimilarItems
+from service.api.route.request_batch_user_items import RequestBatchUserItems
 from service.api.route.request_similar_items import RequestSimilarItems
 from service.api.route.request_user_items import RequestUserItems
-from service.api.route.health_check import HealthCheck
+from service.api.route.health_check import HealthCheck, HealthProber
+from service.api.route.readiness import Readiness
+from service.recommender.model_artifacts import ModelArtifacts, TenantModels
 
 
-def create_app():
+def reload_models(app, model_artifacts, warm_up=True):
+    """
+    Loads the saved models into the service, if they are newer than the ones it serves
+
+    :param app: The Flask object
+    :type app: Flask
+    :param model_artifacts: The saved models
+    :type model_artifacts: ModelArtifacts
+    :param warm_up: Whether to load the tenant models before serving them, starting
+        from the tenants most recently requested from the served models, defaults to
+        True
+    :type warm_up: bool, optional
+    """
+    version = model_artifacts.version()
+    if version is not None and version != app.models_version:
+        models = model_artifacts.load(
+            store_size=app.config.get("RECOMMENDATION_STORE_SIZE"),
+            max_bytes=float(app.config.get("MODEL_MEMORY_MB", "0")) * 1024 * 1024,
+        )
+        if warm_up:
+            served = app.recommender
+            models.warm_up(
+                priority=served.recently_requested()
+                if isinstance(served, TenantModels)
+                else ()
+            )
+        app.recommender = models
+        app.models_version = version
+        app.response_cache.new_generation()
+
+
+def load_models(app, model_artifacts, legacy_model_path=None, warm_up=True):
+    """
+    Loads the saved models into the service when it starts, converting the ones saved
+    by the earlier versions first. The models are served as soon as the list of their
+    tenants is read, while the tenant models are warmed up
+
+    :param app: The Flask object
+    :type app: Flask
+    :param model_artifacts: The saved models
+    :type model_artifacts: ModelArtifacts
+    :param legacy_model_path: The path of the models saved by the earlier versions,
+        defaults to None
+    :type legacy_model_path: str, optional
+    :param warm_up: Whether to warm up the tenant models, defaults to True
+    :type warm_up: bool, optional
+    """
+    if (
+        legacy_model_path is not None
+        and model_artifacts.version() is None
+        and os.path.isfile(legacy_model_path)
+    ):
+        model_artifacts.convert(
+            model_path=legacy_model_path,
+            store_size=app.config.get("RECOMMENDATION_STORE_SIZE"),
+        )
+    reload_models(app=app, model_artifacts=model_artifacts, warm_up=False)
+    if warm_up and isinstance(app.recommender, TenantModels):
+        app.recommender.warm_up()
+
+
+def track_requests(app):
+    """
+    Records the requests served by the application in its metrics, with a timer of
+    their stages kept in their environ
+
+    :param app: The Flask object
+    :type app: Flask
+    """
+
+    @app.before_request
+    def start_timer():
+        request.environ[StageTimer.environ_key] = StageTimer()
+        app.metrics.request_started()
+
+    @app.after_request
+    def keep_status(response):
+        request.environ["ml_service.status"] = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(error):
+        timer = request.environ.get(StageTimer.environ_key)
+        if timer is None:
+            return
+        app.metrics.request_finished(
+            endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+            status=request.environ.get("ml_service.status", 500),
+            timer=timer,
+            auth_seconds=request.environ.get(AuthenticationMiddleware.seconds_key),
+        )
+
+
+def create_app(role="standalone"):
     """
     Creates the Totara ML Service
 
+    :param role: One of 'standalone' (the service loads, trains and serves the
+        models), 'trainer' (the service trains and saves the models for the workers,
+        but does not serve them), or 'worker' (the service serves the models saved by
+        the trainer and reloads them once retrained), defaults to 'standalone'
+    :type role: str, optional
     :return: Totara ML Service object
     :rtype: Flask.app
     """
     app_run_mode = str(os.environ.get("FLASK_ENV", "Production")).strip()
     app = Flask(__name__)
     app.config.from_object(getattr(settings, app_run_mode.title()))
-    app.wsgi_app = AuthenticationMiddleware(app.wsgi_app, app.config)
-    recommender_model_path = os.path.join(
-        os.path.join(app.config.get("MODELS_DIR"), "recommender"),
-        "recommender_model.sav",
+    app.metrics = ServiceMetrics()
+    app.wsgi_app = AuthenticationMiddleware(
+        app.wsgi_app, app.config, metrics=app.metrics
+    )
+    track_requests(app=app)
+    app.health_prober = HealthProber(
+        app=app, interval=app.config.get("HEALTH_PROBE_INTERVAL")
+    )
+    app.response_cache = ResponseCache(
+        max_bytes=float(app.config.get("RESPONSE_CACHE_MB")) * 1024 * 1024,
+        ttl=app.config.get("RESPONSE_CACHE_TTL"),
     )
-    if os.path.isfile(recommender_model_path):
-        with open(file=recommender_model_path, mode="rb") as handle:
-            app.recommender = pickle.load(file=handle)
+    recommender_dir_path = os.path.join(app.config.get("MODELS_DIR"), "recommender")
+    model_artifacts = ModelArtifacts(
+        directory=os.path.join(recommender_dir_path, "artifacts")
+    )
+    legacy_model_path = os.path.join(recommender_dir_path, "recommender_model.sav")
+    app.recommender = None
+    app.models_version = None
+    # The service starts listening before the models are loaded, and the endpoints
+    # respond that the models are not ready yet meanwhile
+    loading_kwargs = {
+        "app": app,
+        "model_artifacts": model_artifacts,
+        "legacy_model_path": None if role == "worker" else legacy_model_path,
+        "warm_up": role != "trainer",
+    }
+    if app.config.get("TESTING"):
+        load_models(**loading_kwargs)
     else:
-        app.recommender = None
+        threading.Thread(
+            target=load_models, kwargs=loading_kwargs, name="models-loader", daemon=True
+        ).start()
 
     if not app.config.get("TESTING"):
         scheduler = APScheduler()
         scheduler.init_app(app)
         scheduler.start()
 
-        recommendation_retrain_freq = app.config.get("RECOMMENDATION_RETRAIN_FREQ")
-
-        trainer = TrainRecommenderModel(application=app)
-
-        if os.path.isfile(recommender_model_path):
+        if app.health_prober.interval > 0:
+            # Check the health of the service in the background, so that the health
+            # checks are answered without waiting for Totara
             scheduler.add_job(
-                id="RECOMMENDER_SCHEDULED_TRAIN_TASK",
-                func=trainer.train_model,
+                id="HEALTH_PROBE_TASK",
+                func=app.health_prober.refresh,
                 trigger="interval",
-                minutes=int(recommendation_retrain_freq),
+                seconds=app.health_prober.interval,
+                next_run_time=datetime.now(tz=timezone.utc),
             )
-        else:
+            app.health_prober.start()
+
+        if role == "worker":
             scheduler.add_job(
-                id="RECOMMENDER_SCHEDULED_TRAIN_TASK",
-                func=trainer.train_model,
+                id="RECOMMENDER_MODELS_RELOAD_TASK",
+                func=reload_models,
+                kwargs={"app": app, "model_artifacts": model_artifacts},
                 trigger="interval",
-                minutes=int(recommendation_retrain_freq),
-                next_run_time=datetime.now(tz=timezone.utc),
+                seconds=int(app.config.get("RELOAD_INTERVAL")),
+            )
+        else:
+            recommendation_retrain_freq = app.config.get("RECOMMENDATION_RETRAIN_FREQ")
+
+            trainer = TrainRecommenderModel(
+                application=app,
+                model_artifacts=model_artifacts,
+                warm_up=role != "trainer",
             )
 
+            if model_artifacts.version() is not None or os.path.isfile(
+                legacy_model_path
+            ):
+                scheduler.add_job(
+                    id="RECOMMENDER_SCHEDULED_TRAIN_TASK",
+                    func=trainer.train_model,
+                    trigger="interval",
+                    minutes=int(recommendation_retrain_freq),
+                )
+            else:
+                scheduler.add_job(
+                    id="RECOMMENDER_SCHEDULED_TRAIN_TASK",
+                    func=trainer.train_model,
+                    trigger="interval",
+                    minutes=int(recommendation_retrain_freq),
+                    next_run_time=datetime.now(tz=timezone.utc),
+                )
+
     app.add_url_rule(
         rule="/favicon.ico", endpoint=None, view_func=Favicon.as_view(name="icon")
     )
@@ -114,14 +269,34 @@ def create_app():
         endpoint=None,
         view_func=RequestSimilarItems.as_view(name="s_items"),
     )
+    app.add_url_rule(
+        rule="/batch-similar-items",
+        endpoint=None,
+        view_func=RequestBatchSimilarItems.as_view(name="batch_s_items"),
+    )
     app.add_url_rule(
         rule="/user-items",
         endpoint=None,
         view_func=RequestUserItems.as_view(name="user_items"),
     )
+    app.add_url_rule(
+        rule="/batch-user-items",
+        endpoint=None,
+        view_func=RequestBatchUserItems.as_view(name="batch_user_items"),
+    )
     app.add_url_rule(
         rule="/health-check",
         endpoint=None,
         view_func=HealthCheck.as_view(name="health_check"),
     )
+    app.add_url_rule(
+        rule="/ready",
+        endpoint=None,
+        view_func=Readiness.as_view(name="ready"),
+    )
+    app.add_url_rule(
+        rule="/metrics",
+        endpoint=None,
+        view_func=Metrics.as_view(name="metrics"),
+    )
     return app
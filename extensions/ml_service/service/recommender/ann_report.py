@@ -0,0 +1,184 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from service.recommender.model_artifacts import ModelArtifacts
+from service.recommender.predict_subroutines.ivf_index import IVFIndex
+from service.recommender.predict_subroutines.similar_items import SimilarItems
+
+
+class ANNReport:
+    """
+    To measure the recall and the latency of the approximate nearest neighbour index of
+    the similar items against the exact scan, so that the index settings can be chosen
+    for a catalog
+    """
+
+    def __init__(self, unit_embeddings, k=10, n_queries=200, seed=42):
+        """
+        Class constructor method
+
+        :param unit_embeddings: The unit length item representations of shape
+            `[n_items, num_components]`
+        :type unit_embeddings: np.float32 array
+        :param k: The number of similar items requested for each query, defaults to 10
+        :type k: int, optional
+        :param n_queries: The number of randomly chosen items whose similar items are
+            searched for, defaults to 200
+        :type n_queries: int, optional
+        :param seed: The seed of the random choice of the queries, defaults to 42
+        :type seed: int, optional
+        """
+        self.unit_embeddings = unit_embeddings
+        self.k = k
+        rng = np.random.default_rng(seed=seed)
+        self.queries = rng.choice(
+            unit_embeddings.shape[0],
+            size=min(n_queries, unit_embeddings.shape[0]),
+            replace=False,
+        )
+        self.item_ids = np.arange(unit_embeddings.shape[0])
+
+    def search(self, ann_index=None):
+        """
+        To find the similar items of each of the queries, one query at a time as done at
+        the `/similar-items` endpoint
+
+        :param ann_index: The index to search in, or None for the exact scan, defaults
+            to None
+        :type ann_index: IVFIndex, optional
+        :return: A tuple of the similar items of each query and the mean latency of a
+            query in milliseconds
+        :rtype: tuple
+        """
+        similar_items = SimilarItems(
+            num_items=self.k,
+            unit_embeddings=self.unit_embeddings,
+            item_ids=self.item_ids,
+            ann_index=ann_index,
+        )
+        found = []
+        start = time.perf_counter()
+        for internal_id in self.queries:
+            candidates, __ = similar_items.top_similar(internal_id=internal_id)
+            found.append(candidates)
+        latency = (time.perf_counter() - start) * 1000 / max(len(self.queries), 1)
+        return found, latency
+
+    def run(self, n_lists_options=(None,), n_probes=(1, 2, 4, 8, 16, 32)):
+        """
+        To build an index for each number of clusters and measure each number of the
+        probed clusters against the exact scan
+
+        :param n_lists_options: The numbers of clusters to build the index with. None
+            stands for the default number, defaults to (None,)
+        :type n_lists_options: tuple, optional
+        :param n_probes: The numbers of the probed clusters, defaults to
+            (1, 2, 4, 8, 16, 32)
+        :type n_probes: tuple, optional
+        :return: A list with a dictionary for each setting, with the keys `n_lists`,
+            `n_probe`, `recall` (the mean recall@k), `ann_ms` and `exact_ms` (the mean
+            latency of a query in milliseconds with and without the index)
+        :rtype: list
+        """
+        exact, exact_ms = self.search()
+        rows = []
+        for n_lists in n_lists_options:
+            ann_index = IVFIndex.build(
+                unit_embeddings=self.unit_embeddings, n_lists=n_lists
+            )
+            for n_probe in n_probes:
+                ann_index.n_probe = n_probe
+                approximate, ann_ms = self.search(ann_index=ann_index)
+                recall = np.mean(
+                    [
+                        np.intersect1d(x, y).shape[0] / max(y.shape[0], 1)
+                        for x, y in zip(approximate, exact)
+                    ]
+                )
+                rows.append(
+                    {
+                        "n_lists": ann_index.centroids.shape[0],
+                        "n_probe": n_probe,
+                        "recall": float(recall),
+                        "ann_ms": ann_ms,
+                        "exact_ms": exact_ms,
+                    }
+                )
+        return rows
+
+
+def main():
+    """
+    To print the recall@k vs latency report of the tenants in the saved recommender
+    models, e.g., `python -m service.recommender.ann_report --models-dir data/models`
+    """
+    parser = argparse.ArgumentParser(
+        description="Recall@k vs latency of the similar items index"
+    )
+    parser.add_argument(
+        "--models-dir", default=os.environ.get("ML_MODELS_DIR", "data/models")
+    )
+    parser.add_argument("--tenant", action="append")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-queries", type=int, default=200)
+    parser.add_argument("--n-lists", type=int, action="append")
+    parser.add_argument(
+        "--n-probe", type=int, action="append", default=None, dest="n_probes"
+    )
+    args = parser.parse_args()
+
+    models = ModelArtifacts(
+        directory=os.path.join(args.models_dir, "recommender", "artifacts")
+    ).load()
+    if models is None:
+        parser.error(f"No saved models were found in {args.models_dir}")
+
+    print("tenant\tn_items\tn_lists\tn_probe\trecall@k\tann_ms\texact_ms")
+    for tenant in models:
+        if args.tenant and tenant not in args.tenant:
+            continue
+        tenant_model = models[tenant]
+        if not isinstance(tenant_model, dict) or tenant_model.get("msg") != "success":
+            continue
+        __, item_embeddings = tenant_model["model"].get_item_representations(
+            features=tenant_model["item_features"]
+        )
+        report = ANNReport(
+            unit_embeddings=SimilarItems.normalise(embeddings=item_embeddings),
+            k=args.k,
+            n_queries=args.n_queries,
+        )
+        for row in report.run(
+            n_lists_options=tuple(args.n_lists or (None,)),
+            n_probes=tuple(args.n_probes or (1, 2, 4, 8, 16, 32)),
+        ):
+            print(
+                f"{tenant}\t{item_embeddings.shape[0]}\t{row['n_lists']}\t"
+                f"{row['n_probe']}\t{row['recall']:.4f}\t{row['ann_ms']:.3f}\t"
+                f"{row['exact_ms']:.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -58,11 +58,38 @@ conf = {
     ),
     # The bounds of `epochs` and `n_components` hyper-parameters
     "bounds": {"epochs": (1, 20), "n_components": (25, 100)},
+    # The search of the hyper-parameters, either "halving" or "annealing"
+    "hyperparams_search": "halving",
+    # The successive halving of the hyper-parameters trains a model for each of
+    # `n_candidates` numbers of components, scores it at numbers of epochs growing by a
+    # factor of `eta`, and keeps training the best `1 / eta` of them only
+    "halving": {"n_candidates": 8, "eta": 2},
+    # The simulated annealing of the hyper-parameters evaluates about `n_iterations`
+    # candidates. Each step proposes `batch_size` candidates from the current point,
+    # which are evaluated at the same time with a share of the training threads each
+    "annealing": {"n_iterations": 30, "step_size": 0.2, "temp": 5, "batch_size": 4},
     # The values of user and item alpha while training the model
     "user_alpha": 1e-3,
     "item_alpha": 1e-3,
     # Number of words to be encoded in a content
     "words_length": 128,
+    # The maximum number of users or items that can be requested at once from the
+    # batch endpoints, and the number of them scored together in one matrix product
+    "batch": {"max_size": 1000, "block_size": 256},
+    # The approximate nearest neighbour index of the similar items is built for the
+    # tenants with at least `min_items` items. The items are clustered into `n_lists`
+    # clusters (four times the square root of the number of items when None), and the
+    # items of the `n_probe` clusters closest to an item are scored
+    "ann": {"min_items": 100000, "n_lists": None, "n_probe": 8},
+    # The maximum inner product search index of the items of a type is built for the
+    # types with at least `min_items` items of a tenant. For these, `/user-items` scores
+    # at least `n_candidates` items of the highest scores and as many of the lowest,
+    # retrieved from the `n_probe` closest of `n_lists` clusters, instead of all items
+    "mips": {"min_items": 100000, "n_candidates": 300, "n_lists": None, "n_probe": 32},
+    # The incremental updates of the models continue the training of the previous
+    # model for `epochs` epochs. A tenant is trained from scratch instead when more than
+    # `max_new_share` of its users, items or features are new to the previous model
+    "incremental": {"epochs": 3, "max_new_share": 0.2},
 }
 
 
@@ -22,6 +22,7 @@ from scipy.sparse import csr_matrix, coo_matrix, hstack
 
 from service.recommender.data_subroutines.text_encoder import TextEncoder
 from service.recommender.config import Config
+from service.recommender.train_telemetry import TrainTelemetry
 
 
 class DataLoader:
@@ -31,7 +32,7 @@ class DataLoader:
     LightFM model class.
     """
 
-    def __init__(self, query="mf"):
+    def __init__(self, query="mf", telemetry=None):
         """
         Class constructor method
 
@@ -40,9 +41,13 @@ class DataLoader:
             with text processing). The data preparation/processing depends on this
             parameter, defaults to 'mf'
         :type query: str, optional
+        :param telemetry: Where the stages of the data preparation are timed, defaults
+            to None
+        :type telemetry: TrainTelemetry, optional
         """
         cfg = Config()
         self.query = query
+        self.telemetry = telemetry or TrainTelemetry()
         self.users_spread_hor = cfg.get_property("spread_hor")["users"]
         self.users_spread_dict = cfg.get_property("expand_dict")["users"]
         self.users_concat = cfg.get_property("concat")["users"]
@@ -138,8 +143,9 @@ class DataLoader:
         if self.query == "hybrid":
             text_docs = items_data.document.tolist()
 
-            text_encoder = TextEncoder()
-            embeddings_result = text_encoder.encode_documents(documents=text_docs)
+            with self.telemetry.stage(name="encode_item_text"):
+                text_encoder = TextEncoder()
+                embeddings_result = text_encoder.encode_documents(documents=text_docs)
             embeddings = embeddings_result["vectors"]
             features = embeddings_result["features"]
 
@@ -220,8 +226,9 @@ class DataLoader:
             )
 
             text_docs = users_data.document.tolist()
-            text_encoder = TextEncoder()
-            embeddings_result = text_encoder.encode_documents(documents=text_docs)
+            with self.telemetry.stage(name="encode_user_text"):
+                text_encoder = TextEncoder()
+                embeddings_result = text_encoder.encode_documents(documents=text_docs)
             embeddings = embeddings_result["vectors"]
             features = embeddings_result["features"]
 
@@ -375,13 +382,18 @@ class DataLoader:
             | **item_type_map:** a dictionary of item types.
         :rtype: dict
         """
-        users_processed_data = self.users_csr(users_data=users_data)
-        items_processed_data = self.items_csr(items_data=items_data)
-        interactions = self.interactions_coo(
-            interactions_df=interactions_df,
-            user_map=users_processed_data["user_map"],
-            item_map=items_processed_data["item_map"],
-        )
+        with self.telemetry.stage(name="load_users", n_users=users_data.shape[0]):
+            users_processed_data = self.users_csr(users_data=users_data)
+        with self.telemetry.stage(name="load_items", n_items=items_data.shape[0]):
+            items_processed_data = self.items_csr(items_data=items_data)
+        with self.telemetry.stage(
+            name="load_interactions", n_interactions=interactions_df.shape[0]
+        ):
+            interactions = self.interactions_coo(
+                interactions_df=interactions_df,
+                user_map=users_processed_data["user_map"],
+                item_map=items_processed_data["item_map"],
+            )
 
         mappings = (
             users_processed_data["user_map"],
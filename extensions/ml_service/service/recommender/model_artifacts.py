@@ -0,0 +1,706 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from urllib.parse import quote
+
+import numpy as np
+from lightfm import LightFM
+
+from service.recommender.prepare_serving import PrepareServing
+from service.recommender.train_telemetry import TrainTelemetry
+
+FORMAT_VERSION = 1
+
+
+class TenantNotReadyError(Exception):
+    """
+    Raised when a tenant's model is requested while the models are being warmed up and
+    the tenant's model is not loaded yet
+    """
+
+
+class ArraysPickler(pickle.Pickler):
+    """
+    Pickles a tenant model with its arrays and id maps written to `.npy` files instead
+    of the pickle, so that they can be mapped into memory when the model is loaded
+    """
+
+    def __init__(self, file, arrays_directory):
+        """
+        Class constructor method
+
+        :param file: The file the pickle is written to
+        :type file: file object
+        :param arrays_directory: The directory the `.npy` files are written to
+        :type arrays_directory: str
+        """
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays_directory = arrays_directory
+        self.arrays = {}
+        # The ids of the objects already written, with the objects kept alive so that
+        # their ids are not reused
+        self.written = {}
+        # The ids of the arrays of the LightFM models, which are mapped copy on write
+        self.copy_on_write = set()
+
+    def save_array(self, array):
+        """
+        To write an array to its own `.npy` file
+
+        :param array: A numeric or unicode array
+        :type array: np.ndarray
+        :return: The name of the file
+        :rtype: str
+        """
+        name = f"{len(self.arrays)}.npy"
+        np.save(
+            file=os.path.join(self.arrays_directory, name),
+            arr=array,
+            allow_pickle=False,
+        )
+        self.arrays[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "bytes": int(array.nbytes),
+        }
+        return name
+
+    @staticmethod
+    def as_unicode(array):
+        """
+        To convert an object array of strings, e.g., Totara ids, into a unicode array
+
+        :param array: An object array
+        :type array: np.ndarray
+        :return: The unicode array, or None when not all the elements are strings
+        :rtype: np.ndarray
+        """
+        values = array.ravel().tolist()
+        if not values or not all(type(value) is str for value in values):
+            return None
+        return np.array(values, dtype=str).reshape(array.shape)
+
+    @staticmethod
+    def is_id_map(obj):
+        """
+        To check if an object is an id map, i.e., a dictionary from string ids to
+        integer internal ids
+
+        :param obj: The object to check
+        :type obj: object
+        :return: True if `obj` is an id map
+        :rtype: bool
+        """
+        return (
+            type(obj) is dict
+            and len(obj) > 0
+            and all(type(key) is str for key in obj)
+            and all(type(value) is int for value in obj.values())
+        )
+
+    def persistent_id(self, obj):
+        """
+        This overrides the `persistent_id` method of the parent class to write the
+        numeric arrays, the object arrays of strings and the id maps to `.npy` files.
+        The arrays of a LightFM model are marked to be mapped copy on write, as LightFM
+        does not accept read only arrays, even to predict
+
+        :param obj: The object being pickled
+        :type obj: object
+        :return: A tuple of the kind of the object and the names of its files, or None
+            to pickle `obj` as usual
+        :rtype: tuple
+        """
+        if id(obj) in self.written:
+            return self.written[id(obj)][1]
+        pid = None
+        if isinstance(obj, LightFM):
+            self.copy_on_write.update(
+                id(value)
+                for value in vars(obj).values()
+                if isinstance(value, np.ndarray)
+            )
+        elif isinstance(obj, np.ndarray) and type(obj) in (np.ndarray, np.memmap):
+            if obj.dtype != object and id(obj) in self.copy_on_write:
+                pid = "copy_on_write_array", self.save_array(array=obj)
+            elif obj.dtype != object:
+                pid = "array", self.save_array(array=obj)
+            else:
+                unicode_array = self.as_unicode(array=obj)
+                if unicode_array is not None:
+                    pid = "object_array", self.save_array(array=unicode_array)
+        elif self.is_id_map(obj=obj):
+            pid = (
+                "id_map",
+                self.save_array(array=np.array(list(obj.keys()), dtype=str)),
+                self.save_array(array=np.fromiter(obj.values(), dtype=np.int64)),
+            )
+        if pid is not None:
+            self.written[id(obj)] = (obj, pid)
+        return pid
+
+
+class ArraysUnpickler(pickle.Unpickler):
+    """
+    Unpickles a tenant model written by `ArraysPickler`, with its arrays mapped into
+    memory read only, except the arrays of the LightFM models that are mapped copy on
+    write
+    """
+
+    def __init__(self, file, arrays_directory):
+        """
+        Class constructor method
+
+        :param file: The file the pickle is read from
+        :type file: file object
+        :param arrays_directory: The directory of the `.npy` files
+        :type arrays_directory: str
+        """
+        super().__init__(file)
+        self.arrays_directory = arrays_directory
+
+    def load_array(self, name, mmap_mode="r"):
+        """
+        To map an array into memory, read only by default
+
+        :param name: The name of the `.npy` file
+        :type name: str
+        :param mmap_mode: The mode of the mapping, 'r' for read only or 'c' for copy on
+            write, defaults to 'r'
+        :type mmap_mode: str, optional
+        :return: The array
+        :rtype: np.memmap
+        """
+        path = os.path.join(self.arrays_directory, name)
+        try:
+            return np.load(file=path, mmap_mode=mmap_mode, allow_pickle=False)
+        except ValueError:
+            # Empty arrays cannot be mapped into memory
+            return np.load(file=path, allow_pickle=False)
+
+    def persistent_load(self, pid):
+        """
+        This overrides the `persistent_load` method of the parent class to read the
+        objects written by `ArraysPickler.persistent_id`
+
+        :param pid: The tuple returned by `ArraysPickler.persistent_id`
+        :type pid: tuple
+        :return: The object
+        :rtype: object
+        """
+        kind, names = pid[0], pid[1:]
+        if kind == "array":
+            return self.load_array(name=names[0])
+        if kind == "copy_on_write_array":
+            return self.load_array(name=names[0], mmap_mode="c")
+        if kind == "object_array":
+            return self.load_array(name=names[0]).astype(object)
+        if kind == "id_map":
+            keys = self.load_array(name=names[0])
+            values = self.load_array(name=names[1])
+            return dict(zip(keys.tolist(), values.tolist()))
+        raise pickle.UnpicklingError(f"Unsupported persistent id {pid}")
+
+
+class TenantModels(Mapping):
+    """
+    A read only dictionary of the tenant models of a saved version of the recommender
+    models. A tenant's model is loaded from the disk the first time it is requested,
+    and the least recently requested tenant models are dropped from the memory once
+    the loaded ones exceed the memory budget. While the models are warmed up, the
+    tenants are loaded in the background and requesting a tenant that is not loaded
+    yet raises `TenantNotReadyError`
+    """
+
+    def __init__(self, directory, manifest, store_size=0, max_bytes=0):
+        """
+        Class constructor method
+
+        :param directory: The directory of the saved version of the models
+        :type directory: str
+        :param manifest: The manifest of the saved version of the models
+        :type manifest: dict
+        :param store_size: The depth of the recommendation stores to serve. The stores
+            of a tenant are rebuilt on loading when they were saved with another depth,
+            defaults to 0
+        :type store_size: int, optional
+        :param max_bytes: The approximate number of bytes the loaded tenant models may
+            take, with no limit when this is 0, defaults to 0
+        :type max_bytes: float, optional
+        """
+        self.directory = directory
+        self.manifest = manifest
+        self.store_size = int(store_size)
+        self.max_bytes = max_bytes
+        self.tenants = list(manifest["tenants"])
+        self.tenant_set = set(self.tenants)
+        # The loaded tenant models from the least to the most recently requested
+        self.loaded = OrderedDict()
+        self.sizes = {}
+        self.resident_bytes = 0
+        self.n_loads = 0
+        self.n_evictions = 0
+        self.lock = threading.Lock()
+        self.tenant_locks = {}
+        # The tenants left to load while the models are warmed up
+        self.warm_up_queue = None
+
+    def __getitem__(self, key):
+        if key == "algorithm":
+            return self.manifest["algorithm"]
+        if key not in self.tenant_set:
+            raise KeyError(key)
+        with self.lock:
+            tenant_model = self.loaded.get(key)
+            if tenant_model is not None:
+                self.loaded.move_to_end(key)
+                return tenant_model
+            if self.warm_up_queue is not None:
+                # Load the requested tenant next
+                if key in self.warm_up_queue:
+                    self.warm_up_queue.remove(key)
+                self.warm_up_queue.appendleft(key)
+                raise TenantNotReadyError(key)
+            tenant_lock = self.tenant_locks.setdefault(key, threading.Lock())
+
+        return self.load(tenant=key, tenant_lock=tenant_lock)
+
+    def __iter__(self):
+        yield from self.tenants
+        yield "algorithm"
+
+    def __len__(self):
+        return len(self.tenants) + 1
+
+    def __contains__(self, key):
+        return key == "algorithm" or key in self.tenant_set
+
+    def is_loaded(self, tenant):
+        """
+        To check if a tenant's model is loaded
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: True if the tenant's model is loaded
+        :rtype: bool
+        """
+        with self.lock:
+            return tenant in self.loaded
+
+    def recently_requested(self):
+        """
+        To list the loaded tenants from the most recently requested
+
+        :return: The tenant ids
+        :rtype: list
+        """
+        with self.lock:
+            return list(reversed(self.loaded))
+
+    def load(self, tenant, tenant_lock):
+        """
+        To load a tenant's model into the loaded ones, unless it has been loaded by
+        another thread meanwhile. Other tenants are served while this one is loaded,
+        and concurrent requests for this one wait for it to be loaded once
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :param tenant_lock: The lock of the tenant
+        :type tenant_lock: threading.Lock
+        :return: The tenant's model
+        :rtype: dict
+        """
+        with tenant_lock:
+            with self.lock:
+                tenant_model = self.loaded.get(tenant)
+            if tenant_model is None:
+                tenant_model, n_bytes = self.load_tenant(tenant=tenant)
+                with self.lock:
+                    self.loaded[tenant] = tenant_model
+                    self.sizes[tenant] = n_bytes
+                    self.resident_bytes += n_bytes
+                    self.n_loads += 1
+                    self.evict()
+        return tenant_model
+
+    def warm_up(self, priority=()):
+        """
+        To load the tenant models ahead of their requests, the `priority` ones first,
+        then the tenants requested meanwhile, then the others from the smallest. The
+        warm up stops once the next tenant would not fit in the memory budget, and
+        the tenants not loaded by then are loaded on their first request
+
+        :param priority: The tenants to load first, e.g., the ones most recently
+            requested from the previous models, defaults to ()
+        :type priority: iterable, optional
+        """
+        tenant_bytes = {x: self.tenant_bytes(tenant=x) for x in self.tenants}
+        priority = [x for x in dict.fromkeys(priority) if x in self.tenant_set]
+        others = sorted(
+            set(self.tenants) - set(priority), key=lambda x: (tenant_bytes[x], x)
+        )
+        with self.lock:
+            self.warm_up_queue = deque(priority + others)
+        warmed_up = []
+        try:
+            while True:
+                with self.lock:
+                    if not self.warm_up_queue:
+                        break
+                    tenant = self.warm_up_queue.popleft()
+                    if tenant in self.loaded:
+                        continue
+                    if (
+                        self.max_bytes
+                        and self.resident_bytes + tenant_bytes[tenant] > self.max_bytes
+                    ):
+                        break
+                    tenant_lock = self.tenant_locks.setdefault(tenant, threading.Lock())
+                self.load(tenant=tenant, tenant_lock=tenant_lock)
+                warmed_up.append(tenant)
+        finally:
+            with self.lock:
+                self.warm_up_queue = None
+                # The tenants loaded first are the last ones to evict
+                for tenant in reversed(warmed_up):
+                    if tenant in self.loaded:
+                        self.loaded.move_to_end(tenant)
+
+    def evict(self):
+        """
+        To drop the least recently requested tenant models until the loaded ones fit in
+        the memory budget. The most recently requested one is always kept. This must be
+        called with the lock held
+        """
+        while self.max_bytes and self.resident_bytes > self.max_bytes:
+            if len(self.loaded) <= 1:
+                break
+            tenant, __ = self.loaded.popitem(last=False)
+            self.resident_bytes -= self.sizes.pop(tenant)
+            self.n_evictions += 1
+
+    def stats(self):
+        """
+        To report the loading progress and the use of the memory budget
+
+        :return: The number of `tenants`, the number of `loaded` tenants, their
+            `resident_bytes`, the `max_bytes`, the numbers of `loads` and `evictions`
+            so far, and whether the models are `warming_up`
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "tenants": len(self.tenants),
+                "loaded": len(self.loaded),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "loads": self.n_loads,
+                "evictions": self.n_evictions,
+                "warming_up": self.warm_up_queue is not None,
+            }
+
+    def load_tenant(self, tenant):
+        """
+        To load a tenant's model from the disk
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: A tuple of the tenant's model, as prepared by
+            `PrepareServing.prepare_tenant`, and its approximate size in bytes
+        :rtype: tuple
+        """
+        directory = ModelArtifacts.tenant_directory(
+            directory=self.directory, tenant=tenant
+        )
+        tenant_model, tenant_manifest = ModelArtifacts.read_tenant(directory=directory)
+        if (
+            tenant_manifest["msg"] == "success"
+            and tenant_manifest["store_size"] != self.store_size
+        ):
+            tenant_model = PrepareServing(store_size=self.store_size).prepare_stores(
+                prepared=tenant_model
+            )
+        n_bytes = tenant_manifest["bytes"] + os.path.getsize(
+            os.path.join(directory, "objects.pkl")
+        )
+        return tenant_model, n_bytes
+
+    def tenant_bytes(self, tenant):
+        """
+        To find the approximate size of a tenant's model when loaded, i.e., the size of
+        its arrays and its pickle
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: The approximate size in bytes
+        :rtype: int
+        """
+        directory = ModelArtifacts.tenant_directory(
+            directory=self.directory, tenant=tenant
+        )
+        with open(file=os.path.join(directory, "manifest.json")) as handle:
+            n_bytes = json.load(fp=handle)["bytes"]
+        return n_bytes + os.path.getsize(os.path.join(directory, "objects.pkl"))
+
+    def fingerprint(self, tenant):
+        """
+        To find the fingerprint of the data a tenant's model was trained on, without
+        loading the model
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: The fingerprint, or None when the tenant is unknown or its model was
+            saved without one
+        :rtype: str
+        """
+        if tenant not in self.tenant_set:
+            return None
+        directory = ModelArtifacts.tenant_directory(
+            directory=self.directory, tenant=tenant
+        )
+        with open(file=os.path.join(directory, "manifest.json")) as handle:
+            return json.load(fp=handle).get("fingerprint")
+
+
+class ModelArtifacts:
+    """
+    To save the recommender models to the disk as one directory per tenant, with the
+    arrays of each tenant's model, i.e., its embeddings, biases, sparse feature
+    matrices, id maps and precomputed recommendations, in `.npy` files that are mapped
+    into memory when the tenant's model is loaded. Each save writes a new version of the
+    models next to the current one, so that the processes serving the current version
+    keep loading its tenants until they switch to the new one
+    """
+
+    def __init__(self, directory, keep=2):
+        """
+        Class constructor method
+
+        :param directory: The directory where the models are saved
+        :type directory: str
+        :param keep: The number of versions of the models kept on the disk, defaults to
+            2
+        :type keep: int, optional
+        """
+        self.directory = directory
+        self.keep = max(int(keep), 1)
+
+    @staticmethod
+    def tenant_directory(directory, tenant):
+        """
+        To find the directory of a tenant's model in a version of the models
+
+        :param directory: The directory of the version of the models
+        :type directory: str
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: The directory of the tenant's model
+        :rtype: str
+        """
+        return os.path.join(directory, "tenants", quote(str(tenant), safe=""))
+
+    @staticmethod
+    def write_tenant(directory, tenant, tenant_model):
+        """
+        To write a tenant's model to its directory
+
+        :param directory: The directory of the tenant's model
+        :type directory: str
+        :param tenant: The tenant id
+        :type tenant: str
+        :param tenant_model: The tenant's model, as prepared by
+            `PrepareServing.prepare_tenant` or as returned by
+            `TrainRecommender.train_models` for the tenants that were not trained
+        :type tenant_model: dict
+        :return: The manifest of the tenant's model
+        :rtype: dict
+        """
+        arrays_directory = os.path.join(directory, "arrays")
+        os.makedirs(arrays_directory)
+        with open(file=os.path.join(directory, "objects.pkl"), mode="wb") as handle:
+            pickler = ArraysPickler(file=handle, arrays_directory=arrays_directory)
+            pickler.dump(tenant_model)
+        similar_items_store = tenant_model.get("similar_items_store")
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "tenant": tenant,
+            "msg": tenant_model.get("msg"),
+            "fingerprint": tenant_model.get("fingerprint"),
+            "store_size": similar_items_store.depth if similar_items_store else 0,
+            "arrays": pickler.arrays,
+            "bytes": sum(array["bytes"] for array in pickler.arrays.values()),
+        }
+        with open(file=os.path.join(directory, "manifest.json"), mode="w") as handle:
+            json.dump(obj=manifest, fp=handle, indent=2)
+        return manifest
+
+    @staticmethod
+    def read_tenant(directory):
+        """
+        To read a tenant's model from its directory, with its arrays mapped into memory
+        read only
+
+        :param directory: The directory of the tenant's model
+        :type directory: str
+        :return: A tuple of the tenant's model and its manifest
+        :rtype: tuple
+        """
+        with open(file=os.path.join(directory, "manifest.json")) as handle:
+            manifest = json.load(fp=handle)
+        with open(file=os.path.join(directory, "objects.pkl"), mode="rb") as handle:
+            tenant_model = ArraysUnpickler(
+                file=handle, arrays_directory=os.path.join(directory, "arrays")
+            ).load()
+        return tenant_model, manifest
+
+    def save(self, models, telemetry=None):
+        """
+        To save a new version of the models and make it the current one
+
+        :param models: The dictionary of the tenant models with the `algorithm` key, as
+            returned by `PrepareServing.prepare_models`
+        :type models: dict
+        :param telemetry: Where the writing of each tenant is timed, defaults to None
+        :type telemetry: TrainTelemetry, optional
+        :return: The new version
+        :rtype: str
+        """
+        telemetry = telemetry or TrainTelemetry()
+        os.makedirs(self.directory, exist_ok=True)
+        version = str(time.time_ns())
+        new_directory = os.path.join(self.directory, f"{version}.new")
+        tenants = [key for key in models if key != "algorithm"]
+        for tenant in tenants:
+            with telemetry.for_tenant(tenant=tenant).stage(name="save"):
+                self.write_tenant(
+                    directory=self.tenant_directory(
+                        directory=new_directory, tenant=tenant
+                    ),
+                    tenant=tenant,
+                    tenant_model=models[tenant],
+                )
+        os.makedirs(new_directory, exist_ok=True)
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "version": version,
+            "algorithm": models.get("algorithm"),
+            "tenants": tenants,
+        }
+        with open(
+            file=os.path.join(new_directory, "manifest.json"), mode="w"
+        ) as handle:
+            json.dump(obj=manifest, fp=handle, indent=2)
+        os.rename(new_directory, os.path.join(self.directory, version))
+
+        current_path = os.path.join(self.directory, "CURRENT")
+        with open(file=f"{current_path}.new", mode="w") as handle:
+            handle.write(version)
+        os.replace(f"{current_path}.new", current_path)
+        self.remove_old_versions()
+        return version
+
+    def remove_old_versions(self):
+        """
+        To remove the versions of the models older than the `keep` latest ones, and
+        the ones left partially written
+        """
+        versions = sorted(
+            (name for name in os.listdir(self.directory) if name.isdigit()), key=int
+        )
+        for name in versions[: -self.keep]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        current = self.version()
+        for name in os.listdir(self.directory):
+            if name.endswith(".new") and name != f"{current}.new":
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def version(self):
+        """
+        To find the current version of the saved models
+
+        :return: The current version, or None when no models of the current format
+            have been saved
+        :rtype: str
+        """
+        try:
+            with open(file=os.path.join(self.directory, "CURRENT")) as handle:
+                version = handle.read().strip()
+            with open(
+                file=os.path.join(self.directory, version, "manifest.json")
+            ) as handle:
+                manifest = json.load(fp=handle)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format_version") != FORMAT_VERSION:
+            return None
+        return version
+
+    def load(self, store_size=0, max_bytes=0):
+        """
+        To load the current version of the saved models. The tenant models are only
+        read from the disk when they are first requested
+
+        :param store_size: The depth of the recommendation stores to serve, defaults to
+            0
+        :type store_size: int, optional
+        :param max_bytes: The approximate number of bytes the loaded tenant models may
+            take, with no limit when this is 0, defaults to 0
+        :type max_bytes: float, optional
+        :return: The dictionary of the tenant models with the `algorithm` key, or None
+            when no models have been saved
+        :rtype: TenantModels
+        """
+        version = self.version()
+        if version is None:
+            return None
+        directory = os.path.join(self.directory, version)
+        with open(file=os.path.join(directory, "manifest.json")) as handle:
+            manifest = json.load(fp=handle)
+        return TenantModels(
+            directory=directory,
+            manifest=manifest,
+            store_size=store_size,
+            max_bytes=max_bytes,
+        )
+
+    def convert(self, model_path, store_size=0):
+        """
+        To save the models of the pickle file written by the earlier versions of the
+        service as a version of the models
+
+        :param model_path: The path of the pickle file
+        :type model_path: str
+        :param store_size: The depth of the recommendation stores to precompute,
+            defaults to 0
+        :type store_size: int, optional
+        :return: The new version
+        :rtype: str
+        """
+        with open(file=model_path, mode="rb") as handle:
+            models = pickle.load(file=handle)
+        return self.save(
+            models=PrepareServing(store_size=store_size).prepare_models(models=models)
+        )
@@ -16,6 +16,9 @@ Please contact [licensing@totaralearning.com] for more information.
 @package ml_service
 """
 
+from service.recommender.predict_subroutines.representation_scorer import (
+    RepresentationScorer,
+)
 from service.recommender.predict_subroutines.similar_items import SimilarItems
 from service.recommender.predict_subroutines.user_to_items import UserToItems
 
@@ -28,6 +31,17 @@ class PredictRecommender:
         mappings=None,
         items_features=None,
         num_threads=2,
+        item_representations=None,
+        item_unit_embeddings=None,
+        item_ids=None,
+        user_ids=None,
+        item_type_index=None,
+        user_representations=None,
+        similar_items_store=None,
+        user_items_stores=None,
+        ann_index=None,
+        mips_indexes=None,
+        clean_item_ids=None,
     ):
         """
         This is the class constructor method
@@ -49,12 +63,66 @@ class PredictRecommender:
         :param num_threads: Number of parallel computation threads to use. Should not be
             higher than the number of physical cores, defaults to 2
         :type num_threads: int, optional
+        :param item_representations: The item biases and item embeddings of the model
+            as precomputed when the model was loaded. These are computed from the
+            `model` and `items_features` when not provided, defaults to None
+        :type item_representations: tuple, optional
+        :param item_unit_embeddings: The item embeddings scaled to unit length as
+            precomputed when the model was loaded, defaults to None
+        :type item_unit_embeddings: np.float32 array, optional
+        :param item_ids: The Totara item ids ordered by their internal ids as
+            precomputed when the model was loaded, defaults to None
+        :type item_ids: np.array, optional
+        :param user_ids: The Totara user ids ordered by their internal ids as
+            precomputed when the model was loaded, defaults to None
+        :type user_ids: np.array, optional
+        :param item_type_index: The internal ids of the items grouped by the item types
+            as precomputed when the model was loaded, defaults to None
+        :type item_type_index: dict, optional
+        :param user_representations: The user biases and user embeddings of the model
+            as precomputed when the model was loaded. When these and the
+            `item_representations` are provided, the users are scored directly from the
+            representations instead of through the model, defaults to None
+        :type user_representations: tuple, optional
+        :param similar_items_store: The similar items of every item as precomputed after
+            the model was trained. The requests it holds enough items for are served
+            from it without computing the similarities, defaults to None
+        :type similar_items_store: `RecommendationStore` instance, optional
+        :param user_items_stores: The recommended items of every user as precomputed
+            after the model was trained, keyed by the item types. The requests they hold
+            enough items for are served from them without scoring the items, defaults
+            to None
+        :type user_items_stores: dict, optional
+        :param ann_index: The approximate nearest neighbour index of the items built
+            after the model was trained. When provided, the similar items are searched
+            for in the index instead of the whole catalog, defaults to None
+        :type ann_index: `IVFIndex` instance, optional
+        :param mips_indexes: The maximum inner product search indexes of the items of
+            the large item types, keyed by the item types. When these and the
+            `user_representations` are provided, the recommendations of a user are
+            scored on the candidates retrieved from the index, defaults to None
+        :type mips_indexes: dict, optional
+        :param clean_item_ids: The Totara item ids without the item type prefixes, as
+            returned by the endpoints, ordered by their internal ids as precomputed when
+            the model was loaded, defaults to None
+        :type clean_item_ids: np.array, optional
         """
         self.model = model
         self.algorithm = algorithm
         self.mappings = mappings
         self.item_features = items_features
         self.num_threads = int(num_threads)
+        self.item_representations = item_representations
+        self.item_unit_embeddings = item_unit_embeddings
+        self.item_ids = item_ids
+        self.user_ids = user_ids
+        self.item_type_index = item_type_index
+        self.user_representations = user_representations
+        self.similar_items_store = similar_items_store
+        self.user_items_stores = user_items_stores or {}
+        self.ann_index = ann_index
+        self.mips_indexes = mips_indexes
+        self.clean_item_ids = clean_item_ids
 
     def get_similar_items(self, totara_id="engage_microlearning1", n_items=10):
         """
@@ -74,18 +142,66 @@ class PredictRecommender:
         if totara_id not in self.mappings[2]:
             return [("bad request: no such item id", 0.0)]
 
-        item_representations = self.model.get_item_representations(
-            features=self.item_features
-        )[1]
+        if self.similar_items_store is not None:
+            items = self.similar_items_store.lookup(
+                row=self.mappings[2][totara_id], n_items=n_items
+            )
+            if items is not None:
+                return items
+
+        if self.item_representations is None:
+            self.item_representations = self.model.get_item_representations(
+                features=self.item_features
+            )
         similar_items_getter = SimilarItems(
             item_mapping=self.mappings[2],
-            item_representations=item_representations,
+            item_representations=self.item_representations[1],
             num_items=n_items,
+            unit_embeddings=self.item_unit_embeddings,
+            item_ids=self.item_ids,
+            ann_index=self.ann_index,
+            clean_item_ids=self.clean_item_ids,
         )
         return similar_items_getter.get_items(
             item_meta=(totara_id, self.mappings[2][totara_id])
         )
 
+    def get_batch_similar_items(self, totara_ids=None, n_items=10):
+        """
+        This method calls the `SimilarItems` class and uses the method `get_items_batch`
+        to compute the lists containing `n_items` items in descending order of
+        similarity score with each of the given items
+
+        :param totara_ids: The Totara ids of the items for which the lists of similar
+            items are requested
+        :type totara_ids: list
+        :param n_items: Number of similar items requested for each item
+        :type n_items: int
+        :return: A dictionary where keys are the Totara ids of the items that are known
+            to the model and the values are lists of tuples where the first element is
+            similar item and the second element is similarity score
+        :rtype: dict
+        """
+        known_ids = [x for x in totara_ids if x in self.mappings[2]]
+
+        if self.item_representations is None:
+            self.item_representations = self.model.get_item_representations(
+                features=self.item_features
+            )
+        similar_items_getter = SimilarItems(
+            item_mapping=self.mappings[2],
+            item_representations=self.item_representations[1],
+            num_items=n_items,
+            unit_embeddings=self.item_unit_embeddings,
+            item_ids=self.item_ids,
+            ann_index=self.ann_index,
+            clean_item_ids=self.clean_item_ids,
+        )
+        items = similar_items_getter.get_items_batch(
+            internal_ids=[self.mappings[2][x] for x in known_ids]
+        )
+        return dict(zip(known_ids, items))
+
     def get_user_recommendations(
         self,
         totara_id=2,
@@ -122,6 +238,22 @@ class PredictRecommender:
         if totara_id not in self.mappings[0]:
             return [("bad request: no such user id", 0.0)]
 
+        if items_type in self.user_items_stores:
+            items = self.user_items_stores[items_type].lookup(
+                row=self.mappings[0][totara_id], n_items=n_items
+            )
+            if items is not None:
+                return items
+
+        scorer = self.model
+        if (
+            self.user_representations is not None
+            and self.item_representations is not None
+        ):
+            scorer = RepresentationScorer(
+                user_representations=self.user_representations,
+                item_representations=self.item_representations,
+            )
         recommendations_getter = UserToItems(
             u_mapping=self.mappings[0],
             i_mapping=self.mappings[2],
@@ -129,10 +261,90 @@ class PredictRecommender:
             item_features=self.item_features,
             item_type_map=item_type_map,
             positive_inter_map=positive_inter_map,
-            model=self.model,
+            model=scorer,
             num_items=n_items,
             num_threads=self.num_threads,
+            item_type_index=self.item_type_index,
+            user_ids=self.user_ids,
+            item_ids=self.item_ids,
+            clean_item_ids=self.clean_item_ids,
+            mips_indexes=self.mips_indexes,
+            user_embeddings=(
+                None
+                if self.user_representations is None
+                else self.user_representations[1]
+            ),
         )
         return recommendations_getter.get_items(
             internal_uid=self.mappings[0][totara_id], item_type=items_type
         )
+
+    def get_batch_user_recommendations(
+        self,
+        totara_ids=None,
+        n_items=10,
+        items_type="engage_microlearning",
+        user_features=None,
+        item_type_map=None,
+        positive_inter_map=None,
+    ):
+        """
+        This method calls the `UserToItems` class and uses the method `get_items_batch`
+        to get the lists containing `n_items` that are recommended for each of the users
+        with ids in `totara_ids` in descending order of their recommendation score. The
+        users are scored from the user and item representations, which are computed
+        from the model when they were not precomputed
+
+        :param totara_ids: The Totara ids of the users for whom the recommendations are
+            requested
+        :type totara_ids: list
+        :param n_items: Number of items requested for each user
+        :type n_items: int
+        :param items_type: Type of the items requested
+        :type items_type: str
+        :param user_features: A sparse matrix of the user features of shape
+            `n_users, n_features`
+        :type user_features: `scipy.sparse.csr_matrix` instance
+        :param item_type_map: A map of item ids and item types
+        :type item_type_map: dict
+        :param positive_inter_map: A of user ids  and list of items interacted by the
+            users
+        :type positive_inter_map: dict
+        :return: A dictionary where keys are the Totara ids of the users that are known
+            to the model and the values are lists of tuples where the first element is
+            recommended item and the second element is recommendation score
+        :rtype: dict
+        """
+        if self.item_representations is None:
+            self.item_representations = self.model.get_item_representations(
+                features=self.item_features
+            )
+        if self.user_representations is None:
+            self.user_representations = self.model.get_user_representations(
+                features=user_features
+            )
+        known_ids = [x for x in totara_ids if x in self.mappings[0]]
+
+        recommendations_getter = UserToItems(
+            u_mapping=self.mappings[0],
+            i_mapping=self.mappings[2],
+            user_features=user_features,
+            item_features=self.item_features,
+            item_type_map=item_type_map,
+            positive_inter_map=positive_inter_map,
+            model=RepresentationScorer(
+                user_representations=self.user_representations,
+                item_representations=self.item_representations,
+            ),
+            num_items=n_items,
+            num_threads=self.num_threads,
+            item_type_index=self.item_type_index,
+            user_ids=self.user_ids,
+            item_ids=self.item_ids,
+            clean_item_ids=self.clean_item_ids,
+        )
+        items = recommendations_getter.get_items_batch(
+            internal_uids=[self.mappings[0][x] for x in known_ids],
+            item_type=items_type,
+        )
+        return dict(zip(known_ids, items))
@@ -0,0 +1,162 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    This is a conceptual representation of an inverted file index of the unit length
+    item representations. The items are clustered around centroids, and only the items
+    of the clusters closest to a query are scored, so finding the similar items of an
+    item does not take a scan of the whole catalog
+    """
+
+    def __init__(self, centroids, list_offsets, list_items, n_probe=8):
+        """
+        Class constructor method
+
+        :param centroids: The unit length centroids of the clusters of shape
+            `[n_lists, num_components]`
+        :type centroids: np.float32 array
+        :param list_offsets: The offsets of the clusters in `list_items`, of shape
+            `[n_lists + 1,]`
+        :type list_offsets: np.int64 array
+        :param list_items: The internal ids of the items grouped by their clusters and
+            sorted within each cluster
+        :type list_items: np.int32 array
+        :param n_probe: The number of clusters closest to the query whose items are
+            scored, defaults to 8
+        :type n_probe: int, optional
+        """
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_items = list_items
+        self.n_probe = n_probe
+
+    @staticmethod
+    def assign(unit_embeddings, centroids, block_size=4096):
+        """
+        To find the closest centroid of each of the items
+
+        :param unit_embeddings: The unit length item representations of shape
+            `[n_items, num_components]`
+        :type unit_embeddings: np.float32 array
+        :param centroids: The unit length centroids of shape `[n_lists,
+            num_components]`
+        :type centroids: np.float32 array
+        :param block_size: The number of items compared with the centroids in one matrix
+            product, defaults to 4096
+        :type block_size: int, optional
+        :return: The index of the closest centroid of each item
+        :rtype: np.int64 array
+        """
+        assignment = np.empty(unit_embeddings.shape[0], dtype=np.int64)
+        for start in range(0, unit_embeddings.shape[0], block_size):
+            block = unit_embeddings[start : start + block_size]
+            assignment[start : start + block.shape[0]] = block.dot(centroids.T).argmax(
+                axis=1
+            )
+        return assignment
+
+    @staticmethod
+    def build(unit_embeddings, n_lists=None, n_probe=8, n_iter=10, seed=42):
+        """
+        To cluster the items with the spherical k-means algorithm and build the index
+
+        :param unit_embeddings: The unit length item representations of shape
+            `[n_items, num_components]`
+        :type unit_embeddings: np.float32 array
+        :param n_lists: The number of clusters. When None, this is four times the
+            square root of the number of items, defaults to None
+        :type n_lists: int, optional
+        :param n_probe: The number of clusters that are scored for a query, defaults to
+            8
+        :type n_probe: int, optional
+        :param n_iter: The number of k-means iterations, defaults to 10
+        :type n_iter: int, optional
+        :param seed: The seed of the random choice of the initial centroids, defaults
+            to 42
+        :type seed: int, optional
+        :return: The index of the items
+        :rtype: IVFIndex
+        """
+        n_items = unit_embeddings.shape[0]
+        if n_lists is None:
+            n_lists = int(round(4 * np.sqrt(n_items)))
+        n_lists = max(1, min(n_lists, n_items))
+
+        rng = np.random.default_rng(seed=seed)
+        centroids = unit_embeddings[
+            rng.choice(n_items, size=n_lists, replace=False)
+        ].copy()
+        for __ in range(n_iter):
+            assignment = IVFIndex.assign(
+                unit_embeddings=unit_embeddings, centroids=centroids
+            )
+            order = np.argsort(assignment, kind="stable")
+            counts = np.bincount(assignment, minlength=n_lists)
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            sums = np.add.reduceat(unit_embeddings[order], starts, axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids[filled] = sums / norms
+
+        assignment = IVFIndex.assign(
+            unit_embeddings=unit_embeddings, centroids=centroids
+        )
+        list_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(assignment, minlength=n_lists)))
+        ).astype(np.int64)
+        return IVFIndex(
+            centroids=np.ascontiguousarray(centroids, dtype=np.float32),
+            list_offsets=list_offsets,
+            list_items=np.argsort(assignment, kind="stable").astype(np.int32),
+            n_probe=n_probe,
+        )
+
+    def probe(self, query, n_candidates, n_probe=None):
+        """
+        To find the items of the clusters closest to the query. More clusters than
+        `n_probe` are scored when they hold fewer than `n_candidates` items
+
+        :param query: The unit length representation of the query of shape
+            `[num_components,]`
+        :type query: np.float32 array
+        :param n_candidates: The minimum number of items to return, if the index has
+            that many
+        :type n_candidates: int
+        :param n_probe: The number of the closest clusters to score. When None, the
+            `n_probe` of the instance is used, defaults to None
+        :type n_probe: int, optional
+        :return: The sorted internal ids of the items of the closest clusters
+        :rtype: np.int32 array
+        """
+        if n_probe is None:
+            n_probe = self.n_probe
+        lists = np.argsort(-self.centroids.dot(query), kind="stable")
+        sizes = np.cumsum(np.diff(self.list_offsets)[lists])
+        n_lists = max(n_probe, int(np.searchsorted(sizes, n_candidates)) + 1)
+        candidates = np.concatenate(
+            [
+                self.list_items[self.list_offsets[x] : self.list_offsets[x + 1]]
+                for x in lists[:n_lists]
+            ]
+        )
+        return np.sort(candidates)
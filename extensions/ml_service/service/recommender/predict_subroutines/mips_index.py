@@ -0,0 +1,139 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+
+from service.recommender.predict_subroutines.ivf_index import IVFIndex
+
+
+class MIPSIndex:
+    """
+    This is a conceptual representation of a maximum inner product search index of the
+    items of one type. The item embeddings and biases are augmented with an extra
+    dimension so that all of them have the same length, which turns finding the items of
+    the highest recommendation scores for a user into finding the nearest neighbours of
+    the user in the `IVFIndex`
+    """
+
+    def __init__(self, ivf_index, candidates):
+        """
+        Class constructor method
+
+        :param ivf_index: The index of the augmented representations of the `candidates`
+        :type ivf_index: IVFIndex
+        :param candidates: The sorted internal ids of the items of the type
+        :type candidates: np.array
+        """
+        self.ivf_index = ivf_index
+        self.candidates = candidates
+
+    @staticmethod
+    def augment_items(item_biases, item_embeddings):
+        """
+        To append the biases and the norm completing dimension to the item embeddings,
+        so that the inner product of a query `[user_embedding, 1, 0]` with an augmented
+        item is proportional to the score of the item without the user bias
+
+        :param item_biases: The item biases of shape `[n_items,]`
+        :type item_biases: np.array
+        :param item_embeddings: The item embeddings of shape `[n_items,
+            num_components]`
+        :type item_embeddings: np.array
+        :return: The augmented items of unit length of shape `[n_items,
+            num_components + 2]`
+        :rtype: np.float32 array
+        """
+        extended = np.hstack(
+            (
+                np.asarray(item_embeddings, dtype=np.float64),
+                np.asarray(item_biases, dtype=np.float64)[:, np.newaxis],
+            )
+        )
+        squared_norms = (extended**2).sum(axis=1)
+        max_norm = np.sqrt(squared_norms.max()) if squared_norms.shape[0] else 0.0
+        if max_norm == 0:
+            max_norm = 1.0
+        completion = np.sqrt(np.maximum(max_norm**2 - squared_norms, 0.0))
+        return np.ascontiguousarray(
+            np.hstack((extended, completion[:, np.newaxis])) / max_norm,
+            dtype=np.float32,
+        )
+
+    @staticmethod
+    def augment_query(user_embedding):
+        """
+        To extend the user embedding to a query of the augmented items
+
+        :param user_embedding: The user embedding of shape `[num_components,]`
+        :type user_embedding: np.array
+        :return: The query of shape `[num_components + 2,]`
+        :rtype: np.float32 array
+        """
+        return np.concatenate(
+            (np.asarray(user_embedding, dtype=np.float32), [1.0, 0.0])
+        ).astype(np.float32)
+
+    @staticmethod
+    def build(item_representations, candidates, n_lists=None, n_probe=8):
+        """
+        To build the index of the items of one type
+
+        :param item_representations: A tuple of the item biases of shape `[n_items,]`
+            and the item embeddings of shape `[n_items, num_components]` of all the
+            items
+        :type item_representations: tuple
+        :param candidates: The sorted internal ids of the items of the type
+        :type candidates: np.array
+        :param n_lists: The number of clusters of the `IVFIndex`, defaults to None
+        :type n_lists: int, optional
+        :param n_probe: The number of clusters that are scored for a query, defaults to
+            8
+        :type n_probe: int, optional
+        :return: The index of the items of the type
+        :rtype: MIPSIndex
+        """
+        biases, embeddings = item_representations
+        augmented = MIPSIndex.augment_items(
+            item_biases=np.asarray(biases)[candidates],
+            item_embeddings=np.asarray(embeddings)[candidates],
+        )
+        return MIPSIndex(
+            ivf_index=IVFIndex.build(
+                unit_embeddings=augmented, n_lists=n_lists, n_probe=n_probe
+            ),
+            candidates=candidates,
+        )
+
+    def retrieve(self, user_embedding, n_candidates):
+        """
+        To find the items of the highest and of the lowest recommendation scores for a
+        user. The lowest ones let the range of the scores of the user be estimated,
+        which the penalty of the seen items depends on
+
+        :param user_embedding: The user embedding of shape `[num_components,]`
+        :type user_embedding: np.array
+        :param n_candidates: The minimum number of the items of the highest scores to
+            find, and of the lowest ones
+        :type n_candidates: int
+        :return: The sorted internal ids of the found items
+        :rtype: np.array
+        """
+        query = self.augment_query(user_embedding=user_embedding)
+        highest = self.ivf_index.probe(query=query, n_candidates=n_candidates)
+        lowest = self.ivf_index.probe(query=-query, n_candidates=n_candidates)
+        return self.candidates[np.union1d(highest, lowest)]
@@ -0,0 +1,134 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import re
+
+from service.recommender.config import Config
+
+
+class RecommendationStore:
+    """
+    This is a conceptual representation of the ranked items precomputed for each row,
+    i.e., a user or an item, stored in a CSR like layout so that a request for at most
+    `depth` items is served with a slice instead of a model call
+    """
+
+    def __init__(self, indptr, indices, scores, item_ids, depth):
+        """
+        Constructor method
+
+        :param indptr: The offsets of the rows in `indices` and `scores`, of shape
+            `[n_rows + 1,]`
+        :type indptr: np.int64 array
+        :param indices: The internal ids of the ranked items of all the rows
+        :type indices: np.int32 array
+        :param scores: The scores of the ranked items of all the rows
+        :type scores: np.float32 array
+        :param item_ids: The Totara item ids, with the item type prefixes removed,
+            ordered by their internal ids
+        :type item_ids: np.array
+        :param depth: The number of items that were ranked for each row. A row with
+            fewer items holds all the items that were available for it
+        :type depth: int
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.item_ids = item_ids
+        self.depth = depth
+
+    @staticmethod
+    def clean_ids(item_ids):
+        """
+        Removes the item type prefixes from the Totara item ids, as done in the
+        responses of the recommendation endpoints
+
+        :param item_ids: The Totara item ids ordered by their internal ids
+        :type item_ids: np.array
+        :return: The Totara item ids without the item type prefixes
+        :rtype: np.array
+        """
+        item_types_allowed = Config().get_property(property_name="item_types")
+        removal_pattern = re.compile(pattern="|".join(item_types_allowed))
+        cleaned = np.empty(len(item_ids), dtype=object)
+        for internal_id, totara_id in enumerate(item_ids):
+            cleaned[internal_id] = removal_pattern.sub(repl="", string=totara_id)
+        return cleaned
+
+    @staticmethod
+    def from_ranked(ranked_ids, ranked_scores, item_ids, depth, clean_item_ids=None):
+        """
+        Builds the store from the ranked items of the rows that have the same number of
+        ranked items
+
+        :param ranked_ids: The internal ids of the ranked items of shape
+            `[n_rows, n_ranked]`
+        :type ranked_ids: np.array
+        :param ranked_scores: The scores of the ranked items of shape
+            `[n_rows, n_ranked]`
+        :type ranked_scores: np.array
+        :param item_ids: The Totara item ids ordered by their internal ids
+        :type item_ids: np.array
+        :param depth: The number of items that were requested for each row
+        :type depth: int
+        :param clean_item_ids: The Totara item ids without the item type prefixes as
+            precomputed for the tenant. These are computed from `item_ids` when not
+            provided, defaults to None
+        :type clean_item_ids: np.array, optional
+        :return: The store of the ranked items
+        :rtype: RecommendationStore
+        """
+        n_rows, n_ranked = ranked_ids.shape
+        return RecommendationStore(
+            indptr=np.arange(n_rows + 1, dtype=np.int64) * n_ranked,
+            indices=np.ascontiguousarray(ranked_ids, dtype=np.int32).ravel(),
+            scores=np.ascontiguousarray(ranked_scores, dtype=np.float32).ravel(),
+            item_ids=(
+                RecommendationStore.clean_ids(item_ids=item_ids)
+                if clean_item_ids is None
+                else clean_item_ids
+            ),
+            depth=depth,
+        )
+
+    def lookup(self, row, n_items):
+        """
+        Returns the `n_items` best ranked items of the row, if the store holds them
+
+        :param row: The internal id of the user or the item
+        :type row: int
+        :param n_items: The number of items requested
+        :type n_items: int
+        :return: A list of (`totara_id`, `score`) of at most `n_items` items in
+            descending order of their scores, or None when the store can not serve the
+            request
+        :rtype: list
+        """
+        if row < 0 or row + 1 >= self.indptr.shape[0]:
+            return None
+        start, end = self.indptr[row], self.indptr[row + 1]
+        if n_items > end - start and end - start >= self.depth:
+            return None
+        end = min(end, start + max(n_items, 0))
+        return list(
+            zip(
+                self.item_ids[self.indices[start:end]].tolist(),
+                self.scores[start:end].tolist(),
+            )
+        )
@@ -0,0 +1,105 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+
+
+class RepresentationScorer:
+    """
+    This is a conceptual representation for scoring the user and item pairs directly
+    from the user and item representations that were precomputed from a LightFM model,
+    without going through the feature matrices on every request
+    """
+
+    def __init__(self, user_representations=None, item_representations=None):
+        """
+        Constructor method
+
+        :param user_representations: A tuple of the user biases of shape `[n_users,]`
+            and the user embeddings of shape `[n_users, num_components]`, as returned by
+            the `LightFM.get_user_representations` method
+        :type user_representations: tuple
+        :param item_representations: A tuple of the item biases of shape `[n_items,]`
+            and the item embeddings of shape `[n_items, num_components]`, as returned by
+            the `LightFM.get_item_representations` method
+        :type item_representations: tuple
+        """
+        self.user_biases, self.user_embeddings = user_representations
+        self.item_biases, self.item_embeddings = item_representations
+
+    def predict(
+        self,
+        user_ids,
+        item_ids,
+        user_features=None,
+        item_features=None,
+        num_threads=1,
+    ):
+        """
+        Computes the recommendation scores of the user and item pairs the same way as
+        the `LightFM.predict` method does, i.e., the sum of the user bias, the item bias
+        and the dot product of the user and item embeddings. The signature mirrors the
+        `LightFM.predict` method so that this can be used in place of the model
+
+        :param user_ids: The internal user id for whom the items are scored, or an array
+            of internal user ids of the same length as `item_ids`
+        :type user_ids: int or np.array
+        :param item_ids: The internal item ids to be scored
+        :type item_ids: np.array
+        :param user_features: Not used, as the features are already part of the user
+            representations, defaults to None
+        :param item_features: Not used, as the features are already part of the item
+            representations, defaults to None
+        :param num_threads: Not used, the BLAS library manages its own threads,
+            defaults to 1
+        :return: The recommendation scores of the user and item pairs
+        :rtype: np.float32 array
+        """
+        item_ids = np.asarray(item_ids)
+        if np.ndim(user_ids) == 0:
+            scores = self.item_embeddings[item_ids].dot(self.user_embeddings[user_ids])
+            scores += self.user_biases[user_ids]
+        else:
+            user_ids = np.asarray(user_ids)
+            scores = np.einsum(
+                "ij,ij->i",
+                self.user_embeddings[user_ids],
+                self.item_embeddings[item_ids],
+            )
+            scores += self.user_biases[user_ids]
+        scores += self.item_biases[item_ids]
+        return scores
+
+    def predict_block(self, user_ids, item_ids):
+        """
+        Computes the recommendation scores of every user in `user_ids` against every
+        item in `item_ids` as a single matrix product
+
+        :param user_ids: The internal user ids to be scored
+        :type user_ids: np.array
+        :param item_ids: The internal item ids to be scored
+        :type item_ids: np.array
+        :return: The recommendation scores of shape `[len(user_ids), len(item_ids)]`
+        :rtype: np.float32 array
+        """
+        user_ids = np.asarray(user_ids)
+        item_ids = np.asarray(item_ids)
+        scores = self.user_embeddings[user_ids].dot(self.item_embeddings[item_ids].T)
+        scores += self.user_biases[user_ids][:, np.newaxis]
+        scores += self.item_biases[item_ids][np.newaxis, :]
+        return scores
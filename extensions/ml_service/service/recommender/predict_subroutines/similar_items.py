@@ -17,9 +17,11 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 import numpy as np
-import re
 
 from service.recommender.config import Config
+from service.recommender.predict_subroutines.recommendation_store import (
+    RecommendationStore,
+)
 
 
 class SimilarItems:
@@ -28,7 +30,16 @@ class SimilarItems:
     items
     """
 
-    def __init__(self, item_mapping=None, item_representations=None, num_items=10):
+    def __init__(
+        self,
+        item_mapping=None,
+        item_representations=None,
+        num_items=10,
+        unit_embeddings=None,
+        item_ids=None,
+        ann_index=None,
+        clean_item_ids=None,
+    ):
         """
         Constructor method
 
@@ -41,11 +52,181 @@ class SimilarItems:
         :param num_items: The number of similar item recommendations for each item,
             defaults to 10
         :type num_items: int, optional
+        :param unit_embeddings: The item representations normalised to unit length as
+            precomputed for the tenant. These are computed from `item_representations`
+            when not provided, defaults to None
+        :type unit_embeddings: np.float32 array, optional
+        :param item_ids: The Totara item ids ordered by their internal ids as
+            precomputed for the tenant. These are computed from `item_mapping` when not
+            provided, defaults to None
+        :type item_ids: np.array, optional
+        :param ann_index: The approximate nearest neighbour index of the items. When
+            provided, only the items the index finds close to an item are scored
+            instead of the whole catalog, defaults to None
+        :type ann_index: `IVFIndex` instance, optional
+        :param clean_item_ids: The Totara item ids without the item type prefixes
+            ordered by their internal ids as precomputed for the tenant. These are
+            computed from `item_ids` when first needed if not provided, defaults to
+            None
+        :type clean_item_ids: np.array, optional
         """
         self.item_mapping = item_mapping
-        self.mapping_rev = {v: k for k, v in item_mapping.items()}
         self.item_representations = item_representations
         self.num_items = num_items
+        if unit_embeddings is None:
+            unit_embeddings = self.normalise(embeddings=item_representations)
+        self.unit_embeddings = unit_embeddings
+        if item_ids is None:
+            item_ids = self.ids_by_internal_id(mapping=item_mapping)
+        self.item_ids = item_ids
+        self.ann_index = ann_index
+        self.clean_item_ids = clean_item_ids
+
+    @staticmethod
+    def normalise(embeddings):
+        """
+        Scales each row of the `embeddings` to unit length so that the cosine
+        similarity between two rows is their dot product. Rows of zero length are kept
+        as zeros
+
+        :param embeddings: The latent representations of the items in the shape
+            `[n_items, num_components]`
+        :type embeddings: np.array
+        :return: The unit length representations of the items in the shape
+            `[n_items, num_components]`
+        :rtype: np.float32 array
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(embeddings / norms, dtype=np.float32)
+
+    @staticmethod
+    def ids_by_internal_id(mapping):
+        """
+        Reverses the id `mapping` into an array that is indexed by the internal ids
+
+        :param mapping: A dictionary where keys are Totara ids and values are internal
+            ids
+        :type mapping: dict
+        :return: The Totara ids ordered by their internal ids
+        :rtype: np.array
+        """
+        ids = np.empty(len(mapping), dtype=object)
+        for totara_id, internal_id in mapping.items():
+            ids[internal_id] = totara_id
+        return ids
+
+    def rank(self, internal_ids, scores, candidates=None):
+        """
+        Ranks the `num_items` best scored candidates of each of the items, excluding the
+        item itself
+
+        :param internal_ids: Internal ids of the items whose similar items are being
+            sought
+        :type internal_ids: np.array
+        :param scores: The similarity scores of the candidates with each of the items of
+            shape `[len(internal_ids), n_candidates]`
+        :type scores: np.float32 array
+        :param candidates: The sorted internal ids of the candidates. When None, the
+            candidates are all the items, defaults to None
+        :type candidates: np.array, optional
+        :return: A tuple of the internal ids and the scores of the similar items, both
+            of shape `[len(internal_ids), min(num_items, n_candidates - 1)]`, in
+            descending order of the scores in each row
+        :rtype: tuple
+        """
+        n_best = min(self.num_items + 1, scores.shape[1])
+        if n_best < scores.shape[1]:
+            best = np.sort(
+                np.argpartition(-scores, n_best - 1, axis=1)[:, :n_best], axis=1
+            )
+        else:
+            best = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+        order = np.argsort(
+            -np.take_along_axis(scores, best, axis=1), axis=1, kind="stable"
+        )
+        best = np.take_along_axis(best, order, axis=1)
+        best_ids = best if candidates is None else candidates[best]
+
+        # Move the item itself to the end of its row, keeping the order of the others
+        itself = best_ids == internal_ids[:, np.newaxis]
+        order = np.argsort(itself, axis=1, kind="stable")
+        width = min(self.num_items, scores.shape[1] - 1)
+        best = np.take_along_axis(best, order, axis=1)[:, :width]
+        best_ids = np.take_along_axis(best_ids, order, axis=1)[:, :width]
+        return best_ids, np.take_along_axis(scores, best, axis=1)
+
+    def top_similar_block(self, internal_ids):
+        """
+        Finds the internal ids and the cosine similarity scores of the `num_items`
+        items most similar to each of the items with the given internal ids, excluding
+        the item itself. Without an `ann_index`, the similarities of the whole block are
+        computed with a single matrix product
+
+        :param internal_ids: Internal ids of the items whose similar items are being
+            sought
+        :type internal_ids: np.array
+        :return: A tuple of the internal ids and the scores of the similar items, both
+            of shape `[len(internal_ids), min(num_items, n_items - 1)]`, in descending
+            order of the scores in each row
+        :rtype: tuple
+        """
+        internal_ids = np.asarray(internal_ids)
+        if self.ann_index is None:
+            scores = self.unit_embeddings[internal_ids].dot(self.unit_embeddings.T)
+            return self.rank(internal_ids=internal_ids, scores=scores)
+
+        ranked_ids, ranked_scores = [], []
+        for internal_id in internal_ids:
+            query = self.unit_embeddings[internal_id]
+            candidates = self.ann_index.probe(
+                query=query, n_candidates=self.num_items + 1
+            )
+            best_ids, best_scores = self.rank(
+                internal_ids=np.array([internal_id]),
+                scores=self.unit_embeddings[candidates].dot(query)[np.newaxis, :],
+                candidates=candidates,
+            )
+            ranked_ids.append(best_ids)
+            ranked_scores.append(best_scores)
+        width = min(self.num_items, self.unit_embeddings.shape[0] - 1)
+        if not ranked_ids:
+            return (
+                np.empty((0, width), dtype=np.int64),
+                np.empty((0, width), dtype=np.float32),
+            )
+        return np.vstack(ranked_ids), np.vstack(ranked_scores)
+
+    def top_similar(self, internal_id):
+        """
+        Finds the internal ids and the cosine similarity scores of the `num_items`
+        items most similar to the item with the given internal id, excluding that item
+
+        :param internal_id: Internal id of the item whose similar items are being sought
+        :type internal_id: int
+        :return: A tuple of the internal ids and the scores of the similar items in
+            descending order of the scores
+        :rtype: tuple
+        """
+        candidates, scores = self.top_similar_block(internal_ids=[internal_id])
+        return candidates[0], scores[0]
+
+    def clean_items(self, candidates, scores):
+        """
+        Pairs the Totara ids of the `candidates`, without the item type prefixes, with
+        their scores
+
+        :param candidates: The internal ids of the similar items
+        :type candidates: np.array
+        :param scores: The similarity scores of the `candidates`
+        :type scores: np.array
+        :return: A list of (`totara_id`, `similarity_score`) of the `candidates`
+        :rtype: list
+        """
+        if self.clean_item_ids is None:
+            self.clean_item_ids = RecommendationStore.clean_ids(item_ids=self.item_ids)
+        return list(zip(self.clean_item_ids[candidates].tolist(), scores.tolist()))
 
     def get_items(self, item_meta):
         """
@@ -59,23 +240,31 @@ class SimilarItems:
             similar to the given item
         :rtype: list
         """
-        # Cosine similarity
-        dot_prods_with_item = self.item_representations.dot(
-            self.item_representations[item_meta[1], :]
-        )
-        item_norms = np.linalg.norm(self.item_representations, axis=1)
-        cosine_denominators = item_norms * item_norms[item_meta[1]]
-        cosine_scores = list(enumerate(dot_prods_with_item / cosine_denominators))
-
-        scores = [(self.mapping_rev[x[0]], x[1]) for x in cosine_scores]
-        scores.sort(key=lambda tup: tup[1], reverse=True)
-        scores = [x for x in scores if x[0] != item_meta[0]]
-        similar_items = scores[: self.num_items]
-
-        item_types_allowed = Config().get_property(property_name="item_types")
-        removal_pattern = re.compile(pattern="|".join(item_types_allowed))
-        cleaned_items = [
-            (removal_pattern.sub(repl="", string=x[0]), x[1]) for x in similar_items
-        ]
-
-        return cleaned_items
+        candidates, scores = self.top_similar(internal_id=item_meta[1])
+        return self.clean_items(candidates=candidates, scores=scores)
+
+    def get_items_batch(self, internal_ids):
+        """
+        Returns `num_items` number of items (as defined in the class constructor method)
+        similar to each of the items with the given internal ids. The items are
+        processed in blocks, each with a single matrix product against the unit length
+        representations of all the items
+
+        :param internal_ids: Internal ids of the items whose similar items are being
+            sought
+        :type internal_ids: list
+        :return: A list with a list of (`totara_id`, `similarity_score`) for each item
+            in the order of `internal_ids`
+        :rtype: list
+        """
+        block_size = Config().get_property(property_name="batch")["block_size"]
+        similar_items = []
+        for start in range(0, len(internal_ids), block_size):
+            candidates, scores = self.top_similar_block(
+                internal_ids=internal_ids[start : start + block_size]
+            )
+            similar_items.extend(
+                self.clean_items(candidates=candidates_row, scores=scores_row)
+                for candidates_row, scores_row in zip(candidates, scores)
+            )
+        return similar_items
@@ -17,9 +17,12 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 import numpy as np
-import re
 
 from service.recommender.config import Config
+from service.recommender.predict_subroutines.recommendation_store import (
+    RecommendationStore,
+)
+from service.recommender.predict_subroutines.similar_items import SimilarItems
 
 
 class UserToItems:
@@ -39,6 +42,12 @@ class UserToItems:
         model=None,
         num_items=10,
         num_threads=2,
+        item_type_index=None,
+        user_ids=None,
+        item_ids=None,
+        mips_indexes=None,
+        user_embeddings=None,
+        clean_item_ids=None,
     ):
         """
         Constructor method
@@ -62,19 +71,42 @@ class UserToItems:
         :param positive_inter_map: A dictionary where keys are the Totara user ids and
             values are lists of the Totara item ids that user has interacted with
         :type positive_inter_map: dict
-        :param model: The model to be evaluated
-        :type model: LightFM model instance
+        :param model: The model to be evaluated, or the scorer of its precomputed
+            representations
+        :type model: LightFM model instance or RepresentationScorer instance
         :param num_items: Number of top ranked items user wants to be recommended,
             defaults to 10
         :type num_items: int, optional
         :param num_threads: Number of parallel computation threads to use, defaults to 2
         :type num_items: int, optional
-
+        :param item_type_index: A dictionary where keys are the item types and values
+            are arrays of the internal ids of the items of that type, as precomputed for
+            the tenant. This is computed from `i_mapping` and `item_type_map` when not
+            provided, defaults to None
+        :type item_type_index: dict, optional
+        :param user_ids: The Totara user ids ordered by their internal ids as
+            precomputed for the tenant. These are computed from `u_mapping` when not
+            provided, defaults to None
+        :type user_ids: np.array, optional
+        :param item_ids: The Totara item ids ordered by their internal ids as
+            precomputed for the tenant. These are computed from `i_mapping` when not
+            provided, defaults to None
+        :type item_ids: np.array, optional
+        :param mips_indexes: A dictionary where keys are the item types and values are
+            the `MIPSIndex` objects of the items of that type. For these types, only the
+            candidates retrieved from the index are scored, defaults to None
+        :type mips_indexes: dict, optional
+        :param user_embeddings: The user embeddings of shape `[n_users,
+            num_components]` that the `mips_indexes` are queried with, defaults to None
+        :type user_embeddings: np.array, optional
+        :param clean_item_ids: The Totara item ids without the item type prefixes
+            ordered by their internal ids as precomputed for the tenant. These are
+            computed from `item_ids` when first needed if not provided, defaults to
+            None
+        :type clean_item_ids: np.array, optional
         """
         self.u_mapping = u_mapping
         self.i_mapping = i_mapping
-        self.u_mapping_rev = {v: k for k, v in u_mapping.items()}
-        self.i_mapping_rev = {v: k for k, v in i_mapping.items()}
         self.item_type_map = item_type_map
         self.user_features = user_features
         self.item_features = item_features
@@ -82,39 +114,208 @@ class UserToItems:
         self.model = model
         self.num_items = num_items
         self.num_threads = num_threads
+        if item_type_index is None:
+            item_type_index = self.index_by_type(
+                item_mapping=i_mapping, item_type_map=item_type_map
+            )
+        self.item_type_index = item_type_index
+        if user_ids is None:
+            user_ids = SimilarItems.ids_by_internal_id(mapping=u_mapping)
+        self.user_ids = user_ids
+        if item_ids is None:
+            item_ids = SimilarItems.ids_by_internal_id(mapping=i_mapping)
+        self.item_ids = item_ids
+        self.mips_indexes = mips_indexes or {}
+        self.user_embeddings = user_embeddings
+        self.clean_item_ids = clean_item_ids
+
+    @staticmethod
+    def index_by_type(item_mapping, item_type_map):
+        """
+        Groups the internal item ids by the item types
+
+        :param item_mapping: A dictionary where keys are Totara item ids and values are
+            internal item ids
+        :type item_mapping: dict
+        :param item_type_map: A dictionary where keys are Totara item ids and values are
+            item types
+        :type item_type_map: dict
+        :return: A dictionary where keys are the item types and values are the sorted
+            arrays of the internal ids of the items of that type
+        :rtype: dict
+        """
+        type_ids = {}
+        for totara_id, internal_id in item_mapping.items():
+            item_type = item_type_map.get(totara_id)
+            if item_type is not None:
+                type_ids.setdefault(item_type, []).append(internal_id)
+        return {
+            item_type: np.sort(np.asarray(ids, dtype=np.int32))
+            for item_type, ids in type_ids.items()
+        }
 
-    def top_x_by_cat(self, sorted_items, item_type="container_course"):
+    def top_x(self, candidates, predictions):
         """
         Returns top `num_items` recommended items where `num_items` is the instance
         variable of the class
 
-        :param sorted_items: A list consisting of tuples where each tuple is composed of
-            three items; Totara item id, ranking, and the item type
-        :type sorted_items: list
-        :param item_type: Type of the items requested
-        :type item_type: str
+        :param candidates: The internal ids of the items that were scored
+        :type candidates: np.array
+        :param predictions: The recommendation scores of the `candidates`
+        :type predictions: np.float32 array
         :return: A list of tuples where the first elements are the Totara ids of the
             items and the second ones the ranking.
         :rtype: list
         """
-        cfg = Config()
-        item_types_allowed = cfg.get_property(property_name="item_types")
+        return self.top_x_block(
+            candidates=candidates, predictions=predictions[np.newaxis, :]
+        )[0]
 
-        type_recommended = [(x[0], x[1]) for x in sorted_items if x[2] == item_type][
-            : self.num_items
-        ]
-        removal_pattern = re.compile(pattern="|".join(item_types_allowed))
+    def top_block(self, predictions):
+        """
+        Finds the top `num_items` scores of each of the users in a block, where
+        `num_items` is the instance variable of the class
+
+        :param predictions: The recommendation scores of the candidate items of shape
+            `[n_users, n_candidates]`
+        :type predictions: np.float32 array
+        :return: A tuple of the positions of the best candidates and their scores, both
+            of shape `[n_users, min(num_items, n_candidates)]`, in descending order of
+            the scores in each row
+        :rtype: tuple
+        """
+        n_best = min(self.num_items, predictions.shape[1])
+        if n_best < predictions.shape[1]:
+            best = np.sort(
+                np.argpartition(-predictions, n_best - 1, axis=1)[:, :n_best], axis=1
+            )
+        else:
+            best = np.tile(np.arange(predictions.shape[1]), (predictions.shape[0], 1))
+        best_scores = np.take_along_axis(predictions, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        return best, best_scores
+
+    def top_x_block(self, candidates, predictions):
+        """
+        Returns top `num_items` recommended items for each of the users in a block, where
+        `num_items` is the instance variable of the class
+
+        :param candidates: The internal ids of the items that were scored
+        :type candidates: np.array
+        :param predictions: The recommendation scores of the `candidates` of shape
+            `[n_users, len(candidates)]`
+        :type predictions: np.float32 array
+        :return: A list with a list of tuples for each user, where the first elements
+            are the Totara ids of the items and the second ones the ranking.
+        :rtype: list
+        """
+        best, best_scores = self.top_block(predictions=predictions)
+        if self.clean_item_ids is None:
+            self.clean_item_ids = RecommendationStore.clean_ids(item_ids=self.item_ids)
         recommended = [
-            (removal_pattern.sub(repl="", string=x[0]), x[1]) for x in type_recommended
+            list(zip(ids_row, scores_row))
+            for ids_row, scores_row in zip(
+                self.clean_item_ids[candidates[best]].tolist(), best_scores.tolist()
+            )
         ]
         return recommended
 
+    def seen_positions(self, internal_uid, candidates):
+        """
+        Finds which of the `candidates` the user has already seen
+
+        :param internal_uid: The internal id of the user
+        :type internal_uid: int
+        :param candidates: The sorted internal ids of the items that are being scored
+        :type candidates: np.array
+        :return: The positions in `candidates` of the items the user has seen
+        :rtype: np.array
+        """
+        seen_totara_id = self.positive_inter_map.get(self.user_ids[internal_uid], [])
+        seen_internal_id = np.fromiter(
+            (self.i_mapping[x] for x in seen_totara_id),
+            dtype=np.int64,
+            count=len(seen_totara_id),
+        )
+        return np.flatnonzero(np.isin(candidates, seen_internal_id))
+
+    @staticmethod
+    def penalise_seen(predictions, seen_internal_id, reduction_percentage=0.5):
+        """
+        Reduces the recommendation scores of the items the user has already seen by a
+        percentage of the range of the scores of the unseen items
+
+        :param predictions: The recommendation scores of the items for the user. This
+            is modified in place
+        :type predictions: np.float32 array
+        :param seen_internal_id: The positions in `predictions` of the items the user
+            has seen
+        :type seen_internal_id: np.array
+        :param reduction_percentage: The percentage of the range of unseen item's
+            recommendation score by which the seen item's recommendation score will be
+            reduced, defaults to 0.5
+        :type reduction_percentage: float, optional
+        :return: The `predictions` after penalising the seen items
+        :rtype: np.float32 array
+        """
+        seen_internal_id = np.asarray(seen_internal_id, dtype=np.int64)
+        UserToItems.penalise_seen_block(
+            predictions=predictions[np.newaxis, :],
+            seen_rows=np.zeros(seen_internal_id.shape[0], dtype=np.int64),
+            seen_cols=seen_internal_id,
+            reduction_percentage=reduction_percentage,
+        )
+        return predictions
+
+    @staticmethod
+    def penalise_seen_block(
+        predictions, seen_rows, seen_cols, reduction_percentage=0.5
+    ):
+        """
+        Reduces the recommendation scores of the items each user in a block has already
+        seen by a percentage of the range of the scores of that user's unseen items
+
+        :param predictions: The recommendation scores of shape `[n_users, n_items]`.
+            This is modified in place
+        :type predictions: np.float32 array
+        :param seen_rows: The rows of the seen (user, item) pairs in `predictions`
+        :type seen_rows: np.array
+        :param seen_cols: The columns of the seen (user, item) pairs in `predictions`
+        :type seen_cols: np.array
+        :param reduction_percentage: The percentage of the range of unseen item's
+            recommendation score by which the seen item's recommendation score will be
+            reduced, defaults to 0.5
+        :type reduction_percentage: float, optional
+        :return: The `predictions` after penalising the seen items
+        :rtype: np.float32 array
+        """
+        if seen_rows.shape[0] == 0:
+            return predictions
+        seen_mask = np.zeros(predictions.shape, dtype=bool)
+        seen_mask[seen_rows, seen_cols] = True
+        unseen_range = np.where(seen_mask, -np.inf, predictions).max(axis=1) - np.where(
+            seen_mask, np.inf, predictions
+        ).min(axis=1)
+        penalty = np.where(
+            np.isfinite(unseen_range),
+            unseen_range.astype(np.float64) * reduction_percentage,
+            0.0,
+        )
+        predictions[seen_rows, seen_cols] = (
+            predictions[seen_rows, seen_cols].astype(np.float64) - penalty[seen_rows]
+        )
+        return predictions
+
     def get_items(
         self, internal_uid=2, item_type="container_course", reduction_percentage=0.5
     ):
         """
         Returns top `num_items` recommended items where `num_items` is the instance
-        variable of the class
+        variable of the class. When there is a MIPS index of the `item_type`, only the
+        candidates retrieved from it are scored, and the range of the scores for the
+        seen item penalty is estimated from them
 
         :param internal_uid: The internal id of the user for whom the recommendations
             are sought
@@ -129,36 +330,152 @@ class UserToItems:
             items and the second ones the ranking.
         :rtype: list
         """
-        item_ids = np.fromiter(self.i_mapping.values(), dtype=np.int32)
+        candidates = self.item_type_index.get(item_type)
+        if candidates is None or candidates.shape[0] == 0:
+            return []
+        if item_type in self.mips_indexes and self.user_embeddings is not None:
+            candidates = self.mips_indexes[item_type].retrieve(
+                user_embedding=self.user_embeddings[internal_uid],
+                n_candidates=max(
+                    self.num_items,
+                    Config().get_property(property_name="mips")["n_candidates"],
+                ),
+            )
         predictions = self.model.predict(
             user_ids=internal_uid,
-            item_ids=item_ids,
+            item_ids=candidates,
             user_features=self.user_features,
             item_features=self.item_features,
             num_threads=self.num_threads,
         )
-        seen_totara_id = []
-        if self.u_mapping_rev[internal_uid] in self.positive_inter_map:
-            seen_totara_id = self.positive_inter_map[self.u_mapping_rev[internal_uid]]
-        seen_internal_id = [self.i_mapping[x] for x in seen_totara_id]
-        unseen_internal_id = [
-            x for x in range(predictions.shape[0]) if x not in seen_internal_id
+        predictions = self.penalise_seen(
+            predictions=predictions,
+            seen_internal_id=self.seen_positions(
+                internal_uid=internal_uid, candidates=candidates
+            ),
+            reduction_percentage=reduction_percentage,
+        )
+        return self.top_x(candidates=candidates, predictions=predictions)
+
+    def score_block(self, internal_uids, candidates, reduction_percentage=0.5):
+        """
+        Scores the `candidates` for a block of users with a single matrix product and
+        penalises the items each user has already seen. The `model` must provide the
+        `predict_block` method of the `RepresentationScorer` class
+
+        :param internal_uids: The internal ids of the users in the block
+        :type internal_uids: np.array
+        :param candidates: The sorted internal ids of the items that are being scored
+        :type candidates: np.array
+        :param reduction_percentage: The percentage of the range of unseen item's
+            recommendation score by which the seen item's recommendation score will be
+            reduced, defaults to 0.5
+        :type reduction_percentage: float, optional
+        :return: The recommendation scores of shape `[len(internal_uids),
+            len(candidates)]`
+        :rtype: np.float32 array
+        """
+        predictions = self.model.predict_block(
+            user_ids=internal_uids, item_ids=candidates
+        )
+        seen = [
+            self.seen_positions(internal_uid=internal_uid, candidates=candidates)
+            for internal_uid in internal_uids
         ]
-        unseen_range = (
-            predictions[unseen_internal_id].max()
-            - predictions[unseen_internal_id].min()
+        return self.penalise_seen_block(
+            predictions=predictions,
+            seen_rows=np.repeat(
+                np.arange(internal_uids.shape[0]), [x.shape[0] for x in seen]
+            ),
+            seen_cols=np.concatenate(seen),
+            reduction_percentage=reduction_percentage,
         )
-        for j in range(predictions.shape[0]):
-            if j in seen_internal_id:
-                predictions[j] = predictions[j] - unseen_range * reduction_percentage
-        sorted_ids = predictions.argsort()[::-1]
-        sorted_items = [
-            (
-                self.i_mapping_rev[x],
-                predictions[x],
-                self.item_type_map[self.i_mapping_rev[x]],
+
+    def get_items_batch(
+        self, internal_uids, item_type="container_course", reduction_percentage=0.5
+    ):
+        """
+        Returns top `num_items` recommended items for each of the given users, where
+        `num_items` is the instance variable of the class. The users are scored in
+        blocks, each with a single matrix product, so the `model` must provide the
+        `predict_block` method of the `RepresentationScorer` class
+
+        :param internal_uids: The internal ids of the users for whom the
+            recommendations are sought
+        :type internal_uids: list
+        :param item_type: Type of the items requested
+        :type item_type: str
+        :param reduction_percentage: The percentage of the range of unseen item's
+            recommendation score by which the seen item's recommendation score will be
+            reduced, defaults to 0.5
+        :type reduction_percentage: float, optional
+        :return: A list with a list of tuples for each user in the order of
+            `internal_uids`, where the first elements are the Totara ids of the items
+            and the second ones the ranking.
+        :rtype: list
+        """
+        candidates = self.item_type_index.get(item_type)
+        if candidates is None or candidates.shape[0] == 0:
+            return [[] for _ in internal_uids]
+
+        block_size = Config().get_property("batch")["block_size"]
+        recommended = []
+        for start in range(0, len(internal_uids), block_size):
+            predictions = self.score_block(
+                internal_uids=np.asarray(internal_uids[start : start + block_size]),
+                candidates=candidates,
+                reduction_percentage=reduction_percentage,
             )
-            for x in sorted_ids
-        ]
-        best_with_score = self.top_x_by_cat(sorted_items, item_type=item_type)
-        return best_with_score
+            recommended.extend(
+                self.top_x_block(candidates=candidates, predictions=predictions)
+            )
+        return recommended
+
+    def top_ids_batch(
+        self, internal_uids, item_type="container_course", reduction_percentage=0.5
+    ):
+        """
+        Finds the internal ids and the scores of the top `num_items` recommended items
+        for each of the given users, where `num_items` is the instance variable of the
+        class. The users are scored in blocks as in the `get_items_batch` method
+
+        :param internal_uids: The internal ids of the users for whom the
+            recommendations are sought
+        :type internal_uids: list
+        :param item_type: Type of the items requested
+        :type item_type: str
+        :param reduction_percentage: The percentage of the range of unseen item's
+            recommendation score by which the seen item's recommendation score will be
+            reduced, defaults to 0.5
+        :type reduction_percentage: float, optional
+        :return: A tuple of the internal ids of the recommended items and their scores,
+            both of shape `[len(internal_uids), min(num_items, n_candidates)]`, in
+            descending order of the scores in each row
+        :rtype: tuple
+        """
+        candidates = self.item_type_index.get(item_type)
+        if candidates is None or candidates.shape[0] == 0:
+            return (
+                np.empty((len(internal_uids), 0), dtype=np.int64),
+                np.empty((len(internal_uids), 0), dtype=np.float32),
+            )
+
+        block_size = Config().get_property("batch")["block_size"]
+        best_ids, best_scores = [], []
+        for start in range(0, len(internal_uids), block_size):
+            predictions = self.score_block(
+                internal_uids=np.asarray(internal_uids[start : start + block_size]),
+                candidates=candidates,
+                reduction_percentage=reduction_percentage,
+            )
+            best, scores = self.top_block(predictions=predictions)
+            best_ids.append(candidates[best])
+            best_scores.append(scores)
+        if not best_ids:
+            return (
+                np.empty((0, min(self.num_items, candidates.shape[0])), dtype=np.int64),
+                np.empty(
+                    (0, min(self.num_items, candidates.shape[0])), dtype=np.float32
+                ),
+            )
+        return np.vstack(best_ids), np.vstack(best_scores)
@@ -21,6 +21,7 @@ from service.recommender.data_subroutines.remove_external_interactions import (
     RemoveExternalInteractions,
 )
 from service.recommender.config import Config
+from service.recommender.train_telemetry import TrainTelemetry
 
 
 class PrepareData:
@@ -28,7 +29,7 @@ class PrepareData:
     To prepare the data for training recommendations model
     """
 
-    def __init__(self, data=None, query="mf"):
+    def __init__(self, data=None, query="mf", telemetry=None):
         """
         Class constructor method
 
@@ -47,9 +48,13 @@ class PrepareData:
         :type data: dict
         :param query: One of hybrid, partial or mf
         :type query: str
+        :param telemetry: Where the stages of the data preparation of each tenant are
+            timed, defaults to None
+        :type telemetry: TrainTelemetry, optional
         """
         self.data = data
         self.query = query
+        self.telemetry = telemetry or TrainTelemetry()
         self.cfg = Config()
 
     def get_tenants(self):
@@ -75,16 +80,20 @@ class PrepareData:
         :return: A dictionary of the processed data
         :rtype: dict
         """
-        d_loader = DataLoader(query=self.query)
+        telemetry = self.telemetry.for_tenant(tenant=tenant)
+        d_loader = DataLoader(query=self.query, telemetry=telemetry)
 
         interactions_df = self.data[f"user_interactions_{tenant}"]
         items_data = self.data[f"item_data_{tenant}"]
         users_data = self.data[f"user_data_{tenant}"]
         # Remove interactions by the users and items that are not in the current tenant
-        interactions_cleaner = RemoveExternalInteractions(
-            users_df=users_data, items_df=items_data, interactions_df=interactions_df
-        )
-        interactions_df = interactions_cleaner.clean_interactions()
+        with telemetry.stage(name="remove_external_interactions"):
+            interactions_cleaner = RemoveExternalInteractions(
+                users_df=users_data,
+                items_df=items_data,
+                interactions_df=interactions_df,
+            )
+            interactions_df = interactions_cleaner.clean_interactions()
         shape = (users_data.shape[0], items_data.shape[0])
         min_data = self.cfg.get_property("min_data")
 
@@ -0,0 +1,264 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+
+from service.recommender.config import Config
+from service.recommender.predict_subroutines.recommendation_store import (
+    RecommendationStore,
+)
+from service.recommender.predict_subroutines.representation_scorer import (
+    RepresentationScorer,
+)
+from service.recommender.predict_subroutines.similar_items import SimilarItems
+from service.recommender.predict_subroutines.user_to_items import UserToItems
+from service.recommender.train_telemetry import TrainTelemetry
+
+
+class PrepareServing:
+    """
+    To materialise the per tenant data that the recommendation endpoints reuse on every
+    request, once the models are loaded or swapped in the service
+    """
+
+    def __init__(self, store_size=0):
+        """
+        Class constructor method
+
+        :param store_size: The number of similar items for each item, and of
+            recommended items of each type for each user, that are precomputed into the
+            recommendation stores. No stores are built when this is 0, defaults to 0
+        :type store_size: int, optional
+        """
+        self.store_size = int(store_size)
+
+    @staticmethod
+    def as_float32(representations):
+        """
+        To store the biases and embeddings as contiguous float32 arrays so that they can
+        be used directly by the BLAS routines
+
+        :param representations: A tuple of biases and embeddings
+        :type representations: tuple
+        :return: A tuple of biases and embeddings as contiguous float32 arrays
+        :rtype: tuple
+        """
+        return tuple(
+            np.ascontiguousarray(array, dtype=np.float32) for array in representations
+        )
+
+    def prepare_tenant(self, tenant_model):
+        """
+        To compute the serving data for a single tenant's trained model
+
+        :param tenant_model: The tenant's dictionary as produced by
+            `TrainRecommender.train_models`
+        :type tenant_model: dict
+        :return: A new dictionary that has all the keys of `tenant_model` and the
+            following additional keys:
+
+            | **item_representations:** a tuple of the item biases of shape
+                `[n_items,]` and the item embeddings of shape `[n_items,
+                num_components]`, as returned by the
+                `LightFM.get_item_representations` method,
+            | **user_representations:** a tuple of the user biases of shape
+                `[n_users,]` and the user embeddings of shape `[n_users,
+                num_components]`, as returned by the `LightFM.get_user_representations`
+                method,
+            | **item_unit_embeddings:** the item embeddings scaled to unit length as a
+                contiguous float32 array of shape `[n_items, num_components]`,
+            | **item_ids:** an array of the Totara item ids ordered by their internal
+                ids,
+            | **user_ids:** an array of the Totara user ids ordered by their internal
+                ids,
+            | **clean_item_ids:** an array of the Totara item ids without the item type
+                prefixes, as returned by the endpoints, ordered by their internal ids,
+                and
+            | **item_type_index:** a dictionary where keys are the item types and values
+                are sorted arrays of the internal ids of the items of that type.
+
+            When the `store_size` of the instance is positive, also:
+
+            | **similar_items_store:** a `RecommendationStore` of the `store_size` most
+                similar items of each item, and
+            | **user_items_stores:** a dictionary where keys are the item types and
+                values are `RecommendationStore` objects of the `store_size` items of
+                that type recommended to each user.
+        :rtype: dict
+        """
+        item_representations = self.as_float32(
+            representations=tenant_model["model"].get_item_representations(
+                features=tenant_model["item_features"]
+            )
+        )
+        user_representations = self.as_float32(
+            representations=tenant_model["model"].get_user_representations(
+                features=tenant_model["user_features"]
+            )
+        )
+        item_ids = SimilarItems.ids_by_internal_id(mapping=tenant_model["mappings"][2])
+        prepared = {
+            **tenant_model,
+            "item_representations": item_representations,
+            "user_representations": user_representations,
+            "item_unit_embeddings": SimilarItems.normalise(
+                embeddings=item_representations[1]
+            ),
+            "item_ids": item_ids,
+            "user_ids": SimilarItems.ids_by_internal_id(
+                mapping=tenant_model["mappings"][0]
+            ),
+            "clean_item_ids": RecommendationStore.clean_ids(item_ids=item_ids),
+            "item_type_index": UserToItems.index_by_type(
+                item_mapping=tenant_model["mappings"][2],
+                item_type_map=tenant_model["item_type_map"],
+            ),
+        }
+        return self.prepare_stores(prepared=prepared)
+
+    def prepare_stores(self, prepared):
+        """
+        To precompute the recommendation stores of a tenant with the `store_size` of the
+        instance, replacing the ones it may already have
+
+        :param prepared: The tenant's dictionary with the serving data
+        :type prepared: dict
+        :return: A new dictionary with the recommendation stores, or without any when
+            the `store_size` of the instance is 0
+        :rtype: dict
+        """
+        prepared = {
+            key: value
+            for key, value in prepared.items()
+            if key not in ("similar_items_store", "user_items_stores")
+        }
+        if self.store_size > 0:
+            prepared["similar_items_store"] = self.similar_items_store(
+                prepared=prepared
+            )
+            prepared["user_items_stores"] = self.user_items_stores(prepared=prepared)
+        return prepared
+
+    def similar_items_store(self, prepared):
+        """
+        To rank the `store_size` most similar items of every item of a tenant
+
+        :param prepared: The tenant's dictionary with the serving data
+        :type prepared: dict
+        :return: The store of the similar items of each item
+        :rtype: RecommendationStore
+        """
+        similar_items = SimilarItems(
+            item_mapping=prepared["mappings"][2],
+            item_representations=prepared["item_representations"][1],
+            num_items=self.store_size,
+            unit_embeddings=prepared["item_unit_embeddings"],
+            item_ids=prepared["item_ids"],
+            ann_index=prepared.get("ann_index"),
+            clean_item_ids=prepared["clean_item_ids"],
+        )
+        n_items = prepared["item_ids"].shape[0]
+        block_size = Config().get_property(property_name="batch")["block_size"]
+        ranked_ids, ranked_scores = [], []
+        for start in range(0, n_items, block_size):
+            candidates, scores = similar_items.top_similar_block(
+                internal_ids=np.arange(start, min(start + block_size, n_items))
+            )
+            ranked_ids.append(candidates)
+            ranked_scores.append(scores)
+        return RecommendationStore.from_ranked(
+            ranked_ids=np.vstack(ranked_ids),
+            ranked_scores=np.vstack(ranked_scores),
+            item_ids=prepared["item_ids"],
+            depth=self.store_size,
+            clean_item_ids=prepared["clean_item_ids"],
+        )
+
+    def user_items_stores(self, prepared):
+        """
+        To rank the `store_size` items of each type recommended to every user of a
+        tenant
+
+        :param prepared: The tenant's dictionary with the serving data
+        :type prepared: dict
+        :return: A dictionary where keys are the item types and values are the stores of
+            the items of that type recommended to each user
+        :rtype: dict
+        """
+        user_to_items = UserToItems(
+            u_mapping=prepared["mappings"][0],
+            i_mapping=prepared["mappings"][2],
+            item_type_map=prepared["item_type_map"],
+            positive_inter_map=prepared["positive_interactions_map"],
+            model=RepresentationScorer(
+                user_representations=prepared["user_representations"],
+                item_representations=prepared["item_representations"],
+            ),
+            num_items=self.store_size,
+            item_type_index=prepared["item_type_index"],
+            user_ids=prepared["user_ids"],
+            item_ids=prepared["item_ids"],
+            clean_item_ids=prepared["clean_item_ids"],
+        )
+        internal_uids = np.arange(prepared["user_ids"].shape[0])
+        stores = {}
+        for item_type in prepared["item_type_index"]:
+            ranked_ids, ranked_scores = user_to_items.top_ids_batch(
+                internal_uids=internal_uids, item_type=item_type
+            )
+            stores[item_type] = RecommendationStore.from_ranked(
+                ranked_ids=ranked_ids,
+                ranked_scores=ranked_scores,
+                item_ids=prepared["item_ids"],
+                depth=self.store_size,
+                clean_item_ids=prepared["clean_item_ids"],
+            )
+        return stores
+
+    def prepare_models(self, models, telemetry=None):
+        """
+        To compute the serving data for every tenant whose model has been trained
+        successfully. Tenants that were skipped during training, and the ones whose
+        previous model was kept with its serving data, are returned as they are
+
+        :param models: The dictionary of tenant models as produced by
+            `TrainRecommender.train_models`, optionally with the `algorithm` key
+        :type models: dict
+        :param telemetry: Where the preparation of each tenant is timed, defaults to
+            None
+        :type telemetry: TrainTelemetry, optional
+        :return: A dictionary with the same keys as `models` where each trained tenant
+            has been extended with the serving data
+        :rtype: dict
+        """
+        if models is None:
+            return None
+
+        telemetry = telemetry or TrainTelemetry()
+        prepared = {}
+        for key, value in models.items():
+            if (
+                isinstance(value, dict)
+                and value.get("msg") == "success"
+                and "item_representations" not in value
+            ):
+                with telemetry.for_tenant(tenant=key).stage(name="prepare_serving"):
+                    prepared[key] = self.prepare_tenant(tenant_model=value)
+            else:
+                prepared[key] = value
+        return prepared
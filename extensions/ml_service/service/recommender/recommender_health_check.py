@@ -19,6 +19,8 @@ Please contact [licensing@totaralearning.com] for more information.
 import pandas as pd
 from os import path
 
+from service.recommender.train_telemetry import TrainTelemetry
+
 
 class RecommenderHealthCheck:
     """
@@ -78,7 +80,8 @@ class RecommenderHealthCheck:
         This returns the information on the current recommendation model and the last
         training logs
 
-        :return: Status of the current recommendation model and the last logs
+        :return: Status of the current recommendation model, the last logs and the
+            summary of the timing of the last training when there is one
         :rtype: dict
         """
         if not self.recommender_model:
@@ -93,4 +96,8 @@ class RecommenderHealthCheck:
         else:
             recommender_info["logs_file_exists"] = "false"
 
+        telemetry = TrainTelemetry.read_summary(logs_dir=self.logs_dir)
+        if telemetry is not None:
+            recommender_info["last_training_telemetry"] = telemetry
+
         return recommender_info
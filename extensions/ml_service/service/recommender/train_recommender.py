@@ -17,12 +17,22 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from service.recommender.config import Config
+from service.recommender.predict_subroutines.ivf_index import IVFIndex
+from service.recommender.predict_subroutines.mips_index import MIPSIndex
+from service.recommender.predict_subroutines.similar_items import SimilarItems
+from service.recommender.predict_subroutines.user_to_items import UserToItems
 from service.recommender.train_subroutines.build_model import BuildModel
 from service.recommender.train_subroutines.optimize_hyperparams import (
     OptimizeHyperparams,
 )
+from service.recommender.train_subroutines.warm_start_model import WarmStartModel
 from service.recommender.prepare_data import PrepareData
+from service.recommender.train_telemetry import TrainTelemetry
 
 
 class TrainRecommender:
@@ -30,7 +40,16 @@ class TrainRecommender:
     This is the conceptual representation of the recommendation model training process
     """
 
-    def __init__(self, data=None, query="mf", num_threads=2):
+    def __init__(
+        self,
+        data=None,
+        query="mf",
+        num_threads=2,
+        telemetry=None,
+        previous_model=None,
+        full_retrain_freq=0,
+        workers=1,
+    ):
         """
         This is the class constructor method
 
@@ -45,7 +64,10 @@ class TrainRecommender:
             | **user_data_{tenant}:** one or more pandas DataFrames of user data
                 depending on the number of tenants in `tenants` DataFrame, and
             | **item_data_{tenant}:** one or more pandas DataFrames of item data
-                depending on the number of tenants in `tenants` DataFrame.
+                depending on the number of tenants in `tenants` DataFrame,
+            | **fingerprint_{tenant}:** optionally, the fingerprint of the data of the
+                tenant. The three DataFrames of a tenant may be left out when this is
+                the fingerprint of its previous model, which is then kept as it is.
         :type data: dict
         :param query: One of 'mf' (collaborative filtering), 'partial' (content based
             filtering without text processing), or 'hybrid' (content based filtering
@@ -55,10 +77,29 @@ class TrainRecommender:
         :param num_threads: Number of parallel computation threads to use. Should not be
             higher than the number of physical cores, defaults to 2
         :type num_threads: int, optional
+        :param telemetry: Where the stages of the training of each tenant are timed,
+            defaults to None
+        :type telemetry: TrainTelemetry, optional
+        :param previous_model: A function that takes a tenant id and returns the
+            tenant's previous model, or None when there is none, defaults to None
+        :type previous_model: callable, optional
+        :param full_retrain_freq: The number of minutes after which a tenant's model is
+            trained from scratch again. Until then, the previous model is updated
+            incrementally with the new data. Every model is trained from scratch when
+            this is 0, defaults to 0
+        :type full_retrain_freq: float, optional
+        :param workers: The number of processes that train tenants at the same time,
+            sharing the `num_threads` between them. The tenants are trained one after
+            another in this process when this is 1, defaults to 1
+        :type workers: int, optional
         """
         self.data = data
         self.query = query
         self.num_threads = num_threads
+        self.telemetry = telemetry or TrainTelemetry()
+        self.previous_model = previous_model
+        self.full_retrain_freq = float(full_retrain_freq)
+        self.workers = max(int(workers), 1)
         self.cfg = Config()
 
     def train_models(self):
@@ -76,66 +117,394 @@ class TrainRecommender:
                 optimization for hyper-parameters. The last one is the best one,
             | **score:** a list of 'score' while running optimization for
                 hyper-parameters. The last one is the best one,
+            | **training:** 'full' when the model was trained from scratch, or
+                'incremental' when the previous model was updated,
+            | **full_trained_at:** the time in seconds since the epoch when the model
+                was last trained from scratch,
+            | **incremental_updates:** the number of incremental updates since then,
+            | **fingerprint:** the fingerprint of the data the model was trained on, or
+                None when the data has none,
             | **model:** LightFM trained model for this tenant,
             | **mappings:** a tuple of mappings (user id, user features, item id, item
                 features),
             | **item_features:** a sparse matrix of item features data,
             | **user_features:** a sparse matrix of user features data,
-            | **item_type_map:** a map between item ids and item types, and
+            | **item_type_map:** a map between item ids and item types,
             | **positive_interactions_map:** a map between user ids and list of items
-                they have interacted with.
+                they have interacted with,
+            | **ann_index:** the approximate nearest neighbour index of the items, or
+                None when the tenant has fewer items than configured for the index, and
+            | **mips_indexes:** a dictionary where keys are the item types with at least
+                as many items as configured for the index and values are the maximum
+                inner product search indexes of the items of that type.
+
+            The tenants whose data was left out because it has the fingerprint of their
+            previous model keep that model as it is.
         :rtype: dict
         """
-        data_processor = PrepareData(data=self.data, query=self.query)
+        data_processor = PrepareData(
+            data=self.data, query=self.query, telemetry=self.telemetry
+        )
         tenants = data_processor.get_tenants()
         models = {}
+        pending = []
         for tenant in tenants:
-            tenant_data = data_processor.get_tenant_data(tenant=tenant)
-            if "msg" in tenant_data:
-                models[tenant] = {"msg": tenant_data["msg"]}
+            unchanged = self.unchanged_model(
+                tenant=tenant,
+                fingerprint=self.data.get(f"fingerprint_{tenant}"),
+                telemetry=self.telemetry.for_tenant(tenant=tenant),
+            )
+            if unchanged is not None:
+                models[tenant] = unchanged
             else:
-                if self.query in ["hybrid", "partial"]:
-                    item_alpha = self.cfg.get_property("item_alpha")
-                    user_alpha = self.cfg.get_property("user_alpha")
-                else:
-                    item_alpha = 0.0
-                    user_alpha = 0.0
-                # --------------------------------------------------
-                # We will optimize the 'epochs' and the latent dimension of the
-                # user-item interaction matrix called the 'no_components'
-                opt_obj = OptimizeHyperparams(
-                    processed_data=tenant_data,
-                    num_threads=self.num_threads,
-                    user_alpha=user_alpha,
-                    item_alpha=item_alpha,
-                )
-                epochs, comps, scores = opt_obj.run_optimization()
-                # --------------------------------------------------
-                # Train the final model with the optimum number of 'epochs' and the
-                # 'no_components'
-                model_obj = BuildModel(
-                    processed_data=tenant_data,
-                    num_threads=self.num_threads,
-                    optimized_hyperparams={
-                        "epochs": epochs[-1],
-                        "no_components": comps[-1],
-                    },
-                    user_alpha=user_alpha,
-                    item_alpha=item_alpha,
+                pending.append(tenant)
+        if self.workers > 1 and len(pending) > 1:
+            models.update(self.train_in_workers(tenants=pending))
+        else:
+            for tenant in pending:
+                models[tenant] = self.train_tenant(
+                    tenant=tenant, data_processor=data_processor
                 )
+        return {tenant: models[tenant] for tenant in tenants}
+
+    def train_tenant(self, tenant, data_processor):
+        """
+        To train the recommendation model of a tenant
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :param data_processor: The processor of the data of the tenant
+        :type data_processor: PrepareData
+        :return: The tenant's dictionary, as described in `train_models`
+        :rtype: dict
+        """
+        telemetry = self.telemetry.for_tenant(tenant=tenant)
+        fingerprint = self.data.get(f"fingerprint_{tenant}")
+        tenant_data = data_processor.get_tenant_data(tenant=tenant)
+        if "msg" in tenant_data:
+            return {"msg": tenant_data["msg"], "fingerprint": fingerprint}
+        update = self.update_model(
+            tenant=tenant, tenant_data=tenant_data, telemetry=telemetry
+        )
+        if update is not None:
+            final_model, training = update
+        else:
+            if self.query in ["hybrid", "partial"]:
+                item_alpha = self.cfg.get_property("item_alpha")
+                user_alpha = self.cfg.get_property("user_alpha")
+            else:
+                item_alpha = 0.0
+                user_alpha = 0.0
+            # --------------------------------------------------
+            # We will optimize the 'epochs' and the latent dimension of the
+            # user-item interaction matrix called the 'no_components'
+            opt_obj = OptimizeHyperparams(
+                processed_data=tenant_data,
+                num_threads=self.num_threads,
+                user_alpha=user_alpha,
+                item_alpha=item_alpha,
+                telemetry=telemetry,
+            )
+            epochs, comps, scores = opt_obj.run_optimization()
+            # --------------------------------------------------
+            # Train the final model with the optimum number of 'epochs' and the
+            # 'no_components'
+            model_obj = BuildModel(
+                processed_data=tenant_data,
+                num_threads=self.num_threads,
+                optimized_hyperparams={
+                    "epochs": epochs[-1],
+                    "no_components": comps[-1],
+                },
+                user_alpha=user_alpha,
+                item_alpha=item_alpha,
+            )
+            with telemetry.stage(
+                name="fit", epochs=int(epochs[-1]), n_components=int(comps[-1])
+            ):
                 final_model = model_obj.build_model()
-                models[tenant] = {
-                    "msg": "success",
-                    "epochs": epochs,
-                    "n_components": comps,
-                    "score": scores,
-                    "model": final_model,
-                    "mappings": tenant_data["mappings"],
-                    "item_features": tenant_data["items_processed_data"],
-                    "user_features": tenant_data["users_processed_data"],
-                    "item_type_map": tenant_data["item_type_map"],
-                    "positive_interactions_map": tenant_data["interactions"][
-                        "positive_interactions_map"
-                    ],
-                }
+            training = {
+                "epochs": epochs,
+                "n_components": comps,
+                "score": scores,
+                "training": "full",
+                "full_trained_at": time.time(),
+                "incremental_updates": 0,
+            }
+        with telemetry.stage(name="ann_index"):
+            ann_index = self.build_ann_index(
+                model=final_model,
+                item_features=tenant_data["items_processed_data"],
+            )
+        with telemetry.stage(name="mips_indexes"):
+            mips_indexes = self.build_mips_indexes(
+                model=final_model,
+                item_features=tenant_data["items_processed_data"],
+                item_mapping=tenant_data["mappings"][2],
+                item_type_map=tenant_data["item_type_map"],
+            )
+        return {
+            "msg": "success",
+            **training,
+            "model": final_model,
+            "mappings": tenant_data["mappings"],
+            "item_features": tenant_data["items_processed_data"],
+            "user_features": tenant_data["users_processed_data"],
+            "item_type_map": tenant_data["item_type_map"],
+            "positive_interactions_map": tenant_data["interactions"][
+                "positive_interactions_map"
+            ],
+            "ann_index": ann_index,
+            "mips_indexes": mips_indexes,
+            "fingerprint": fingerprint,
+        }
+
+    def train_in_workers(self, tenants):
+        """
+        To train the models of the tenants in a pool of worker processes, each with its
+        share of the `num_threads`. The largest tenants are started first, so that the
+        run takes about as long as the largest tenant, and each tenant's model and
+        telemetry are collected as soon as it is trained
+
+        :param tenants: The ids of the tenants to train
+        :type tenants: list
+        :return: A dictionary where keys are the tenant ids and values are the tenants'
+            dictionaries, as described in `train_models`
+        :rtype: dict
+        """
+        n_workers = min(self.workers, len(tenants))
+        options = {
+            "query": self.query,
+            "num_threads": max(self.num_threads // n_workers, 1),
+            "full_retrain_freq": self.full_retrain_freq,
+            "run": self.telemetry.run,
+        }
+        models = {}
+        # Spawn rather than fork, as the trainer already runs the scheduler and BLAS
+        # threads
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    train_tenant_in_worker,
+                    options=options,
+                    tenant=tenant,
+                    data=self.tenant_data(tenant=tenant),
+                    previous=self.previous_model(tenant)
+                    if self.full_retrain_freq > 0 and self.previous_model is not None
+                    else None,
+                )
+                for tenant in sorted(tenants, key=self.tenant_size, reverse=True)
+            ]
+            for future in as_completed(futures):
+                tenant, model, records = future.result()
+                models[tenant] = model
+                self.telemetry.add_records(records=records)
         return models
+
+    def tenant_data(self, tenant):
+        """
+        To extract the data of a tenant from the data dictionary, to be sent to the
+        worker process that trains it
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: The data dictionary with the `tenants` DataFrame and the keys of the
+            tenant only
+        :rtype: dict
+        """
+        keys = ["data_status", "tenants"] + [
+            f"{prefix}_{tenant}"
+            for prefix in ["user_interactions", "user_data", "item_data", "fingerprint"]
+        ]
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    def tenant_size(self, tenant):
+        """
+        To estimate how long a tenant takes to train from its number of interactions
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: The number of interactions of the tenant
+        :rtype: int
+        """
+        interactions = self.data.get(f"user_interactions_{tenant}")
+        return 0 if interactions is None else interactions.shape[0]
+
+    def unchanged_model(self, tenant, fingerprint, telemetry):
+        """
+        To keep the tenant's previous model when the tenant's data was left out of the
+        data dictionary because it has the fingerprint of that model
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :param fingerprint: The fingerprint of the tenant's data, or None when it has
+            none
+        :type fingerprint: str
+        :param telemetry: Where the reading of the previous model is timed
+        :type telemetry: TrainTelemetry
+        :return: The previous model, a dictionary with a message when it is no longer
+            available, or None when the tenant's data is in the data dictionary
+        :rtype: dict
+        """
+        if fingerprint is None or f"user_interactions_{tenant}" in self.data:
+            return None
+        with telemetry.stage(name="unchanged") as details:
+            previous = None
+            if self.previous_model is not None:
+                previous = self.previous_model(tenant)
+            details["kept"] = (
+                previous is not None and previous.get("fingerprint") == fingerprint
+            )
+        if not details["kept"]:
+            return {
+                "msg": "The previous model of the tenant is no longer available",
+                "fingerprint": None,
+            }
+        return previous
+
+    def update_model(self, tenant, tenant_data, telemetry):
+        """
+        To update the tenant's previous model incrementally with the new data, when it
+        was trained from scratch less than `full_retrain_freq` minutes ago
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :param tenant_data: The processed data of the tenant
+        :type tenant_data: dict
+        :param telemetry: Where the update of the tenant is timed
+        :type telemetry: TrainTelemetry
+        :return: A tuple of the updated LightFM model and the dictionary of its
+            `epochs`, `n_components`, `score`, `training`, `full_trained_at` and
+            `incremental_updates`, or None when the model must be trained from scratch
+        :rtype: tuple
+        """
+        if self.full_retrain_freq <= 0 or self.previous_model is None:
+            return None
+        previous = self.previous_model(tenant)
+        if (
+            previous is None
+            or previous.get("msg") != "success"
+            or time.time() - previous.get("full_trained_at", 0)
+            > self.full_retrain_freq * 60
+        ):
+            return None
+        with telemetry.stage(name="fit_partial") as details:
+            model = WarmStartModel(
+                processed_data=tenant_data,
+                previous_model=previous,
+                num_threads=self.num_threads,
+            ).build_model()
+            details["updated"] = model is not None
+        if model is None:
+            return None
+        return model, {
+            "epochs": list(previous["epochs"]),
+            "n_components": list(previous["n_components"]),
+            "score": list(previous["score"]),
+            "training": "incremental",
+            "full_trained_at": previous["full_trained_at"],
+            "incremental_updates": previous.get("incremental_updates", 0) + 1,
+        }
+
+    def build_ann_index(self, model, item_features):
+        """
+        To build the approximate nearest neighbour index of the items of a tenant whose
+        catalog is large enough for the exact scan of the similar items to be slow
+
+        :param model: LightFM trained model for the tenant
+        :type model: LightFM instance
+        :param item_features: A sparse matrix of the item features of shape
+            `n_items, n_features`, or None when the model has no item features
+        :type item_features: `scipy.sparse.csr_matrix` instance
+        :return: The index of the items, or None when the tenant has fewer items than
+            the configured `min_items`
+        :rtype: IVFIndex
+        """
+        ann_cfg = self.cfg.get_property("ann")
+        __, item_embeddings = model.get_item_representations(features=item_features)
+        if item_embeddings.shape[0] < ann_cfg["min_items"]:
+            return None
+        return IVFIndex.build(
+            unit_embeddings=SimilarItems.normalise(embeddings=item_embeddings),
+            n_lists=ann_cfg["n_lists"],
+            n_probe=ann_cfg["n_probe"],
+        )
+
+    def build_mips_indexes(self, model, item_features, item_mapping, item_type_map):
+        """
+        To build the maximum inner product search index of the items of each type that
+        has enough items for scoring all of them per request to be slow
+
+        :param model: LightFM trained model for the tenant
+        :type model: LightFM instance
+        :param item_features: A sparse matrix of the item features of shape
+            `n_items, n_features`
+        :type item_features: `scipy.sparse.csr_matrix` instance
+        :param item_mapping: A dictionary where keys are Totara item ids and values are
+            internal item ids
+        :type item_mapping: dict
+        :param item_type_map: A map between item ids and item types
+        :type item_type_map: dict
+        :return: A dictionary where keys are the item types with at least the
+            configured `min_items` items and values are the indexes of their items
+        :rtype: dict
+        """
+        mips_cfg = self.cfg.get_property("mips")
+        type_index = UserToItems.index_by_type(
+            item_mapping=item_mapping, item_type_map=item_type_map
+        )
+        large_types = [
+            item_type
+            for item_type, candidates in type_index.items()
+            if candidates.shape[0] >= mips_cfg["min_items"]
+        ]
+        if not large_types:
+            return {}
+        item_representations = model.get_item_representations(features=item_features)
+        return {
+            item_type: MIPSIndex.build(
+                item_representations=item_representations,
+                candidates=type_index[item_type],
+                n_lists=mips_cfg["n_lists"],
+                n_probe=mips_cfg["n_probe"],
+            )
+            for item_type in large_types
+        }
+
+
+def train_tenant_in_worker(options, tenant, data, previous):
+    """
+    To train the model of a tenant in a worker process of
+    `TrainRecommender.train_in_workers`
+
+    :param options: The `query`, `num_threads`, `full_retrain_freq` and telemetry `run`
+        of the trainer
+    :type options: dict
+    :param tenant: The tenant id
+    :type tenant: str
+    :param data: The data dictionary of the tenant
+    :type data: dict
+    :param previous: The tenant's previous model to be updated incrementally, or None
+    :type previous: dict
+    :return: A tuple of the tenant id, the tenant's dictionary, as described in
+        `TrainRecommender.train_models`, and the stages recorded by its telemetry
+    :rtype: tuple
+    """
+    telemetry = TrainTelemetry(run=options["run"])
+    trainer = TrainRecommender(
+        data=data,
+        query=options["query"],
+        num_threads=options["num_threads"],
+        telemetry=telemetry,
+        previous_model=lambda __: previous,
+        full_retrain_freq=options["full_retrain_freq"],
+    )
+    model = trainer.train_tenant(
+        tenant=tenant,
+        data_processor=PrepareData(
+            data=data, query=options["query"], telemetry=telemetry
+        ),
+    )
+    return tenant, model, telemetry.records
@@ -17,11 +17,13 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from lightfm import LightFM
 from lightfm.evaluation import auc_score
 from lightfm.cross_validation import random_train_test_split
 
 from service.recommender.config import Config
+from service.recommender.train_telemetry import TrainTelemetry
 
 
 class OptimizeHyperparams:
@@ -36,6 +38,7 @@ class OptimizeHyperparams:
         num_threads=2,
         item_alpha=0.0,
         user_alpha=0.0,
+        telemetry=None,
     ):
         """
         Constructor method
@@ -49,6 +52,9 @@ class OptimizeHyperparams:
         :type item_alpha: float, optional
         :param user_alpha: L2 penalty on user features, defaults to 0
         :type user_alpha: float, optional
+        :param telemetry: Where each evaluation of the hyper-parameters is timed,
+            defaults to None
+        :type telemetry: TrainTelemetry, optional
         """
         interactions = processed_data["interactions"]["interactions"]
         self.user_features = processed_data["users_processed_data"]
@@ -68,56 +74,123 @@ class OptimizeHyperparams:
         self.num_threads = num_threads
         self.user_alpha = user_alpha
         self.item_alpha = item_alpha
+        self.telemetry = telemetry or TrainTelemetry()
         cfg = Config()
         self.bounds = cfg.get_property("bounds")
+        self.search = cfg.get_property("hyperparams_search")
+        self.annealing = cfg.get_property("annealing")
+        self.halving = cfg.get_property("halving")
+        self.evaluations = {}
 
-    def compute_performance(self, epochs=1, comps=10):
+    def new_model(self, comps):
         """
-        Computes the AUC score on the `test_data` after building model on the
-        `train_data` with the given epochs and the number of components
+        To create an untrained model with the given number of components
 
-        :param epochs: Number of epochs
-        :type epochs: int
         :param comps: Latent dimension or the number of components
         :type comps: int
-        :return: The AUC score on the `test_data`
-        :rtype: float
+        :return: The untrained model
+        :rtype: LightFM
         """
-        model = LightFM(
+        return LightFM(
             loss="warp",
             user_alpha=self.user_alpha,
             item_alpha=self.item_alpha,
             learning_schedule="adadelta",
             no_components=comps,
         )
-        model.fit(
-            interactions=self.train_data,
-            sample_weight=self.train_weights,
-            user_features=self.user_features,
-            item_features=self.item_features,
-            epochs=epochs,
-            num_threads=self.num_threads,
-        )
+
+    def score_model(self, model, num_threads):
+        """
+        To compute the AUC score of a model on the `test_data`
+
+        :param model: The model trained on the `train_data`
+        :type model: LightFM
+        :param num_threads: Number of parallel computation threads to use
+        :type num_threads: int
+        :return: The mean AUC score of the users, or 0 when there are none
+        :rtype: float
+        """
         score = auc_score(
             model=model,
             test_interactions=self.test_data,
             train_interactions=self.train_data,
             user_features=self.user_features,
             item_features=self.item_features,
-            num_threads=self.num_threads,
+            num_threads=num_threads,
         )
+        return score.mean() if score.shape[0] > 0 else 0
+
+    def compute_performance(self, epochs=1, comps=10, num_threads=None):
+        """
+        Computes the AUC score on the `test_data` after building model on the
+        `train_data` with the given epochs and the number of components
+
+        :param epochs: Number of epochs
+        :type epochs: int
+        :param comps: Latent dimension or the number of components
+        :type comps: int
+        :param num_threads: Number of parallel computation threads to use, defaults to
+            the `num_threads` of the instance
+        :type num_threads: int, optional
+        :return: The AUC score on the `test_data`
+        :rtype: float
+        """
+        num_threads = num_threads or self.num_threads
+        # The evaluations may run at the same time, so each one times its own stage
+        telemetry = self.telemetry.for_tenant(tenant=self.telemetry.tenant)
+        with telemetry.stage(
+            name="evaluation", epochs=int(epochs), n_components=int(comps)
+        ) as details:
+            model = self.new_model(comps=comps)
+            model.fit(
+                interactions=self.train_data,
+                sample_weight=self.train_weights,
+                user_features=self.user_features,
+                item_features=self.item_features,
+                epochs=epochs,
+                num_threads=num_threads,
+            )
+            score = self.score_model(model=model, num_threads=num_threads)
+            details["score"] = float(score)
+        return score
 
-        if score.shape[0] == 0:
-            return 0
+    def evaluate(self, candidates, executor, num_threads):
+        """
+        To compute the performance of the candidate hyper-parameters at the same time.
+        Each candidate is evaluated once, so that proposing it again costs nothing
 
-        return score.mean()
+        :param candidates: The candidates, each an array of the epochs and the number of
+            components
+        :type candidates: list
+        :param executor: The pool of threads the candidates are evaluated in
+        :type executor: ThreadPoolExecutor
+        :param num_threads: Number of parallel computation threads of each evaluation
+        :type num_threads: int
+        :return: The AUC score of each candidate
+        :rtype: list
+        """
+        futures = []
+        for candidate in candidates:
+            key = int(candidate[0]), int(candidate[1])
+            if key not in self.evaluations:
+                self.evaluations[key] = executor.submit(
+                    self.compute_performance,
+                    epochs=key[0],
+                    comps=key[1],
+                    num_threads=num_threads,
+                )
+            futures.append(self.evaluations[key])
+        return [future.result() for future in futures]
 
-    def simulated_annealing(self, n_iterations, step_size, temp):
+    def simulated_annealing(self, n_iterations, step_size, temp, batch_size=1):
         """
         Find optimum hyper-parameters 'epochs' and 'n_components' with simulated
-        annealing method
+        annealing method. Each step proposes `batch_size` candidates from the current
+        point and evaluates them at the same time, and the best of them is considered
+        for the next current point
 
-        :param n_iterations: Number of iterations for convergence
+        :param n_iterations: Number of candidates to evaluate for convergence, rounded
+            up to a multiple of `batch_size`
         :type n_iterations: int
         :param step_size: A real number in the range of [0, 1] that determines how far
             the random new guesses should be from the previous values of
@@ -126,6 +199,8 @@ class OptimizeHyperparams:
         :param temp: An arbitrary real number that determines the acceptance
             probability of slightly worse solutions
         :type temp: float
+        :param batch_size: Number of candidates proposed at each step, defaults to 1
+        :type batch_size: int, optional
         :return: A tuple composed of three objects:
 
             | **0:** a list of epochs with the final one being the best one,
@@ -133,69 +208,230 @@ class OptimizeHyperparams:
             | **2:** a list of scores with the final one being the best one.
         :rtype: tuple
         """
-        # Generate an initial point
-        parameter_bounds = np.asarray(
-            [self.bounds["epochs"], self.bounds["n_components"]]
-        )
-        parameter_range = parameter_bounds[:, 1] - parameter_bounds[:, 0]
-        best = np.rint(
-            parameter_bounds[:, 0]
-            + np.random.rand(len(parameter_bounds))
-            * (parameter_bounds[:, 1] - parameter_bounds[:, 0])
-        ).astype(int)
-        # Evaluate the initial point
-        best_eval = -1 * self.compute_performance(epochs=best[0], comps=best[1])
-
-        # Current working solution
-        curr, curr_eval = best, best_eval
-        epochs, comps, scores = [best[0]], [best[1]], [-best_eval]
-
-        # Run the algorithm
-        for i in range(n_iterations):
-            # Take a step
-            candidate = curr + np.rint(
-                np.random.randn(len(parameter_bounds)) * parameter_range * step_size
+        batch_size = max(int(batch_size), 1)
+        n_workers = max(min(batch_size, self.num_threads), 1)
+        num_threads = max(self.num_threads // n_workers, 1)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            # Generate an initial point
+            parameter_bounds = np.asarray(
+                [self.bounds["epochs"], self.bounds["n_components"]]
+            )
+            parameter_range = parameter_bounds[:, 1] - parameter_bounds[:, 0]
+            best = np.rint(
+                parameter_bounds[:, 0]
+                + np.random.rand(len(parameter_bounds))
+                * (parameter_bounds[:, 1] - parameter_bounds[:, 0])
             ).astype(int)
-            # Make sure the new candidate is in bounded region
-            for c in range(len(candidate)):
-                candidate[c] = min(
-                    parameter_bounds[c, 1], max(parameter_bounds[c, 0], candidate[c])
-                )
+            # Evaluate the initial point
+            (best_score,) = self.evaluate(
+                candidates=[best], executor=executor, num_threads=num_threads
+            )
+            best_eval = -1 * best_score
+
+            # Current working solution
+            curr, curr_eval = best, best_eval
+            epochs, comps, scores = [best[0]], [best[1]], [-best_eval]
+
+            # Run the algorithm
+            for i in range(-(-n_iterations // batch_size)):
+                # Take a step for each candidate of the batch
+                candidates = []
+                for __ in range(batch_size):
+                    candidate = curr + np.rint(
+                        np.random.randn(len(parameter_bounds))
+                        * parameter_range
+                        * step_size
+                    ).astype(int)
+                    # Make sure the new candidate is in bounded region
+                    for c in range(len(candidate)):
+                        candidate[c] = min(
+                            parameter_bounds[c, 1],
+                            max(parameter_bounds[c, 0], candidate[c]),
+                        )
+                    candidates.append(candidate)
+
+                # Evaluate the candidate points
+                candidate_evals = [
+                    -1 * score
+                    for score in self.evaluate(
+                        candidates=candidates,
+                        executor=executor,
+                        num_threads=num_threads,
+                    )
+                ]
+                for candidate, candidate_eval in zip(candidates, candidate_evals):
+                    # Check for the new best solution
+                    if candidate_eval < best_eval:
+                        # Store new best point
+                        best, best_eval = candidate, candidate_eval
+                        # Store progress
+                        epochs.append(candidate[0])
+                        comps.append(candidate[1])
+                        scores.append(-candidate_eval)
+                # The best candidate of the batch is considered for the current point
+                best_index = int(np.argmin(candidate_evals))
+                candidate = candidates[best_index]
+                candidate_eval = candidate_evals[best_index]
+                # Difference between candidate and current point evaluation
+                diff = candidate_eval - curr_eval
+                # Calculate temperature for current step
+                t = temp / float(i + 1)
+                # Calculate metropolis acceptance criterion
+                metropolis = np.exp(-diff / t)
+                # Check if we should keep the new point
+                if diff < 0 or np.random.rand() < metropolis:
+                    # Store the new current point
+                    curr, curr_eval = candidate, candidate_eval
+            return epochs, comps, scores
+
+    def evaluate_checkpoint(self, model, trained_epochs, epochs, num_threads):
+        """
+        To continue the training of a model up to the given number of epochs and
+        compute its AUC score on the `test_data`
+
+        :param model: The model, which is updated in place
+        :type model: LightFM
+        :param trained_epochs: Number of epochs the model has been trained for
+        :type trained_epochs: int
+        :param epochs: Number of epochs to train the model for in total
+        :type epochs: int
+        :param num_threads: Number of parallel computation threads to use
+        :type num_threads: int
+        :return: The AUC score on the `test_data`
+        :rtype: float
+        """
+        # The evaluations may run at the same time, so each one times its own stage
+        telemetry = self.telemetry.for_tenant(tenant=self.telemetry.tenant)
+        with telemetry.stage(
+            name="evaluation",
+            epochs=int(epochs),
+            n_components=int(model.no_components),
+            trained_epochs=int(trained_epochs),
+        ) as details:
+            model.fit_partial(
+                interactions=self.train_data,
+                sample_weight=self.train_weights,
+                user_features=self.user_features,
+                item_features=self.item_features,
+                epochs=epochs - trained_epochs,
+                num_threads=num_threads,
+            )
+            score = self.score_model(model=model, num_threads=num_threads)
+            details["score"] = float(score)
+        return score
+
+    @staticmethod
+    def checkpoints(min_epochs, max_epochs, eta):
+        """
+        To find the numbers of epochs at which the candidates of
+        `successive_halving` are scored, growing by a factor of `eta` from
+        `min_epochs` up to `max_epochs`
 
-            # Evaluate candidate point
-            candidate_eval = -1 * self.compute_performance(
-                epochs=candidate[0], comps=candidate[1]
+        :param min_epochs: The smallest number of epochs
+        :type min_epochs: int
+        :param max_epochs: The largest number of epochs
+        :type max_epochs: int
+        :param eta: The growth factor
+        :type eta: int
+        :return: The increasing numbers of epochs
+        :rtype: list
+        """
+        checkpoints = []
+        epochs = max(int(min_epochs), 1)
+        while epochs < max_epochs:
+            checkpoints.append(epochs)
+            epochs *= eta
+        return checkpoints + [int(max_epochs)]
+
+    def successive_halving(self, n_candidates, eta):
+        """
+        Find optimum hyper-parameters 'epochs' and 'n_components' with successive
+        halving. One model per candidate number of components is trained with
+        `fit_partial` and scored at each checkpoint of `checkpoints`, so that a single
+        model answers every number of epochs of its number of components. Only the best
+        `1 / eta` of the candidates are trained up to the next checkpoint, and the
+        candidates of a checkpoint are trained at the same time
+
+        :param n_candidates: Number of candidate numbers of components, evenly spread
+            within their bounds
+        :type n_candidates: int
+        :param eta: The factor by which the number of epochs grows and the number of
+            candidates shrinks from a checkpoint to the next, an integer of at least 2
+        :type eta: int
+        :raises ValueError: When `eta` is not an integer of at least 2
+        :return: A tuple composed of three objects:
+
+            | **0:** a list of epochs with the final one being the best one,
+            | **1:** a list of components with the final one being the best one, and
+            | **2:** a list of scores with the final one being the best one.
+        :rtype: tuple
+        """
+        if int(eta) != eta or eta < 2:
+            raise ValueError(
+                "The successive halving factor eta must be an integer of at least 2, "
+                f"not {eta}"
+            )
+        eta = int(eta)
+        checkpoints = self.checkpoints(*self.bounds["epochs"], eta=eta)
+        candidates = [
+            int(x)
+            for x in np.unique(
+                np.rint(np.linspace(*self.bounds["n_components"], num=n_candidates))
             )
-            # Check for the new best solution
-            if candidate_eval < best_eval:
-                # Store new best point
-                best, best_eval = candidate, candidate_eval
-                # Store progress
-                epochs.append(candidate[0])
-                comps.append(candidate[1])
-                scores.append(-candidate_eval)
-            # Difference between candidate and current point evaluation
-            diff = candidate_eval - curr_eval
-            # Calculate temperature for current step
-            t = temp / float(i + 1)
-            # Calculate metropolis acceptance criterion
-            metropolis = np.exp(-diff / t)
-            # Check if we should keep the new point
-            if diff < 0 or np.random.rand() < metropolis:
-                # Store the new current point
-                curr, curr_eval = candidate, candidate_eval
+        ]
+        models = {comps: self.new_model(comps=comps) for comps in candidates}
+        trained_epochs = dict.fromkeys(candidates, 0)
+        epochs, comps, scores = [], [], []
+        n_workers = max(min(len(candidates), self.num_threads), 1)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            for checkpoint in checkpoints:
+                num_threads = max(
+                    self.num_threads // min(len(candidates), n_workers), 1
+                )
+                futures = [
+                    executor.submit(
+                        self.evaluate_checkpoint,
+                        model=models[candidate],
+                        trained_epochs=trained_epochs[candidate],
+                        epochs=checkpoint,
+                        num_threads=num_threads,
+                    )
+                    for candidate in candidates
+                ]
+                results = {}
+                for candidate, future in zip(candidates, futures):
+                    results[candidate] = future.result()
+                    trained_epochs[candidate] = checkpoint
+                    # Store progress when this is the new best solution
+                    if not scores or results[candidate] > scores[-1]:
+                        epochs.append(checkpoint)
+                        comps.append(candidate)
+                        scores.append(results[candidate])
+                # Keep the best candidates for the next checkpoint
+                candidates = sorted(candidates, key=results.get, reverse=True)[
+                    : max(-(-len(candidates) // eta), 1)
+                ]
+                models = {candidate: models[candidate] for candidate in candidates}
         return epochs, comps, scores
 
     def run_optimization(self):
         """
-        Runs the optimization algorithm simulated annealing and returns the resultant
-        scores and hyper-parameters
+        Runs the configured optimization algorithm, successive halving or simulated
+        annealing, and returns the resultant scores and hyper-parameters
 
         :returns: A tuple of three lists; epochs, comps, and scores
         :rtype: tuple
         """
-        epochs, comps, scores = self.simulated_annealing(
-            n_iterations=30, step_size=0.2, temp=5
-        )
+        if self.search == "halving":
+            epochs, comps, scores = self.successive_halving(
+                n_candidates=self.halving["n_candidates"], eta=self.halving["eta"]
+            )
+        else:
+            epochs, comps, scores = self.simulated_annealing(
+                n_iterations=self.annealing["n_iterations"],
+                step_size=self.annealing["step_size"],
+                temp=self.annealing["temp"],
+                batch_size=self.annealing["batch_size"],
+            )
 
         return epochs, comps, scores
@@ -0,0 +1,201 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import copy
+import numpy as np
+
+from service.recommender.config import Config
+from service.recommender.predict_subroutines.similar_items import SimilarItems
+
+
+class WarmStartModel:
+    """
+    This is a conceptual representation of the incremental update of a tenant's model:
+    the representations of the previous model are aligned with the new users, items
+    and features, and the training continues from them for a few epochs
+    """
+
+    def __init__(self, processed_data=None, previous_model=None, num_threads=2):
+        """
+        Class constructor method
+
+        :param processed_data: Data for model building
+        :type processed_data: dict
+        :param previous_model: The tenant's previous model, as produced by
+            `TrainRecommender.train_models`
+        :type previous_model: dict
+        :param num_threads: Number of parallel computation threads to use. Should not be
+            higher than the number of physical cores, defaults to 2
+        :type num_threads: int, optional
+        """
+        self.interactions = processed_data["interactions"]["interactions"]
+        self.weights = processed_data["interactions"]["weights"]
+        self.user_features = processed_data["users_processed_data"]
+        self.item_features = processed_data["items_processed_data"]
+        self.mappings = processed_data["mappings"]
+        self.previous_model = previous_model
+        self.num_threads = num_threads
+        incremental_cfg = Config().get_property("incremental")
+        self.epochs = incremental_cfg["epochs"]
+        self.max_new_share = incremental_cfg["max_new_share"]
+
+    @staticmethod
+    def feature_labels(id_mapping, labels, features):
+        """
+        To name the rows of the representations of the users or the items. These are
+        the feature labels, or the Totara ids when there are no features and each user
+        or item is its own feature
+
+        :param id_mapping: A dictionary where keys are Totara ids and values are
+            internal ids
+        :type id_mapping: dict
+        :param labels: The feature labels
+        :type labels: list
+        :param features: The sparse matrix of the features, or None
+        :type features: `scipy.sparse.csr_matrix` instance
+        :return: The names of the rows of the representations
+        :rtype: list
+        """
+        if features is None:
+            return SimilarItems.ids_by_internal_id(mapping=id_mapping).tolist()
+        return list(labels)
+
+    @staticmethod
+    def align(old_labels, new_labels, arrays, no_components, random_state):
+        """
+        To reorder the rows of the representations of the previous model into the rows
+        of the new labels. The rows of the new labels are initialised as LightFM does
+
+        :param old_labels: The names of the rows of the previous representations
+        :type old_labels: list
+        :param new_labels: The names of the rows of the new representations
+        :type new_labels: list
+        :param arrays: A dictionary where keys are the names of the embeddings, biases
+            and their gradients and momentum, and values are the previous arrays
+        :type arrays: dict
+        :param no_components: The number of components of the model
+        :type no_components: int
+        :param random_state: The random state of the model
+        :type random_state: np.random.RandomState
+        :return: A tuple of the dictionary of the new arrays, which are writeable, and
+            the number of new rows
+        :rtype: tuple
+        """
+        old_rows = {label: row for row, label in enumerate(old_labels)}
+        source = np.array([old_rows.get(label, -1) for label in new_labels], dtype=int)
+        known = source >= 0
+        aligned = {}
+        for name, old_array in arrays.items():
+            new_array = np.zeros(
+                (len(new_labels),) + old_array.shape[1:], dtype=old_array.dtype
+            )
+            new_array[known] = old_array[source[known]]
+            aligned[name] = new_array
+        n_new = int((~known).sum())
+        embeddings = [name for name in aligned if name.endswith("_embeddings")]
+        for name in embeddings:
+            aligned[name][~known] = (
+                (random_state.rand(n_new, no_components) - 0.5) / no_components
+            ).astype(np.float32)
+        return aligned, n_new
+
+    def warm_start(self):
+        """
+        To copy the previous LightFM model with its representations aligned with the new
+        users, items and features
+
+        :return: The copied model, or None when the previous model can not be aligned
+            or when too many users, items or features are new for it to be updated,
+            in which case the model must be trained from scratch
+        :rtype: LightFM model object
+        """
+        previous = self.previous_model["model"]
+        model = copy.copy(previous)
+        for side, id_mapping, labels, features, old_id_mapping, old_labels in [
+            (
+                "user",
+                self.mappings[0],
+                self.mappings[1],
+                self.user_features,
+                self.previous_model["mappings"][0],
+                self.previous_model["mappings"][1],
+            ),
+            (
+                "item",
+                self.mappings[2],
+                self.mappings[3],
+                self.item_features,
+                self.previous_model["mappings"][2],
+                self.previous_model["mappings"][3],
+            ),
+        ]:
+            n_columns = len(id_mapping) if features is None else features.shape[1]
+            new_labels = self.feature_labels(
+                id_mapping=id_mapping, labels=labels, features=features
+            )
+            old_embeddings = getattr(previous, f"{side}_embeddings")
+            old_labels = (
+                SimilarItems.ids_by_internal_id(mapping=old_id_mapping).tolist()
+                if old_labels is None
+                else list(old_labels)
+            )
+            if len(new_labels) != n_columns or len(old_labels) != len(old_embeddings):
+                return None
+            arrays = {
+                f"{side}_{name}": getattr(previous, f"{side}_{name}")
+                for name in [
+                    "embeddings",
+                    "embedding_gradients",
+                    "embedding_momentum",
+                    "biases",
+                    "bias_gradients",
+                    "bias_momentum",
+                ]
+            }
+            aligned, n_new = self.align(
+                old_labels=old_labels,
+                new_labels=new_labels,
+                arrays=arrays,
+                no_components=previous.no_components,
+                random_state=previous.random_state,
+            )
+            if n_new > self.max_new_share * max(len(new_labels), 1):
+                return None
+            for name, array in aligned.items():
+                setattr(model, name, array)
+        return model
+
+    def build_model(self):
+        """
+        To update the previous model with a few more epochs on the entire training set
+
+        :return: LightFM model, or None when the model must be trained from scratch
+        :rtype: LightFM model object
+        """
+        model = self.warm_start()
+        if model is None:
+            return None
+        model.fit_partial(
+            interactions=self.interactions,
+            sample_weight=self.weights,
+            user_features=self.user_features,
+            item_features=self.item_features,
+            epochs=self.epochs,
+            num_threads=self.num_threads,
+        )
+        return model
@@ -0,0 +1,219 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+class TrainTelemetry:
+    """
+    To time the stages of the training of the recommendation models for each tenant,
+    with the peak memory of the process at the end of each stage, and to keep them in
+    an append-only log of JSON lines
+    """
+
+    filename = "train_telemetry.log"
+
+    def __init__(self, run=None, tenant="all", records=None, lock=None):
+        """
+        Class constructor method
+
+        :param run: The identifier of the training run, defaults to the current time
+        :type run: str, optional
+        :param tenant: The tenant the stages are recorded for, defaults to 'all' for
+            the stages shared by the tenants
+        :type tenant: str, optional
+        :param records: The list where the stages are recorded, shared with the
+            telemetry of the other tenants of the run, defaults to a new list
+        :type records: list, optional
+        :param lock: The lock of `records`, defaults to a new lock
+        :type lock: threading.Lock, optional
+        """
+        self.run = run or datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        self.tenant = str(tenant)
+        self.records = [] if records is None else records
+        self.lock = threading.Lock() if lock is None else lock
+        self.open_stages = []
+
+    def for_tenant(self, tenant):
+        """
+        To record the stages of a tenant in the same run
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: The telemetry of the tenant, sharing the records of this one
+        :rtype: TrainTelemetry
+        """
+        return TrainTelemetry(
+            run=self.run, tenant=tenant, records=self.records, lock=self.lock
+        )
+
+    def add_records(self, records):
+        """
+        To add the stages recorded by another telemetry of the run, e.g., in a worker
+        process
+
+        :param records: The recorded stages
+        :type records: list
+        """
+        with self.lock:
+            self.records.extend(records)
+
+    @staticmethod
+    def peak_rss_mb():
+        """
+        To find the peak resident memory of the process so far
+
+        :return: The peak resident memory in megabytes, or None when the platform does
+            not report it
+        :rtype: float
+        """
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # The peak is in bytes on macOS and in kilobytes on Linux
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    @contextmanager
+    def stage(self, name, **details):
+        """
+        To time a stage of the training of the tenant. The stages may be nested, e.g.,
+        the text encoding is part of the loading of the items, in which case the
+        enclosing stage is recorded as the `parent`
+
+        :param name: The name of the stage
+        :type name: str
+        :param details: Additional values to record with the stage, which can be
+            updated while it runs through the yielded dictionary
+        :type details: dict
+        """
+        parent = self.open_stages[-1] if self.open_stages else None
+        self.open_stages.append(name)
+        started = perf_counter()
+        try:
+            yield details
+        finally:
+            self.open_stages.pop()
+            record = {
+                "run": self.run,
+                "tenant": self.tenant,
+                "stage": name,
+                "seconds": round(perf_counter() - started, 6),
+                "peak_rss_mb": self.peak_rss_mb(),
+                **details,
+            }
+            if parent is not None:
+                record["parent"] = parent
+            with self.lock:
+                self.records.append(record)
+
+    def summary(self):
+        """
+        To summarise the recorded stages of the run
+
+        :return: The run, its peak memory and, for each tenant, the total seconds of
+            its stages that are not nested in another one, and the total seconds and
+            the number of runs of each stage
+        :rtype: dict
+        """
+        with self.lock:
+            records = list(self.records)
+        tenants = {}
+        for record in records:
+            tenant = tenants.setdefault(
+                record["tenant"], {"seconds": 0.0, "stages": {}}
+            )
+            if "parent" not in record:
+                tenant["seconds"] += record["seconds"]
+            seconds, count = tenant["stages"].get(record["stage"], (0.0, 0))
+            tenant["stages"][record["stage"]] = (seconds + record["seconds"], count + 1)
+        peaks = [x["peak_rss_mb"] for x in records if x["peak_rss_mb"] is not None]
+        return {
+            "run": self.run,
+            "peak_rss_mb": max(peaks) if peaks else None,
+            "tenants": {
+                name: {
+                    "seconds": round(tenant["seconds"], 3),
+                    "stages": {
+                        stage: {"seconds": round(seconds, 3), "count": count}
+                        for stage, (seconds, count) in tenant["stages"].items()
+                    },
+                }
+                for name, tenant in tenants.items()
+            },
+        }
+
+    def write(self, logs_dir, max_bytes=10 * 1024 * 1024):
+        """
+        To append the recorded stages and the summary of the run to the log. The log is
+        moved aside to a `.1` file once it exceeds `max_bytes`
+
+        :param logs_dir: Path to the logs directory
+        :type logs_dir: str
+        :param max_bytes: The size of the log beyond which it is moved aside, defaults
+            to 10 MB
+        :type max_bytes: int, optional
+        """
+        log_file = os.path.join(logs_dir, self.filename)
+        if os.path.exists(log_file) and os.path.getsize(log_file) > max_bytes:
+            os.replace(log_file, f"{log_file}.1")
+        with self.lock:
+            records = list(self.records)
+        with open(file=log_file, mode="a", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(json.dumps(record) + "\n")
+            handle.write(json.dumps({"summary": self.summary()}) + "\n")
+
+    @classmethod
+    def read_summary(cls, logs_dir):
+        """
+        To read the summary of the last run from the end of the log, without reading
+        the whole log
+
+        :param logs_dir: Path to the logs directory
+        :type logs_dir: str
+        :return: The summary of the last run, or None when there is none
+        :rtype: dict
+        """
+        try:
+            with open(file=os.path.join(logs_dir, cls.filename), mode="rb") as handle:
+                handle.seek(0, os.SEEK_END)
+                size = handle.tell()
+                chunk = b""
+                position = size
+                while position > 0:
+                    step = min(64 * 1024, position)
+                    position -= step
+                    handle.seek(position)
+                    chunk = handle.read(step) + chunk
+                    for line in reversed(chunk.splitlines()[1 if position else 0 :]):
+                        if line.startswith(b'{"summary"'):
+                            return json.loads(line)["summary"]
+        except (OSError, ValueError):
+            return None
+        return None
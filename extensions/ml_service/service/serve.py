@@ -0,0 +1,97 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from waitress import serve
+from waitress.adjustments import Adjustments
+
+from service.app import create_app
+
+
+def bind_sockets(listen):
+    """
+    To bind the listening sockets in the parent process, so that all the workers accept
+    the connections on them
+
+    :param listen: The waitress `--listen` value, e.g., `*:5000`
+    :type listen: str
+    :return: The bound sockets
+    :rtype: list
+    """
+    sockets = []
+    for family, socktype, proto, sockaddr in Adjustments(listen=listen).listen:
+        sock = socket.socket(family, socktype, proto)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if family == socket.AF_INET6:
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+        sock.bind(sockaddr)
+        sockets.append(sock)
+    return sockets
+
+
+def run_worker(sockets):
+    """
+    To serve the models saved by the trainer on the given sockets
+
+    :param sockets: The bound listening sockets
+    :type sockets: list
+    """
+    serve(create_app(role="worker"), sockets=sockets)
+
+
+def main():
+    """
+    To run the service with `ML_WORKERS` serving processes that share the models
+    through memory mapped arrays, while this process trains the models on schedule
+    """
+    n_workers = int(os.environ.get("ML_WORKERS", "1"))
+    sockets = bind_sockets(listen=os.environ.get("ML_BIND", "*:5000"))
+    create_app(role="trainer")
+
+    # Spawn rather than fork, as the trainer already runs the scheduler and BLAS threads
+    context = multiprocessing.get_context("spawn")
+    stopping = threading.Event()
+
+    def start_worker():
+        worker = context.Process(target=run_worker, args=(sockets,), daemon=True)
+        worker.start()
+        return worker
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    workers = [start_worker() for __ in range(n_workers)]
+    while not stopping.wait(timeout=5):
+        workers = [x if x.is_alive() else start_worker() for x in workers]
+
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
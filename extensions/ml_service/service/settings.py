@@ -31,8 +31,20 @@ class Config(object):
     RECOMMENDATION_RETRAIN_FREQ = os.environ.get(
         "ML_RECOMMENDATION_RETRAIN_FREQ", "1440"
     )
+    RECOMMENDATION_FULL_RETRAIN_FREQ = os.environ.get(
+        "ML_RECOMMENDATION_FULL_RETRAIN_FREQ", "0"
+    )
     NUM_THREADS = os.environ.get("ML_NUM_THREADS", "4")
+    TRAIN_WORKERS = os.environ.get("ML_TRAIN_WORKERS", "1")
     RECOMMENDATION_ALGORITHM = os.environ.get("ML_RECOMMENDATION_ALGORITHM", "hybrid")
+    RECOMMENDATION_STORE_SIZE = os.environ.get("ML_RECOMMENDATION_STORE_SIZE", "50")
+    RESPONSE_CACHE_MB = os.environ.get("ML_RESPONSE_CACHE_MB", "64")
+    MODEL_MEMORY_MB = os.environ.get("ML_MODEL_MEMORY_MB", "0")
+    RESPONSE_CACHE_TTL = os.environ.get("ML_RESPONSE_CACHE_TTL", "3600")
+    WORKERS = os.environ.get("ML_WORKERS", "1")
+    RELOAD_INTERVAL = os.environ.get("ML_RELOAD_INTERVAL", "30")
+    METRICS_PUBLIC = os.environ.get("ML_METRICS_PUBLIC", "false")
+    HEALTH_PROBE_INTERVAL = os.environ.get("ML_HEALTH_PROBE_INTERVAL", "30")
 
 
 class Development(Config):
@@ -0,0 +1,118 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import unittest
+from unittest.mock import patch
+
+from service.api.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    The test object to test units of the `ResponseCache` class
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        self.key = ("1", "user_items", "2", "container_course", 5)
+        self.value = [("1", " 0.9000"), ("2", " 0.5000")]
+        self.cache = ResponseCache(max_bytes=1024 * 1024, ttl=60)
+        self.longMessage = False
+
+    def test_get_put(self) -> None:
+        """
+        This method tests if a cached value is returned and the hits and misses are
+        counted
+        """
+        self.assertIsNone(
+            obj=self.cache.get(key=self.key, generation=0),
+            msg="A value was returned from the empty cache",
+        )
+        self.cache.put(key=self.key, value=self.value, generation=0)
+        self.assertEqual(
+            first=self.cache.get(key=self.key, generation=0),
+            second=self.value,
+            msg="The cached value was not returned",
+        )
+        stats = self.cache.stats()
+        self.assertEqual(
+            first=(stats["hits"], stats["misses"], stats["entries"]),
+            second=(1, 1, 1),
+            msg=f"The cache statistics are {stats}",
+        )
+
+    def test_new_generation(self) -> None:
+        """
+        This method tests if the entries do not survive the models being replaced, and
+        the values computed from the replaced models are not cached
+        """
+        self.cache.put(key=self.key, value=self.value, generation=0)
+        self.cache.new_generation()
+        self.assertIsNone(
+            obj=self.cache.get(key=self.key, generation=self.cache.generation),
+            msg="An entry survived the models being replaced",
+        )
+        self.cache.put(key=self.key, value=self.value, generation=0)
+        self.assertEqual(
+            first=self.cache.stats()["entries"],
+            second=0,
+            msg="A value computed from the replaced models was cached",
+        )
+
+    def test_ttl(self) -> None:
+        """
+        This method tests if the entries expire after the time to live
+        """
+        with patch(
+            target="service.api.response_cache.time.monotonic", return_value=100.0
+        ):
+            self.cache.put(key=self.key, value=self.value, generation=0)
+        with patch(
+            target="service.api.response_cache.time.monotonic", return_value=161.0
+        ):
+            self.assertIsNone(
+                obj=self.cache.get(key=self.key, generation=0),
+                msg="An expired entry was returned",
+            )
+
+    def test_memory_bound(self) -> None:
+        """
+        This method tests if the least recently used entries are evicted beyond the
+        memory bound, and nothing is cached when the bound is 0
+        """
+        entry_size = ResponseCache.entry_size(key=self.key, value=self.value)
+        cache = ResponseCache(max_bytes=2 * entry_size, ttl=60)
+        keys = [self.key[:2] + (str(n),) + self.key[3:] for n in range(3, 6)]
+        cache.put(key=keys[0], value=self.value, generation=0)
+        cache.put(key=keys[1], value=self.value, generation=0)
+        cache.get(key=keys[0], generation=0)
+        cache.put(key=keys[2], value=self.value, generation=0)
+        self.assertEqual(
+            first=[cache.get(key=x, generation=0) is not None for x in keys],
+            second=[True, False, True],
+            msg="The least recently used entry was not the one evicted",
+        )
+
+        disabled = ResponseCache(max_bytes=0)
+        disabled.put(key=self.key, value=self.value, generation=0)
+        self.assertIsNone(
+            obj=disabled.get(key=self.key, generation=0),
+            msg="A value was cached while the cache is disabled",
+        )
@@ -0,0 +1,73 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import json
+import numpy as np
+import unittest
+
+from service.api.response_encoder import ResponseEncoder
+
+
+class TestResponseEncoder(unittest.TestCase):
+    """
+    The test object to test units of the `ResponseEncoder` class
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        self.longMessage = False
+
+    def test_format_items(self) -> None:
+        """
+        This method tests if the scores are formatted exactly as the endpoints have
+        always formatted them
+        """
+        scores = np.random.default_rng(seed=1).normal(size=1000).astype(np.float32)
+        items = [(str(j), score) for j, score in enumerate(scores.tolist())]
+        computed = ResponseEncoder.format_items(items=items)
+        expected = [(idx, f"{val: .4f}") for idx, val in items]
+        self.assertEqual(
+            first=computed,
+            second=expected,
+            msg="The formatted items are not the ones formatted one by one",
+        )
+        self.assertEqual(
+            first=ResponseEncoder.format_items(items=[]),
+            second=[],
+            msg="Items were formatted from no items",
+        )
+
+    def test_encode(self) -> None:
+        """
+        This method tests if the encoded payload decodes to the payload
+        """
+        payload = {"success": True, "items": [("course1", " 0.5000")]}
+        body = ResponseEncoder.encode(payload=payload)
+        self.assertEqual(
+            first=json.loads(body),
+            second={"success": True, "items": [["course1", " 0.5000"]]},
+            msg=f"The payload was encoded as {body}",
+        )
+        response = ResponseEncoder.response(body=body)
+        self.assertEqual(
+            first=(response.mimetype, response.get_data()),
+            second=("application/json", body),
+            msg="The response does not hold the encoded payload as JSON",
+        )
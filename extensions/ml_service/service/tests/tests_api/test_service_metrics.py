@@ -0,0 +1,119 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import unittest
+
+from service.api.service_metrics import ServiceMetrics, StageTimer
+
+
+class TestServiceMetrics(unittest.TestCase):
+    """
+    This test object is to test the units of `ServiceMetrics` class in file
+    `service.api.service_metrics`
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method to set up the fixtures before exercising it
+        """
+        self.metrics = ServiceMetrics(worker="7")
+        self.longMessage = False
+
+    def test_histogram(self) -> None:
+        """
+        This method tests if the latencies are counted in cumulative buckets, with
+        their sum and count
+        """
+        labels = (("endpoint", "/similar-items"),)
+        for seconds in [0.0001, 0.003, 0.003, 20.0]:
+            self.metrics.observe(
+                name="ml_service_request_duration_seconds",
+                labels=labels,
+                seconds=seconds,
+            )
+        lines = self.metrics.render().splitlines()
+        name = "ml_service_request_duration_seconds"
+        labels = 'worker="7",endpoint="/similar-items"'
+        expected = [
+            f'{name}_bucket{{{labels},le="0.0005"}} 1',
+            f'{name}_bucket{{{labels},le="0.005"}} 3',
+            f'{name}_bucket{{{labels},le="10.0"}} 3',
+            f'{name}_bucket{{{labels},le="+Inf"}} 4',
+            f"{name}_count{{{labels}}} 4",
+            f"# TYPE {name} histogram",
+        ]
+        for line in expected:
+            self.assertIn(
+                member=line, container=lines, msg=f"The line {line} is not exported"
+            )
+
+    def test_request_finished(self) -> None:
+        """
+        This method tests if a request is counted with its tenant and status, and its
+        stages are recorded
+        """
+        self.metrics.request_started()
+        timer = StageTimer()
+        timer.tenant = "1"
+        timer.lap(stage="validation")
+        timer.lap(stage="scoring")
+        self.metrics.request_finished(
+            endpoint="/user-items", status=200, timer=timer, auth_seconds=0.001
+        )
+        exposition = self.metrics.render()
+        self.assertIn(
+            member=(
+                'ml_service_requests_total{worker="7",endpoint="/user-items",'
+                'tenant="1",status="200"} 1'
+            ),
+            container=exposition,
+            msg="The request was not counted with its tenant and status",
+        )
+        for stage in ["auth", "validation", "scoring"]:
+            self.assertIn(
+                member=(
+                    'ml_service_stage_duration_seconds_count{worker="7",'
+                    f'endpoint="/user-items",tenant="1",stage="{stage}"}} 1'
+                ),
+                container=exposition,
+                msg=f"The {stage} stage of the request was not recorded",
+            )
+        self.assertIn(
+            member='ml_service_requests_in_flight{worker="7"} 0',
+            container=exposition,
+            msg="The finished request is still counted in flight",
+        )
+
+    def test_gauges(self) -> None:
+        """
+        This method tests if the samples collected when the metrics are exported are
+        described and their label values escaped
+        """
+        exposition = self.metrics.render(
+            gauges=[
+                ("ml_service_models_info", "gauge", "Info", (("version", 'a"b'),), 1)
+            ]
+        )
+        self.assertIn(
+            member=(
+                "# TYPE ml_service_models_info gauge\n"
+                'ml_service_models_info{worker="7",version="a\\"b"} 1'
+            ),
+            container=exposition,
+            msg=f"The gauge is not exported as expected in {exposition}",
+        )
@@ -0,0 +1,177 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from service.api.train_recommender_model import TrainRecommenderModel
+from service.app import create_app
+from service.recommender.model_artifacts import ModelArtifacts
+from service.recommender.prepare_data import PrepareData
+from service.tests.tests_recommender.generate_data import GenerateData
+
+
+class TestTrainRecommenderModel(unittest.TestCase):
+    """
+    The test object to test units of the class `TrainRecommenderModel` in file
+    `service.api.train_recommender_model`
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        os.environ["FLASK_ENV"] = "testing"
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app()
+        self.app.config.update(
+            LOGS_DIR=self.directory,
+            MODELS_DIR=self.directory,
+            RECOMMENDATION_ALGORITHM="mf",
+            NUM_THREADS="2",
+        )
+        self.files = {"tenants.csv": b"tenants\n0\n1\n"}
+        for tenant in ["0", "1"]:
+            self.files.update(self.exports(tenant=tenant))
+        self.trainer = TrainRecommenderModel(
+            application=self.app,
+            model_artifacts=ModelArtifacts(
+                directory=os.path.join(self.directory, "artifacts")
+            ),
+            warm_up=False,
+        )
+        self.longMessage = False
+
+    def tearDown(self) -> None:
+        """
+        Hook method to deconstruct the fixtures after testing it
+        """
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def exports(tenant):
+        """
+        To generate the exported files of a tenant
+
+        :param tenant: The tenant id
+        :type tenant: str
+        :return: A dictionary where keys are the file names and values their contents
+        :rtype: dict
+        """
+        data_generator = GenerateData(n_users=30)
+        return {
+            f"user_interactions_{tenant}.csv": data_generator.get_interactions()
+            .to_csv(index=False)
+            .encode("utf-8"),
+            f"user_data_{tenant}.csv": data_generator.get_users()
+            .to_csv()
+            .encode("utf-8"),
+            f"item_data_{tenant}.csv": data_generator.get_items()
+            .to_csv()
+            .encode("utf-8"),
+        }
+
+    def train(self):
+        """
+        To train the models on the exported files of the fixture
+
+        :return: The tenants whose data was processed
+        :rtype: list
+        """
+        get_tenant_data = PrepareData.get_tenant_data
+        processed = []
+
+        def process(data_processor, tenant):
+            processed.append(tenant)
+            return get_tenant_data(data_processor, tenant=tenant)
+
+        with patch(
+            target="service.api.train_recommender_model.TotaraFiles.download",
+            side_effect=lambda filename: {
+                "status": "success",
+                "content": self.files[filename],
+            },
+        ), patch.object(
+            target=PrepareData,
+            attribute="get_tenant_data",
+            autospec=True,
+            side_effect=process,
+        ):
+            self.trainer.train_model()
+        return processed
+
+    def test_fingerprint(self) -> None:
+        """
+        This method tests if the fingerprint of the exports changes when their contents
+        change, including when bytes move from one file to the next
+        """
+        fingerprint = self.trainer.fingerprint(contents=[b"a,b\n", b"c\n", b"d\n"])
+        self.assertEqual(
+            first=fingerprint,
+            second=self.trainer.fingerprint(contents=[b"a,b\n", b"c\n", b"d\n"]),
+            msg="The fingerprint of the same exports is not the same",
+        )
+        self.assertNotEqual(
+            first=fingerprint,
+            second=self.trainer.fingerprint(contents=[b"a,b\nc\n", b"", b"d\n"]),
+            msg="The fingerprint did not change when the exports changed",
+        )
+
+    def test_keep_unchanged_tenants(self) -> None:
+        """
+        This method tests if only the tenants whose exports changed since the last
+        training are trained again, and the others keep their served model
+        """
+        self.assertEqual(
+            first=self.train(),
+            second=["0", "1"],
+            msg="The first training did not process the data of every tenant",
+        )
+        previous_version = self.app.models_version
+        self.files.update(self.exports(tenant="1"))
+        processed = self.train()
+        self.assertEqual(
+            first=processed,
+            second=["1"],
+            msg=f"The data of the tenants {processed} was processed again",
+        )
+        self.assertNotEqual(
+            first=self.app.models_version,
+            second=previous_version,
+            msg="The models were not saved again",
+        )
+        self.assertEqual(
+            first=self.app.recommender["0"]["msg"],
+            second="success",
+            msg="The kept model of the unchanged tenant is not served",
+        )
+        self.assertEqual(
+            first=self.app.recommender.fingerprint(tenant="0"),
+            second=self.trainer.fingerprint(
+                contents=[
+                    self.files["user_interactions_0.csv"],
+                    self.files["user_data_0.csv"],
+                    self.files["item_data_0.csv"],
+                ]
+            ),
+            msg="The fingerprint of the exports was not saved with the model",
+        )
@@ -0,0 +1,138 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import time
+import unittest
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from service.api.middleware.authentication import AuthenticationMiddleware
+from service.tests.tests_api.tests_route.authentication_utils import AuthenticationUtils
+
+
+class TestAuthenticationMiddleware(unittest.TestCase):
+    """
+    The test object to test units of the `AuthenticationMiddleware` class
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        self.environs = []
+
+        def app(environ, start_response):
+            self.environs.append(environ)
+            return Response("ok")(environ, start_response)
+
+        self.config = {"APP_MODE": "Testing", "TOTARA_KEY": "secretkey"}
+        self.client = Client(AuthenticationMiddleware(app, self.config))
+        self.longMessage = False
+
+    def test_valid_headers(self) -> None:
+        """
+        This method tests if a request with valid authentication headers is forwarded
+        with its own diagnostics, while the configuration is left untouched
+        """
+        headers = AuthenticationUtils(
+            timestamp=time.time(), secret_key="secretkey"
+        ).create_headers()
+        test_response = self.client.get("/similar-items", headers=headers)
+        self.assertEqual(
+            first=test_response.status_code,
+            second=200,
+            msg=f"A valid request responded with {test_response.status_code}",
+        )
+        auth_info = self.environs[0][AuthenticationMiddleware.environ_key]
+        self.assertEqual(
+            first=sorted(auth_info.keys()),
+            second=["service_time", "variance"],
+            msg=f"The diagnostics of the request are {auth_info}",
+        )
+        self.assertNotIn(
+            member="auth_info",
+            container=self.config,
+            msg="The diagnostics of the request were written into the configuration",
+        )
+
+    def test_invalid_headers(self) -> None:
+        """
+        This method tests if the requests with a wrong key, an old timestamp, a
+        malformed timestamp or no secret key configured are rejected
+        """
+        now = time.time()
+        wrong_key = AuthenticationUtils(timestamp=now, secret_key="wrong")
+        old = AuthenticationUtils(timestamp=now - 60, secret_key="secretkey")
+        malformed = {
+            **AuthenticationUtils(
+                timestamp=now, secret_key="secretkey"
+            ).create_headers(),
+            "X-Totara-Time": "now",
+        }
+        for headers in [wrong_key.create_headers(), old.create_headers(), malformed]:
+            test_response = self.client.get("/similar-items", headers=headers)
+            self.assertEqual(
+                first=test_response.status_code,
+                second=401,
+                msg=f"The request with {headers} responded with {test_response.status}",
+            )
+
+        self.config["TOTARA_KEY"] = ""
+        headers = AuthenticationUtils(timestamp=now, secret_key="").create_headers()
+        test_response = self.client.get("/similar-items", headers=headers)
+        self.assertEqual(
+            first=test_response.status_code,
+            second=401,
+            msg="A request was accepted while no secret key is configured",
+        )
+        self.assertEqual(
+            first=self.environs,
+            second=[],
+            msg="An invalid request was forwarded to the service",
+        )
+
+    def test_skip(self) -> None:
+        """
+        This method tests if the requests made on the skipped endpoints are forwarded
+        without authentication, including those with a query string
+        """
+        for url in ["/", "/favicon.ico", "/ready?tenant=1"]:
+            test_response = self.client.get(url)
+            self.assertEqual(
+                first=test_response.status_code,
+                second=200,
+                msg=f"The request at '{url}' responded with {test_response.status}",
+            )
+
+    def test_expected_key_cache(self) -> None:
+        """
+        This method tests if the expected hashed key of a timestamp is computed once
+        for the requests made within the same second
+        """
+        AuthenticationMiddleware.expected_key.cache_clear()
+        headers = AuthenticationUtils(
+            timestamp=time.time(), secret_key="secretkey"
+        ).create_headers()
+        for __ in range(3):
+            self.client.get("/similar-items", headers=headers)
+        info = AuthenticationMiddleware.expected_key.cache_info()
+        self.assertEqual(
+            first=(info.misses, info.hits),
+            second=(1, 2),
+            msg=f"The expected hashed keys were computed as {info}",
+        )
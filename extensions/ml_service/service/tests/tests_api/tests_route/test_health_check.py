@@ -44,10 +44,14 @@ class TestHealthCheck(unittest.TestCase):
         with self.app.app_context():
             secret_key = current_app.config.get("TOTARA_KEY")
             self.totara_url = current_app.config.get("TOTARA_URL")
-            self.auth_info = current_app.config.get("auth_info", {})
-        headers_producer = AuthenticationUtils(
-            timestamp=time.time(), secret_key=secret_key
+        now = int(time.time())
+        clock = patch(
+            target="service.api.middleware.authentication.time.time", return_value=now
         )
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.auth_info = {"service_time": now, "variance": 0}
+        headers_producer = AuthenticationUtils(timestamp=now, secret_key=secret_key)
         self.headers = headers_producer.create_headers()
         self.longMessage = False
 
@@ -311,3 +315,49 @@ class TestHealthCheck(unittest.TestCase):
         self.assertListEqual(
             test_response["errors"], ["Unable to communicate with Totara: RE"]
         )
+
+    @patch(target="service.api.route.health_check.socket.gethostbyname")
+    @patch(target="service.communicator.totara_graphql.TotaraGraphql.send")
+    def test_cached_health_check(self, mock_graphql, mock_hostname) -> None:
+        """
+        To test that the result of the last background check is returned with its age
+        once the health is checked in the background, and that Totara is only contacted
+        again when a fresh check is requested
+        """
+        mock_graphql.return_value = (
+            {"totara_webapi_status": {"status": "ok"}},
+            Elapsed(),
+        )
+        mock_hostname.return_value = "0.0.0.0"
+        clock = [100.0]
+        with patch(
+            target="service.api.route.health_check.time.monotonic",
+            side_effect=lambda: clock[0],
+        ):
+            self.app.health_prober.start()
+            self.app.health_prober.refresh()
+            clock[0] = 102.5
+
+            test_response = self.client.get("/health-check", headers=self.headers)
+            self.assertEqual(
+                first=(mock_graphql.call_count, test_response.get_json()["success"]),
+                second=(1, True),
+                msg="Totara was contacted again while the last check was recent",
+            )
+            self.assertEqual(
+                first=test_response.get_json()["age_seconds"],
+                second=2.5,
+                msg="The age of the last check was not returned",
+            )
+
+            test_response = self.client.get(
+                "/health-check?fresh=1", headers=self.headers
+            )
+            self.assertEqual(
+                first=(
+                    mock_graphql.call_count,
+                    test_response.get_json()["age_seconds"],
+                ),
+                second=(2, 0),
+                msg="Totara was not contacted when a fresh check was requested",
+            )
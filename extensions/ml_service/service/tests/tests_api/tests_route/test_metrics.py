@@ -0,0 +1,116 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import os
+import time
+import unittest
+from flask import current_app
+from unittest.mock import patch
+
+from service.app import create_app
+from service.tests.tests_api.tests_route.authentication_utils import AuthenticationUtils
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    The test object to test units of the `/metrics` endpoint of the ML Service
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        os.environ["FLASK_ENV"] = "testing"
+        with patch(
+            target="service.app.ModelArtifacts.version", return_value="1"
+        ), patch(
+            target="service.app.ModelArtifacts.load",
+            return_value={"1": {"msg": "Too few interactions"}, "algorithm": "mf"},
+        ):
+            self.app = create_app()
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            secret_key = current_app.config.get("TOTARA_KEY")
+        self.headers = AuthenticationUtils(
+            timestamp=time.time(), secret_key=secret_key
+        ).create_headers()
+        self.longMessage = False
+
+    def test_authentication(self) -> None:
+        """
+        This method tests if the endpoint needs authentication, and that rejected
+        requests are counted
+        """
+        test_response = self.client.get("/metrics")
+        self.assertEqual(
+            first=test_response.status_code,
+            second=401,
+            msg="The GET request at '/metrics' without authentication was accepted",
+        )
+        test_response = self.client.get("/metrics", headers=self.headers)
+        self.assertIn(
+            member=f'ml_service_rejected_requests_total{{worker="{os.getpid()}"}} 1',
+            container=test_response.get_data(as_text=True),
+            msg="The rejected request was not counted",
+        )
+
+    def test_requests_counted(self) -> None:
+        """
+        This method tests if the requests are counted by endpoint, tenant and status,
+        with the state of the served models
+        """
+        self.client.get("/similar-items?tenant=1&totara_item_id=x&n_items=5")
+        self.client.get(
+            "/similar-items?tenant=1&totara_item_id=x&n_items=5", headers=self.headers
+        )
+        test_response = self.client.get("/metrics", headers=self.headers)
+        exposition = test_response.get_data(as_text=True)
+        self.assertEqual(
+            first=(test_response.status_code, test_response.mimetype),
+            second=(200, "text/plain"),
+            msg=f"The GET request at '/metrics' responded with {test_response.status}",
+        )
+        worker = f'worker="{os.getpid()}"'
+        expected = [
+            f'ml_service_requests_total{{{worker},endpoint="/similar-items",'
+            'tenant="1",status="200"} 1',
+            f"ml_service_stage_duration_seconds_count{{{worker},"
+            'endpoint="/similar-items",tenant="1",stage="auth"} 1',
+            f'ml_service_models_info{{{worker},version="1"}} 1',
+            f"ml_service_requests_in_flight{{{worker}}} 1",
+        ]
+        for line in expected:
+            self.assertIn(
+                member=line,
+                container=exposition,
+                msg=f"The line {line} is not in the exported metrics",
+            )
+
+    def test_public(self) -> None:
+        """
+        This method tests if the endpoint can be requested without authentication when
+        the metrics are public
+        """
+        with patch(target="service.settings.Testing.METRICS_PUBLIC", new="true"):
+            app = create_app()
+        test_response = app.test_client().get("/metrics")
+        self.assertEqual(
+            first=test_response.status_code,
+            second=200,
+            msg="The public metrics need authentication",
+        )
@@ -0,0 +1,71 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+from service.app import create_app
+
+
+class TestReadiness(unittest.TestCase):
+    """
+    The test object to test units of the `/ready` endpoint of the ML Service
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        os.environ["FLASK_ENV"] = "testing"
+        self.longMessage = False
+
+    def test_not_ready_without_models(self) -> None:
+        """
+        This method tests if the service is not ready while it has no models, and that
+        the endpoint does not need authentication
+        """
+        test_response = create_app().test_client().get("/ready")
+        self.assertEqual(
+            first=(test_response.status_code, test_response.get_json()["ready"]),
+            second=(503, False),
+            msg=(
+                "The GET request at '/ready' without models responded with the status "
+                f"code {test_response.status_code} and {test_response.get_json()}"
+            ),
+        )
+
+    def test_ready_with_models(self) -> None:
+        """
+        This method tests if the service is ready once the models are loaded
+        """
+        with patch(
+            target="service.app.ModelArtifacts.version", return_value="1"
+        ), patch(
+            target="service.app.ModelArtifacts.load",
+            return_value={"1": {"msg": "success"}, "algorithm": "mf"},
+        ):
+            app = create_app()
+        test_response = app.test_client().get("/ready")
+        self.assertEqual(
+            first=(test_response.status_code, test_response.get_json()),
+            second=(200, {"ready": True, "models_version": "1"}),
+            msg=(
+                "The GET request at '/ready' with models responded with the status "
+                f"code {test_response.status_code} and {test_response.get_json()}"
+            ),
+        )
@@ -0,0 +1,190 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import os
+import time
+import unittest
+from flask import current_app
+from unittest.mock import patch
+from service.app import create_app
+from service.tests.tests_api.tests_route.authentication_utils import AuthenticationUtils
+from service.tests.util_objects import SyntheticObjects
+
+
+class TestRequestBatchSimilarItems(unittest.TestCase):
+    """
+    The test object to test units of the `/batch-similar-items` endpoint of the ML
+    Service
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        os.environ["FLASK_ENV"] = "testing"
+        self.tenant = "1"
+        synthetic = SyntheticObjects()
+        models = {
+            self.tenant: {
+                "msg": "success",
+                "model": 1,
+                "mappings": synthetic.true_test_mapping,
+                "item_features": synthetic.features,
+            }
+        }
+        with patch(
+            target="service.app.ModelArtifacts.version", return_value="1"
+        ), patch(target="service.app.ModelArtifacts.load", return_value=models):
+            app = create_app()
+        self.client = app.test_client()
+        self.longMessage = False
+        self.totara_item_ids = [
+            "engage_microlearning1",
+            "engage_article2",
+            "engage_microlearning1000",
+        ]
+        self.n_items = 2
+        self.test_similar_items = {
+            "engage_microlearning1": [("2", 0.9), ("3", 0.5)],
+            "engage_microlearning2": [("3", 0.7), ("1", 0.1)],
+        }
+        with app.app_context():
+            secret_key = current_app.config.get("TOTARA_KEY")
+
+        headers_producer = AuthenticationUtils(
+            timestamp=time.time(), secret_key=secret_key
+        )
+        self.headers = headers_producer.create_headers()
+
+    def post(self, payload):
+        """
+        To make a POST request at the `/batch-similar-items` endpoint
+
+        :param payload: The JSON body of the request
+        :type payload: dict
+        :return: The test response
+        """
+        return self.client.post(
+            "/batch-similar-items", headers=self.headers, json=payload
+        )
+
+    @patch(
+        target=(
+            "service.api.route.request_batch_similar_items.PredictRecommender"
+            ".get_batch_similar_items"
+        )
+    )
+    def test_batch_similar_items_response(self, mock_predictor) -> None:
+        """
+        This method tests if the view function of the POST request to the
+        `/batch-similar-items` endpoint calls the correct objects and returns the items
+        keyed by the requested ids along with the unknown ids
+        """
+        mock_predictor.return_value = self.test_similar_items
+        test_response = self.post(
+            payload={
+                "tenant": self.tenant,
+                "totara_item_ids": self.totara_item_ids,
+                "n_items": self.n_items,
+            }
+        )
+        self.assertEqual(
+            first=test_response.status_code,
+            second=200,
+            msg=(
+                "The status code of the POST request at '/batch-similar-items' is not "
+                "200"
+            ),
+        )
+        self.assertEqual(
+            first=mock_predictor.call_args,
+            second=unittest.mock.call(
+                totara_ids=["engage_microlearning1", "engage_microlearning2"],
+                n_items=self.n_items,
+            ),
+            msg=(
+                "The `get_batch_similar_items` method of the `PredictRecommender` "
+                f"class called with \n{mock_predictor.call_args}"
+            ),
+        )
+
+        response_content = test_response.get_json()
+        expected_items = {
+            "engage_microlearning1": [
+                [idx, f"{val: .4f}"]
+                for idx, val in self.test_similar_items["engage_microlearning1"]
+            ],
+            "engage_article2": [
+                [idx, f"{val: .4f}"]
+                for idx, val in self.test_similar_items["engage_microlearning2"]
+            ],
+        }
+        self.assertEqual(
+            first=response_content["items"],
+            second=expected_items,
+            msg=(
+                f"The returned items are\n{response_content['items']}\nwhile they "
+                f"were expected to be\n{expected_items}"
+            ),
+        )
+        self.assertEqual(
+            first=response_content["unknown_item_ids"],
+            second=["engage_microlearning1000"],
+            msg=(
+                f"The unknown items are {response_content['unknown_item_ids']} while "
+                "they were expected to be ['engage_microlearning1000']"
+            ),
+        )
+
+    def test_batch_similar_items_no_tenant(self) -> None:
+        """
+        This method tests if the POST request to the `/batch-similar-items` endpoint is
+        unsuccessful with invalid tenant
+        """
+        test_response = self.post(
+            payload={
+                "tenant": "2",
+                "totara_item_ids": self.totara_item_ids,
+                "n_items": self.n_items,
+            }
+        )
+        self.assertEqual(
+            first=test_response.get_json()["success"],
+            second=False,
+            msg="The request with invalid tenant was expected to be unsuccessful",
+        )
+
+    @patch(target="service.api.route.request_batch_similar_items.Config.get_property")
+    def test_batch_similar_items_too_many(self, mock_property) -> None:
+        """
+        This method tests if the POST request to the `/batch-similar-items` endpoint is
+        unsuccessful when more items are requested than allowed
+        """
+        mock_property.return_value = {"max_size": 2, "block_size": 2}
+        test_response = self.post(
+            payload={
+                "tenant": self.tenant,
+                "totara_item_ids": self.totara_item_ids,
+                "n_items": self.n_items,
+            }
+        )
+        self.assertEqual(
+            first=test_response.get_json()["success"],
+            second=False,
+            msg="The request with too many items was expected to be unsuccessful",
+        )
@@ -17,11 +17,10 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 import os
-import pickle
 import time
 import unittest
 from flask import current_app
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 from service.app import create_app
 
 from service.tests.tests_api.tests_route.authentication_utils import AuthenticationUtils
@@ -40,20 +39,18 @@ class TestRequestSimilarItems(unittest.TestCase):
         os.environ["FLASK_ENV"] = "testing"
         self.tenant = "1"
         synthetic = SyntheticObjects()
-        with patch("service.app.os.path.isfile", return_value=True):
-            read_data = pickle.dumps(
-                obj={
-                    self.tenant: {
-                        "msg": "success",
-                        "model": 1,
-                        "mappings": synthetic.true_test_mapping,
-                        "item_features": synthetic.features,
-                    }
-                }
-            )
-            mock_open_test = mock_open(read_data=read_data)
-            with patch("builtins.open", mock_open_test):
-                app = create_app()
+        models = {
+            self.tenant: {
+                "msg": "success",
+                "model": 1,
+                "mappings": synthetic.true_test_mapping,
+                "item_features": synthetic.features,
+            }
+        }
+        with patch(
+            target="service.app.ModelArtifacts.version", return_value="1"
+        ), patch(target="service.app.ModelArtifacts.load", return_value=models):
+            app = create_app()
 
         self.client = app.test_client()
         with app.app_context():
@@ -17,11 +17,10 @@ Please contact [licensing@totaralearning.com] for more information.
 """
 
 import os
-import pickle
 import time
 import unittest
 from flask import current_app
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 from service.app import create_app
 from service.tests.tests_api.tests_route.authentication_utils import AuthenticationUtils
 from service.tests.util_objects import SyntheticObjects
@@ -42,23 +41,22 @@ class TestRequestUserItems(unittest.TestCase):
         self.user_features = synthetic.features
         self.positive_int_map = {}
         self.item_type_map = {}
-        with patch("service.app.os.path.isfile", return_value=True):
-            read_data = pickle.dumps(
-                obj={
-                    self.tenant: {
-                        "msg": "success",
-                        "model": 1,
-                        "mappings": synthetic.true_test_mapping,
-                        "item_features": synthetic.features,
-                        "user_features": self.user_features,
-                        "item_type_map": self.item_type_map,
-                        "positive_interactions_map": self.positive_int_map,
-                    }
-                }
-            )
-            mock_open_test = mock_open(read_data=read_data)
-            with patch("builtins.open", mock_open_test):
-                app = create_app()
+        models = {
+            self.tenant: {
+                "msg": "success",
+                "model": 1,
+                "mappings": synthetic.true_test_mapping,
+                "item_features": synthetic.features,
+                "user_features": self.user_features,
+                "item_type_map": self.item_type_map,
+                "positive_interactions_map": self.positive_int_map,
+            }
+        }
+        with patch(
+            target="service.app.ModelArtifacts.version", return_value="1"
+        ), patch(target="service.app.ModelArtifacts.load", return_value=models):
+            app = create_app()
+        self.app = app
         self.client = app.test_client()
         self.longMessage = False
         self.totara_user_id = "2"
@@ -219,3 +217,49 @@ class TestRequestUserItems(unittest.TestCase):
                     f"{test_item[1]:.4f})"
                 ),
             )
+
+    @patch(
+        target=(
+            "service.api.route.request_user_items.PredictRecommender"
+            ".get_user_recommendations"
+        )
+    )
+    def test_user_items_response_cached(self, mock_predictor) -> None:
+        """
+        This method tests if a repeated GET request to the `/user-items` endpoint is
+        served from the response cache until the models are replaced
+        """
+        mock_predictor.return_value = self.test_recommendations
+        query_string = {
+            "tenant": self.tenant,
+            "totara_user_id": self.totara_user_id,
+            "item_type": self.item_type,
+            "n_items": self.n_items,
+        }
+        responses = [
+            self.client.get(
+                "/user-items", headers=self.headers, query_string=query_string
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual(
+            first=responses[1].get_json(),
+            second=responses[0].get_json(),
+            msg="The cached response differs from the computed one",
+        )
+        self.assertEqual(
+            first=mock_predictor.call_count,
+            second=1,
+            msg=(
+                "The recommendations were computed "
+                f"{mock_predictor.call_count} times for the same request"
+            ),
+        )
+
+        self.app.response_cache.new_generation()
+        self.client.get("/user-items", headers=self.headers, query_string=query_string)
+        self.assertEqual(
+            first=mock_predictor.call_count,
+            second=2,
+            msg="The cached response survived the models being replaced",
+        )
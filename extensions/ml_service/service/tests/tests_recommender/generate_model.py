@@ -0,0 +1,112 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+from scipy.sparse import hstack, identity, random as sparse_random
+
+from service.recommender.data_subroutines.data_loader import DataLoader
+from service.recommender.train_subroutines.build_model import BuildModel
+from service.tests.tests_recommender.generate_data import GenerateData
+
+
+class GenerateModel:
+    """
+    This is a conceptual representation of the process of training a small but real
+    tenant model on fake data for testing the Recommender Engine
+    """
+
+    def __init__(self, n_users=20, n_items=20, epochs=5, no_components=10):
+        """
+        Class constructor method
+        :param n_users: Number of users to be generated, defaults to 20
+        :type n_users: int, optional
+        :param n_items: Number of items to be generated, defaults to 20
+        :type n_items: int, optional
+        :param epochs: Number of epochs to train the model, defaults to 5
+        :type epochs: int, optional
+        :param no_components: Number of latent components of the model, defaults to 10
+        :type no_components: int, optional
+        """
+        self.data_generator = GenerateData(n_users=n_users, n_items=n_items)
+        self.hyperparams = {"epochs": epochs, "no_components": no_components}
+
+    def get_tenant_data(self, with_features=True):
+        """
+        :param with_features: Whether to attach user and item feature matrices to the
+            collaborative filtering data, defaults to True
+        :type with_features: bool, optional
+        :return: The processed data of a tenant as returned by
+            `DataLoader.prepare_sparse_matrices`
+        :rtype: dict
+        """
+        data_loader = DataLoader(query="mf")
+        tenant_data = data_loader.prepare_sparse_matrices(
+            interactions_df=self.data_generator.get_interactions(),
+            users_data=self.data_generator.get_users(),
+            items_data=self.data_generator.get_items(),
+        )
+        if with_features:
+            random_state = np.random.RandomState(10)
+            for key, n_rows in (
+                ("users_processed_data", len(tenant_data["mappings"][0])),
+                ("items_processed_data", len(tenant_data["mappings"][2])),
+            ):
+                tenant_data[key] = hstack(
+                    blocks=[
+                        identity(n=n_rows, dtype=np.float32),
+                        sparse_random(
+                            m=n_rows,
+                            n=5,
+                            density=0.4,
+                            dtype=np.float32,
+                            random_state=random_state,
+                        ),
+                    ],
+                    format="csr",
+                )
+        return tenant_data
+
+    def get_tenant_model(self, with_features=True):
+        """
+        :param with_features: Whether to train the model with user and item feature
+            matrices, defaults to True
+        :type with_features: bool, optional
+        :return: A dictionary of a trained tenant with the same keys as the ones
+            returned by `TrainRecommender.train_models` for each tenant
+        :rtype: dict
+        """
+        tenant_data = self.get_tenant_data(with_features=with_features)
+        model = BuildModel(
+            processed_data=tenant_data,
+            num_threads=1,
+            optimized_hyperparams=self.hyperparams,
+        ).build_model()
+        return {
+            "msg": "success",
+            "epochs": [self.hyperparams["epochs"]],
+            "n_components": [self.hyperparams["no_components"]],
+            "score": [0.5],
+            "model": model,
+            "mappings": tenant_data["mappings"],
+            "item_features": tenant_data["items_processed_data"],
+            "user_features": tenant_data["users_processed_data"],
+            "item_type_map": tenant_data["item_type_map"],
+            "positive_interactions_map": tenant_data["interactions"][
+                "positive_interactions_map"
+            ],
+        }
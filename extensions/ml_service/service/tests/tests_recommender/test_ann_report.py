@@ -0,0 +1,55 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import unittest
+
+from service.recommender.ann_report import ANNReport
+from service.recommender.predict_subroutines.similar_items import SimilarItems
+
+
+class TestANNReport(unittest.TestCase):
+    """
+    This test object is to test the units of `ANNReport` class in file
+    `service.recommender.ann_report`
+    """
+
+    def test_run(self) -> None:
+        """
+        This method tests if a row is reported for each setting, and probing all the
+        clusters recalls all the similar items
+        """
+        rng = np.random.default_rng(seed=0)
+        report = ANNReport(
+            unit_embeddings=SimilarItems.normalise(
+                embeddings=rng.normal(size=(300, 8))
+            ),
+            k=5,
+            n_queries=20,
+        )
+        rows = report.run(n_lists_options=(10,), n_probes=(1, 10))
+        self.assertEqual(
+            first=[(x["n_lists"], x["n_probe"]) for x in rows],
+            second=[(10, 1), (10, 10)],
+            msg=f"The reported settings are {rows}",
+        )
+        self.assertAlmostEqual(
+            first=rows[-1]["recall"],
+            second=1.0,
+            msg=f"Probing all the clusters recalled {rows[-1]['recall']} of the items",
+        )
@@ -0,0 +1,376 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from service.app import reload_models
+from service.recommender.model_artifacts import ModelArtifacts, TenantNotReadyError
+from service.recommender.prepare_serving import PrepareServing
+from service.tests.tests_recommender.generate_model import GenerateModel
+
+
+class TestModelArtifacts(unittest.TestCase):
+    """
+    This test object is to test the units of `ModelArtifacts` class in file
+    `service.recommender.model_artifacts`
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method to set up the fixtures before exercising it
+        """
+        self.directory = tempfile.mkdtemp()
+        self.model_artifacts = ModelArtifacts(
+            directory=os.path.join(self.directory, "artifacts")
+        )
+        self.trained = {
+            "0": GenerateModel(n_users=100, n_items=100).get_tenant_model(),
+            "1": {"msg": "The tenant has too few interactions"},
+            "algorithm": "mf",
+        }
+        self.models = PrepareServing(store_size=5).prepare_models(models=self.trained)
+        self.longMessage = False
+
+    def tearDown(self) -> None:
+        """
+        Hook method to deconstruct the fixtures after testing it
+        """
+        shutil.rmtree(self.directory)
+
+    def test_save_load(self) -> None:
+        """
+        This method tests if the loaded models are the saved ones, with the arrays
+        mapped into memory read only
+        """
+        self.model_artifacts.save(models=self.models)
+        loaded = self.model_artifacts.load(store_size=5)
+
+        self.assertEqual(
+            first=sorted(loaded.keys()),
+            second=sorted(self.models.keys()),
+            msg=f"The loaded models have the keys {sorted(loaded.keys())}",
+        )
+        self.assertEqual(
+            first=loaded["algorithm"],
+            second="mf",
+            msg="The loaded algorithm is not the saved one",
+        )
+        computed = loaded["0"]["item_representations"][1]
+        expected = self.models["0"]["item_representations"][1]
+        self.assertIsInstance(
+            obj=computed,
+            cls=np.memmap,
+            msg="The item representations are not mapped into memory",
+        )
+        self.assertFalse(
+            expr=computed.flags.writeable,
+            msg="The loaded item representations are writeable",
+        )
+        self.assertTrue(
+            expr=np.array_equal(computed, expected),
+            msg="The loaded item representations are not the saved ones",
+        )
+        self.assertEqual(
+            first=loaded["0"]["mappings"],
+            second=self.models["0"]["mappings"],
+            msg="The loaded mappings are not the saved ones",
+        )
+        self.assertEqual(
+            first=loaded["0"]["item_ids"].tolist(),
+            second=self.models["0"]["item_ids"].tolist(),
+            msg="The loaded item ids are not the saved ones",
+        )
+        self.assertEqual(
+            first=(
+                loaded["0"]["item_features"] != self.models["0"]["item_features"]
+            ).nnz,
+            second=0,
+            msg="The loaded item features are not the saved ones",
+        )
+        self.assertEqual(
+            first=loaded["0"]["similar_items_store"].lookup(row=3, n_items=5),
+            second=self.models["0"]["similar_items_store"].lookup(row=3, n_items=5),
+            msg="The loaded similar items store is not the saved one",
+        )
+        self.assertEqual(
+            first=loaded["1"],
+            second=self.trained["1"],
+            msg="The loaded model of the untrained tenant is not the saved one",
+        )
+
+    def test_predict_loaded_model(self) -> None:
+        """
+        This method tests if the LightFM model of a loaded tenant can predict and be
+        trained further, without changing the saved arrays
+        """
+        self.model_artifacts.save(models=self.models)
+        model = self.model_artifacts.load(store_size=5)["0"]["model"]
+        saved = model.item_embeddings.copy()
+        computed = model.predict(user_ids=0, item_ids=np.arange(10))
+        expected = self.models["0"]["model"].predict(user_ids=0, item_ids=np.arange(10))
+        self.assertTrue(
+            expr=np.allclose(computed, expected),
+            msg="The loaded model does not predict as the saved one",
+        )
+        model.item_embeddings[0] += 1.0
+        reloaded = self.model_artifacts.load(store_size=5)["0"]["model"]
+        self.assertTrue(
+            expr=np.array_equal(reloaded.item_embeddings, saved),
+            msg="Updating the loaded model changed the saved arrays",
+        )
+
+    def test_load_lazily(self) -> None:
+        """
+        This method tests if a tenant's model is only read from the disk when it is
+        first requested, and only once
+        """
+        self.model_artifacts.save(models=self.models)
+        loaded = self.model_artifacts.load(store_size=5)
+        self.assertTrue(
+            expr="0" in loaded and not loaded.loaded,
+            msg="The tenant models were read before they were requested",
+        )
+        self.assertIs(
+            expr1=loaded["0"],
+            expr2=loaded["0"],
+            msg="The tenant model was read again when it was requested twice",
+        )
+        self.assertNotIn(
+            member="2", container=loaded, msg="An unknown tenant is in the models"
+        )
+
+    def test_evict_least_recently_requested(self) -> None:
+        """
+        This method tests if the least recently requested tenant models are dropped
+        once the loaded ones exceed the memory budget, and loaded again when requested
+        """
+        self.model_artifacts.save(
+            models={**self.models, "2": self.models["0"], "3": self.models["0"]}
+        )
+        tenant_bytes = self.model_artifacts.load(store_size=5).load_tenant(tenant="0")[
+            1
+        ]
+        loaded = self.model_artifacts.load(store_size=5, max_bytes=2.5 * tenant_bytes)
+        __ = loaded["0"], loaded["2"], loaded["0"], loaded["3"]
+        self.assertEqual(
+            first=list(loaded.loaded.keys()),
+            second=["0", "3"],
+            msg=(
+                f"The tenants {list(loaded.loaded.keys())} are loaded while the least "
+                "recently requested one should have been dropped"
+            ),
+        )
+        __ = loaded["2"]
+        stats = loaded.stats()
+        self.assertEqual(
+            first=(stats["loads"], stats["evictions"], stats["loaded"]),
+            second=(4, 2, 2),
+            msg=f"The memory budget use is {stats}",
+        )
+        self.assertLessEqual(
+            a=stats["resident_bytes"],
+            b=stats["max_bytes"],
+            msg=f"The loaded tenant models exceed the memory budget: {stats}",
+        )
+
+    def test_warm_up(self) -> None:
+        """
+        This method tests if the warm up loads the priority tenants first, then the
+        others from the smallest until the memory budget is reached, and keeps the
+        priority ones as the most recently requested
+        """
+        self.model_artifacts.save(
+            models={**self.models, "2": self.models["0"], "3": self.models["0"]}
+        )
+        tenant_bytes = self.model_artifacts.load(store_size=5).load_tenant(tenant="0")[
+            1
+        ]
+        loaded = self.model_artifacts.load(store_size=5, max_bytes=1.5 * tenant_bytes)
+        loaded.warm_up(priority=["3", "no_such_tenant"])
+        self.assertEqual(
+            first=loaded.recently_requested(),
+            second=["3", "1"],
+            msg=(
+                f"The tenants {loaded.recently_requested()} were warmed up while the "
+                "priority one and then the smallest one were expected"
+            ),
+        )
+        self.assertFalse(
+            expr=loaded.stats()["warming_up"],
+            msg="The models are still warming up after the warm up",
+        )
+        self.assertIn(
+            member="item_representations",
+            container=loaded["2"],
+            msg="A tenant was not loaded on request after the warm up",
+        )
+
+    def test_not_ready_while_warming_up(self) -> None:
+        """
+        This method tests if requesting a tenant that is not loaded yet while the models
+        are warmed up raises `TenantNotReadyError`, and loads that tenant next
+        """
+        self.model_artifacts.save(
+            models={**self.models, "2": self.models["0"], "3": self.models["0"]}
+        )
+        loaded = self.model_artifacts.load(store_size=5)
+        load_tenant = loaded.load_tenant
+        loads = []
+
+        def request_while_loading(tenant):
+            if not loads:
+                with self.assertRaises(
+                    expected_exception=TenantNotReadyError,
+                    msg="A tenant that is not loaded yet was served while warming up",
+                ):
+                    __ = loaded["2"]
+            loads.append(tenant)
+            return load_tenant(tenant=tenant)
+
+        with patch.object(
+            target=loaded, attribute="load_tenant", side_effect=request_while_loading
+        ):
+            loaded.warm_up(priority=["0"])
+        self.assertEqual(
+            first=loads[:2],
+            second=["0", "2"],
+            msg=f"The tenants were loaded in the order {loads}",
+        )
+
+    def test_load_other_store_size(self) -> None:
+        """
+        This method tests if the recommendation stores are rebuilt when the models are
+        served with another store size than the one they were saved with
+        """
+        self.model_artifacts.save(models=self.models)
+        loaded = self.model_artifacts.load(store_size=8)
+        self.assertEqual(
+            first=loaded["0"]["similar_items_store"].depth,
+            second=8,
+            msg="The similar items store was not rebuilt with the new store size",
+        )
+        loaded = self.model_artifacts.load(store_size=0)
+        self.assertNotIn(
+            member="similar_items_store",
+            container=loaded["0"],
+            msg="The similar items store was kept while the stores are disabled",
+        )
+
+    def test_version(self) -> None:
+        """
+        This method tests if there is no version before the models are saved, a new one
+        each time they are saved, and that the models of the previous version can still
+        be loaded
+        """
+        self.assertIsNone(
+            obj=self.model_artifacts.version(),
+            msg="There is a version of the models before they were saved",
+        )
+        self.assertIsNone(
+            obj=self.model_artifacts.load(),
+            msg="Models were loaded before they were saved",
+        )
+        first_version = self.model_artifacts.save(models=self.models)
+        previous = self.model_artifacts.load(store_size=5)
+        self.model_artifacts.save(models=self.models)
+        self.assertNotEqual(
+            first=self.model_artifacts.version(),
+            second=first_version,
+            msg="The version of the models did not change when they were saved",
+        )
+        self.assertIn(
+            member="item_representations",
+            container=previous["0"],
+            msg="The models of the previous version can not be loaded",
+        )
+        self.model_artifacts.save(models=self.models)
+        versions = [
+            x for x in os.listdir(self.model_artifacts.directory) if x.isdigit()
+        ]
+        self.assertEqual(
+            first=len(versions),
+            second=2,
+            msg=f"The versions {versions} are kept on the disk while 2 were expected",
+        )
+
+    def test_convert(self) -> None:
+        """
+        This method tests if the models saved in a single pickle are converted into a
+        version of the models
+        """
+        model_path = os.path.join(self.directory, "recommender_model.sav")
+        with open(file=model_path, mode="wb") as handle:
+            pickle.dump(obj=self.trained, file=handle)
+        version = self.model_artifacts.convert(model_path=model_path, store_size=5)
+        self.assertEqual(
+            first=self.model_artifacts.version(),
+            second=version,
+            msg="The converted models are not the current version",
+        )
+        loaded = self.model_artifacts.load(store_size=5)
+        self.assertTrue(
+            expr=np.array_equal(
+                loaded["0"]["item_unit_embeddings"],
+                self.models["0"]["item_unit_embeddings"],
+            ),
+            msg="The converted models were not prepared for serving",
+        )
+
+    def test_reload_models(self) -> None:
+        """
+        This method tests if the service loads the saved models only when they are
+        newer than the ones it serves, dropping its cached responses
+        """
+        app = SimpleNamespace(
+            recommender=None,
+            models_version=None,
+            response_cache=Mock(),
+            config={"RECOMMENDATION_STORE_SIZE": "5"},
+        )
+        reload_models(app=app, model_artifacts=self.model_artifacts)
+        self.assertIsNone(
+            obj=app.recommender,
+            msg="The service loaded models before any were saved",
+        )
+
+        self.model_artifacts.save(models=self.models)
+        reload_models(app=app, model_artifacts=self.model_artifacts)
+        self.assertIn(
+            member="0",
+            container=app.recommender,
+            msg="The service did not load the saved models",
+        )
+        served = app.recommender
+        reload_models(app=app, model_artifacts=self.model_artifacts)
+        self.assertIs(
+            expr1=app.recommender,
+            expr2=served,
+            msg="The service reloaded the models it already serves",
+        )
+        self.assertEqual(
+            first=app.response_cache.new_generation.call_count,
+            second=1,
+            msg="The cached responses were not dropped exactly once",
+        )
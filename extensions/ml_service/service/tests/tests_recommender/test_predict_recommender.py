@@ -21,6 +21,9 @@ from unittest.mock import patch, Mock
 
 from service.tests.util_objects import SyntheticObjects
 from service.recommender.predict_recommender import PredictRecommender
+from service.recommender.predict_subroutines.representation_scorer import (
+    RepresentationScorer,
+)
 
 
 class TestPredictRecommender(unittest.TestCase):
@@ -71,12 +74,18 @@ class TestPredictRecommender(unittest.TestCase):
                 item_mapping=self.mappings[2],
                 item_representations=self.mock_representations[1],
                 num_items=test_n_items,
+                unit_embeddings=None,
+                item_ids=None,
+                ann_index=None,
+                clean_item_ids=None,
             ),
             msg=(
                 "The class 'SimilarItems' is initiated with "
                 f"{mock_similar_items.call_args} while it was expected to be initiated "
                 f"with call(item_mapping='{self.mappings[2]}', item_representations="
-                f"'{self.mock_representations[1]}', num_items='{test_n_items}')"
+                f"'{self.mock_representations[1]}', num_items='{test_n_items}', "
+                "unit_embeddings=None, item_ids=None, ann_index=None, "
+                "clean_item_ids=None)"
             ),
         )
 
@@ -189,3 +198,143 @@ class TestPredictRecommender(unittest.TestCase):
                 f"while it is {test_response}"
             ),
         )
+
+    @patch(target="service.recommender.predict_recommender.SimilarItems")
+    def test_get_similar_items_precomputed(self, mock_similar_items) -> None:
+        """
+        To test if the `get_similar_items` method reuses the precomputed item
+        representations instead of computing them from the model
+        """
+        mock_model = Mock()
+        precomputed_representations = ([0, 0, 0], [5, 6, 7])
+        predictor = PredictRecommender(
+            model=mock_model,
+            algorithm="hybrid",
+            mappings=self.mappings,
+            items_features=self.item_features,
+            num_threads=self.num_threads,
+            item_representations=precomputed_representations,
+        )
+        predictor.get_similar_items(totara_id="engage_microlearning1", n_items=2)
+
+        self.assertFalse(
+            expr=mock_model.get_item_representations.called,
+            msg=(
+                "The item representations were computed from the model while the "
+                "precomputed ones were expected to be reused"
+            ),
+        )
+        self.assertEqual(
+            first=mock_similar_items.call_args[1]["item_representations"],
+            second=precomputed_representations[1],
+            msg=(
+                "The class 'SimilarItems' is initiated with item representations "
+                f"{mock_similar_items.call_args[1]['item_representations']} while it "
+                f"was expected to be {precomputed_representations[1]}"
+            ),
+        )
+
+    @patch(target="service.recommender.predict_recommender.UserToItems")
+    def test_get_user_recommendations_precomputed(self, mock_user_to_items) -> None:
+        """
+        To test if the `get_user_recommendations` method scores the users from the
+        precomputed representations instead of the model when they are available
+        """
+        predictor = PredictRecommender(
+            model=Mock(),
+            algorithm="hybrid",
+            mappings=self.mappings,
+            items_features=self.item_features,
+            num_threads=self.num_threads,
+            item_representations=([0.0], [[1.0]]),
+            user_representations=([0.0], [[1.0]]),
+        )
+        predictor.get_user_recommendations(
+            totara_id="2", n_items=2, items_type="test_type"
+        )
+        scorer = mock_user_to_items.call_args[1]["model"]
+        self.assertIsInstance(
+            obj=scorer,
+            cls=RepresentationScorer,
+            msg=(
+                f"The class 'UserToItems' is initiated with the model {scorer} while "
+                "a 'RepresentationScorer' was expected"
+            ),
+        )
+
+    @patch(target="service.recommender.predict_recommender.UserToItems")
+    def test_get_batch_user_recommendations(self, mock_user_to_items) -> None:
+        """
+        To test if the `get_batch_user_recommendations` method asks for the
+        recommendations of the known users only and returns them keyed by their ids
+        """
+        mock_user_to_items.return_value.get_items_batch.return_value = [
+            [("1", 0.5)],
+            [("2", 0.4)],
+        ]
+        predictor = PredictRecommender(
+            model=Mock(),
+            algorithm="hybrid",
+            mappings=self.mappings,
+            items_features=self.item_features,
+            num_threads=self.num_threads,
+            item_representations=([0.0], [[1.0]]),
+            user_representations=([0.0], [[1.0]]),
+        )
+        test_response = predictor.get_batch_user_recommendations(
+            totara_ids=["2", "1000", "4"], n_items=1, items_type="test_type"
+        )
+        self.assertEqual(
+            first=mock_user_to_items().get_items_batch.call_args,
+            second=unittest.mock.call(
+                internal_uids=[self.mappings[0]["2"], self.mappings[0]["4"]],
+                item_type="test_type",
+            ),
+            msg=(
+                "The 'get_items_batch' method of the 'UserToItems' class is called "
+                f"with {mock_user_to_items().get_items_batch.call_args}"
+            ),
+        )
+        self.assertEqual(
+            first=test_response,
+            second={"2": [("1", 0.5)], "4": [("2", 0.4)]},
+            msg=f"The batch recommendations are {test_response}",
+        )
+
+    @patch(target="service.recommender.predict_recommender.SimilarItems")
+    def test_get_batch_similar_items(self, mock_similar_items) -> None:
+        """
+        To test if the `get_batch_similar_items` method asks for the similar items of
+        the known items only and returns them keyed by their ids
+        """
+        known_ids = list(self.mappings[2])[:2]
+        mock_similar_items.return_value.get_items_batch.return_value = [
+            [("1", 0.5)],
+            [("2", 0.4)],
+        ]
+        predictor = PredictRecommender(
+            model=Mock(),
+            algorithm="hybrid",
+            mappings=self.mappings,
+            items_features=self.item_features,
+            num_threads=self.num_threads,
+            item_representations=([0.0], [[1.0]]),
+        )
+        test_response = predictor.get_batch_similar_items(
+            totara_ids=[known_ids[0], "engage_article1000", known_ids[1]], n_items=1
+        )
+        self.assertEqual(
+            first=mock_similar_items().get_items_batch.call_args,
+            second=unittest.mock.call(
+                internal_ids=[self.mappings[2][x] for x in known_ids]
+            ),
+            msg=(
+                "The 'get_items_batch' method of the 'SimilarItems' class is called "
+                f"with {mock_similar_items().get_items_batch.call_args}"
+            ),
+        )
+        self.assertEqual(
+            first=test_response,
+            second={known_ids[0]: [("1", 0.5)], known_ids[1]: [("2", 0.4)]},
+            msg=f"The batch of similar items is {test_response}",
+        )
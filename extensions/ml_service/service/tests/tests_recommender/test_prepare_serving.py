@@ -0,0 +1,227 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import unittest
+
+from service.recommender.predict_recommender import PredictRecommender
+from service.recommender.prepare_serving import PrepareServing
+from service.tests.tests_recommender.generate_model import GenerateModel
+
+
+class TestPrepareServing(unittest.TestCase):
+    """
+    This test object is to test the units of `PrepareServing` class in file
+    `service.recommender.prepare_serving`
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method to set up the fixtures before exercising it
+        """
+        self.tenant_model = GenerateModel().get_tenant_model()
+        self.models = {
+            "0": self.tenant_model,
+            "1": {"msg": "Skipping tenant 1"},
+            "algorithm": "hybrid",
+        }
+        self.longMessage = False
+
+    def test_prepare_tenant(self) -> None:
+        """
+        This method tests if the item representations of a tenant are materialised
+        exactly as the model computes them
+        """
+        prepared = PrepareServing().prepare_tenant(tenant_model=self.tenant_model)
+        expected_biases, expected_embeddings = self.tenant_model[
+            "model"
+        ].get_item_representations(features=self.tenant_model["item_features"])
+        computed_biases, computed_embeddings = prepared["item_representations"]
+
+        self.assertTrue(
+            expr=np.array_equal(computed_biases, expected_biases)
+            and np.array_equal(computed_embeddings, expected_embeddings),
+            msg=(
+                "The item representations materialised by 'prepare_tenant' are not "
+                "the ones computed by the model"
+            ),
+        )
+        expected_user_biases, expected_user_embeddings = self.tenant_model[
+            "model"
+        ].get_user_representations(features=self.tenant_model["user_features"])
+        computed_user_biases, computed_user_embeddings = prepared[
+            "user_representations"
+        ]
+        self.assertTrue(
+            expr=np.allclose(computed_user_biases, expected_user_biases)
+            and np.allclose(computed_user_embeddings, expected_user_embeddings),
+            msg=(
+                "The user representations materialised by 'prepare_tenant' are not "
+                "the ones computed by the model"
+            ),
+        )
+        unit_norms = np.linalg.norm(prepared["item_unit_embeddings"], axis=1)
+        self.assertTrue(
+            expr=np.allclose(unit_norms, 1.0, atol=1e-5),
+            msg="The materialised unit embeddings are not of unit length",
+        )
+        item_map = self.tenant_model["mappings"][2]
+        self.assertEqual(
+            first=[item_map[x] for x in prepared["item_ids"]],
+            second=list(range(len(item_map))),
+            msg="The materialised item ids are not ordered by their internal ids",
+        )
+        expected_clean_ids = [
+            x.replace(item_type, "")
+            for x, item_type in zip(
+                prepared["item_ids"],
+                (self.tenant_model["item_type_map"][x] for x in prepared["item_ids"]),
+            )
+        ]
+        self.assertEqual(
+            first=prepared["clean_item_ids"].tolist(),
+            second=expected_clean_ids,
+            msg=(
+                "The materialised item ids without the item type prefixes are "
+                f"{prepared['clean_item_ids'].tolist()}"
+            ),
+        )
+        self.assertNotIn(
+            member="item_representations",
+            container=self.tenant_model,
+            msg="The method 'prepare_tenant' has modified the given tenant model",
+        )
+
+    def test_prepare_models(self) -> None:
+        """
+        This method tests if only the successfully trained tenants are prepared and the
+        rest of the entries are kept as they are
+        """
+        prepared = PrepareServing().prepare_models(models=self.models)
+
+        self.assertIn(
+            member="item_representations",
+            container=prepared["0"],
+            msg="The trained tenant '0' has not been prepared for serving",
+        )
+        self.assertEqual(
+            first=prepared["1"],
+            second=self.models["1"],
+            msg="The untrained tenant '1' has been modified while preparing models",
+        )
+        self.assertEqual(
+            first=prepared["algorithm"],
+            second=self.models["algorithm"],
+            msg="The 'algorithm' entry has been modified while preparing models",
+        )
+
+    def test_prepare_models_none(self) -> None:
+        """
+        This method tests if preparing no models returns None
+        """
+        self.assertIsNone(
+            obj=PrepareServing().prepare_models(models=None),
+            msg="Preparing no models was expected to return None",
+        )
+
+    def assert_same_items(self, computed, expected, what) -> None:
+        """
+        To assert that two lists of (`totara_id`, `score`) have the same ids in the same
+        order and about the same scores
+
+        :param computed: The items served from the store
+        :type computed: list
+        :param expected: The items computed without the store
+        :type expected: list
+        :param what: The description of the items for the failure message
+        :type what: str
+        """
+        self.assertEqual(
+            first=[x[0] for x in computed],
+            second=[x[0] for x in expected],
+            msg=f"The stored {what} are\n{computed}\nwhile computed are\n{expected}",
+        )
+        self.assertTrue(
+            expr=np.allclose(
+                [x[1] for x in computed], [x[1] for x in expected], atol=1e-5
+            ),
+            msg=f"The stored {what} are\n{computed}\nwhile computed are\n{expected}",
+        )
+
+    def test_prepare_tenant_stores(self) -> None:
+        """
+        This method tests if the recommendations served from the stores are the ones
+        computed without them
+        """
+        prepared = PrepareServing(store_size=5).prepare_tenant(
+            tenant_model=self.tenant_model
+        )
+        predictor_args = {
+            "model": prepared["model"],
+            "mappings": prepared["mappings"],
+            "items_features": prepared["item_features"],
+            "num_threads": 1,
+        }
+        stored = PredictRecommender(
+            similar_items_store=prepared["similar_items_store"],
+            user_items_stores=prepared["user_items_stores"],
+            **predictor_args,
+        )
+        computed = PredictRecommender(**predictor_args)
+        for n_items in (3, 5):
+            for totara_id in prepared["mappings"][2]:
+                self.assert_same_items(
+                    computed=stored.get_similar_items(
+                        totara_id=totara_id, n_items=n_items
+                    ),
+                    expected=computed.get_similar_items(
+                        totara_id=totara_id, n_items=n_items
+                    ),
+                    what=f"similar items of {totara_id}",
+                )
+            for item_type in prepared["item_type_index"]:
+                for totara_id in prepared["mappings"][0]:
+                    user_args = {
+                        "totara_id": totara_id,
+                        "n_items": n_items,
+                        "items_type": item_type,
+                        "user_features": prepared["user_features"],
+                        "item_type_map": prepared["item_type_map"],
+                        "positive_inter_map": prepared["positive_interactions_map"],
+                    }
+                    self.assert_same_items(
+                        computed=stored.get_user_recommendations(**user_args),
+                        expected=computed.get_user_recommendations(**user_args),
+                        what=f"{item_type} items of user {totara_id}",
+                    )
+
+    def test_prepare_tenant_no_stores(self) -> None:
+        """
+        This method tests if no stores are built when the store size is 0
+        """
+        prepared = PrepareServing().prepare_tenant(tenant_model=self.tenant_model)
+        self.assertNotIn(
+            member="similar_items_store",
+            container=prepared,
+            msg="The similar items store was built while the store size is 0",
+        )
+        self.assertNotIn(
+            member="user_items_stores",
+            container=prepared,
+            msg="The user items stores were built while the store size is 0",
+        )
@@ -0,0 +1,127 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import unittest
+from unittest.mock import patch
+
+from service.recommender.data_subroutines.data_loader import DataLoader
+from service.recommender.predict_subroutines.ivf_index import IVFIndex
+from service.recommender.train_recommender import TrainRecommender
+from service.recommender.train_subroutines.build_model import BuildModel
+from service.recommender.train_telemetry import TrainTelemetry
+from service.tests.tests_recommender.generate_data import GenerateData
+
+
+class TestTrainRecommender(unittest.TestCase):
+    """
+    This test object is to test the units of `TrainRecommender` class in file
+    `service.recommender.train_recommender`
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method to set up the fixtures before exercising it
+        """
+        data_generator = GenerateData(n_tenants=3, n_users=30)
+        self.data = {"data_status": "success", "tenants": data_generator.get_tenants()}
+        for tenant in range(3):
+            self.data[f"user_interactions_{tenant}"] = data_generator.get_interactions()
+            self.data[f"user_data_{tenant}"] = data_generator.get_users()
+            self.data[f"item_data_{tenant}"] = data_generator.get_items()
+        # The second tenant has the most interactions
+        self.data["user_interactions_1"] = self.data["user_interactions_1"].sample(
+            frac=2.0, replace=True
+        )
+        self.longMessage = False
+
+    def test_build_ann_index_mf(self) -> None:
+        """
+        This method tests if the approximate nearest neighbour index is built from the
+        item embeddings of a collaborative filtering model, which has no item features
+        """
+        data_generator = GenerateData(n_users=30)
+        processed_data = DataLoader(query="mf").prepare_sparse_matrices(
+            interactions_df=data_generator.get_interactions(),
+            users_data=data_generator.get_users(),
+            items_data=data_generator.get_items(),
+        )
+        model = BuildModel(
+            processed_data=processed_data,
+            num_threads=2,
+            optimized_hyperparams={"epochs": 2, "no_components": 10},
+        ).build_model()
+        trainer = TrainRecommender(query="mf")
+        self.assertIsNone(
+            obj=processed_data["items_processed_data"],
+            msg="The collaborative filtering data has item features",
+        )
+        self.assertIsNone(
+            obj=trainer.build_ann_index(
+                model=model, item_features=processed_data["items_processed_data"]
+            ),
+            msg="The index was built for a tenant with fewer items than configured",
+        )
+        with patch.object(
+            target=trainer.cfg,
+            attribute="get_property",
+            return_value={"min_items": 1, "n_lists": 2, "n_probe": 1},
+        ):
+            ann_index = trainer.build_ann_index(
+                model=model, item_features=processed_data["items_processed_data"]
+            )
+        self.assertIsInstance(
+            obj=ann_index,
+            cls=IVFIndex,
+            msg="The index was not built for a collaborative filtering model",
+        )
+
+    def test_train_in_workers(self) -> None:
+        """
+        This method tests if the tenants are trained in the worker processes with their
+        share of the threads, and their telemetry is collected from the workers
+        """
+        telemetry = TrainTelemetry()
+        trainer = TrainRecommender(
+            data=self.data, query="mf", num_threads=4, telemetry=telemetry, workers=2
+        )
+        self.assertEqual(
+            first=sorted(self.data["tenants"].tenants, key=trainer.tenant_size)[-1],
+            second=1,
+            msg="The tenant with the most interactions is not the largest one",
+        )
+        models = trainer.train_models()
+        self.assertEqual(
+            first=list(models.keys()),
+            second=[0, 1, 2],
+            msg=f"The models of the tenants {list(models.keys())} were trained",
+        )
+        self.assertTrue(
+            expr=all(x["msg"] == "success" for x in models.values()),
+            msg="Not every tenant model was trained successfully",
+        )
+        self.assertEqual(
+            first=models[1]["model"].get_item_representations()[1].shape[0],
+            second=len(models[1]["mappings"][2]),
+            msg="The model trained in a worker does not have an embedding per item",
+        )
+        fitted = sorted(x["tenant"] for x in telemetry.records if x["stage"] == "fit")
+        self.assertEqual(
+            first=fitted,
+            second=["0", "1", "2"],
+            msg=f"The fit of the tenants {fitted} was recorded by the workers",
+        )
@@ -0,0 +1,156 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from service.recommender.prepare_data import PrepareData
+from service.recommender.train_telemetry import TrainTelemetry
+from service.tests.tests_recommender.generate_data import GenerateData
+
+
+class TestTrainTelemetry(unittest.TestCase):
+    """
+    This test object is to test the units of `TrainTelemetry` class in file
+    `service.recommender.train_telemetry`
+    """
+
+    def setUp(self) -> None:
+        """
+        Hook method to set up the fixtures before exercising it
+        """
+        self.logs_dir = tempfile.mkdtemp()
+        self.telemetry = TrainTelemetry(run="run_1")
+        self.longMessage = False
+
+    def tearDown(self) -> None:
+        """
+        Hook method to deconstruct the fixtures after testing it
+        """
+        shutil.rmtree(self.logs_dir)
+
+    def test_stages(self) -> None:
+        """
+        This method tests if the stages of each tenant are recorded with their details
+        and enclosing stage, and summarised without counting the nested ones twice
+        """
+        tenant = self.telemetry.for_tenant(tenant="1")
+        with tenant.stage(name="load_items", n_items=3):
+            with tenant.stage(name="encode_item_text"):
+                pass
+        for score in [0.5, 0.7]:
+            with tenant.stage(name="evaluation") as details:
+                details["score"] = score
+        records = self.telemetry.records
+        self.assertEqual(
+            first=[(x["tenant"], x["stage"], x.get("parent")) for x in records],
+            second=[
+                ("1", "encode_item_text", "load_items"),
+                ("1", "load_items", None),
+                ("1", "evaluation", None),
+                ("1", "evaluation", None),
+            ],
+            msg=f"The recorded stages are {records}",
+        )
+        self.assertEqual(
+            first=(records[1]["n_items"], records[3]["score"]),
+            second=(3, 0.7),
+            msg="The details of the stages were not recorded",
+        )
+        summary = self.telemetry.summary()["tenants"]["1"]
+        self.assertEqual(
+            first=summary["stages"]["evaluation"]["count"],
+            second=2,
+            msg=f"The evaluations are summarised as {summary}",
+        )
+        self.assertAlmostEqual(
+            first=summary["seconds"],
+            second=round(sum(x["seconds"] for x in records if "parent" not in x), 3),
+            places=3,
+            msg="The nested stages were counted twice in the time of the tenant",
+        )
+
+    def test_write_read_summary(self) -> None:
+        """
+        This method tests if the runs are appended to the log and the summary of the
+        last one is read back
+        """
+        self.assertIsNone(
+            obj=TrainTelemetry.read_summary(logs_dir=self.logs_dir),
+            msg="A summary was read before any run was logged",
+        )
+        for run in ["run_1", "run_2"]:
+            telemetry = TrainTelemetry(run=run)
+            with telemetry.for_tenant(tenant="0").stage(name="fit"):
+                pass
+            telemetry.write(logs_dir=self.logs_dir)
+        with open(os.path.join(self.logs_dir, TrainTelemetry.filename)) as handle:
+            lines = [json.loads(line) for line in handle]
+        self.assertEqual(
+            first=len(lines),
+            second=4,
+            msg=f"The log has {len(lines)} lines after two runs of one stage",
+        )
+        summary = TrainTelemetry.read_summary(logs_dir=self.logs_dir)
+        self.assertEqual(
+            first=(summary["run"], list(summary["tenants"]["0"]["stages"])),
+            second=("run_2", ["fit"]),
+            msg=f"The summary of the last run is {summary}",
+        )
+
+    def test_write_rotates(self) -> None:
+        """
+        This method tests if the log is moved aside once it exceeds its size
+        """
+        self.telemetry.write(logs_dir=self.logs_dir)
+        self.telemetry.write(logs_dir=self.logs_dir, max_bytes=1)
+        self.assertTrue(
+            expr=os.path.exists(
+                os.path.join(self.logs_dir, f"{TrainTelemetry.filename}.1")
+            ),
+            msg="The log was not moved aside once it exceeded its size",
+        )
+
+    def test_data_preparation_stages(self) -> None:
+        """
+        This method tests if the stages of the data preparation of a tenant are timed
+        """
+        data_generator = GenerateData(n_tenants=1)
+        data = {
+            "tenants": data_generator.get_tenants(),
+            "user_interactions_0": data_generator.get_interactions(),
+            "user_data_0": data_generator.get_users(),
+            "item_data_0": data_generator.get_items(),
+        }
+        PrepareData(data=data, query="mf", telemetry=self.telemetry).get_tenant_data(
+            tenant="0"
+        )
+        stages = [x["stage"] for x in self.telemetry.records if x["tenant"] == "0"]
+        self.assertEqual(
+            first=stages,
+            second=[
+                "remove_external_interactions",
+                "load_users",
+                "load_items",
+                "load_interactions",
+            ],
+            msg=f"The stages {stages} were timed for the data preparation",
+        )
@@ -0,0 +1,106 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import unittest
+
+from service.recommender.predict_subroutines.ivf_index import IVFIndex
+from service.recommender.predict_subroutines.similar_items import SimilarItems
+
+
+class TestIVFIndex(unittest.TestCase):
+    """
+    This class is set up to test units of the `IVFIndex` class
+    """
+
+    def setUp(self):
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        rng = np.random.default_rng(seed=0)
+        self.unit_embeddings = SimilarItems.normalise(
+            embeddings=rng.normal(size=(500, 16))
+        )
+        self.index = IVFIndex.build(unit_embeddings=self.unit_embeddings, n_probe=2)
+        self.longMessage = False
+
+    def test_build(self):
+        """
+        This method tests if every item is put in exactly one cluster
+        """
+        self.assertEqual(
+            first=sorted(self.index.list_items.tolist()),
+            second=list(range(self.unit_embeddings.shape[0])),
+            msg="The clusters of the index do not hold each item exactly once",
+        )
+        self.assertEqual(
+            first=self.index.list_offsets[-1],
+            second=self.unit_embeddings.shape[0],
+            msg="The offsets of the clusters do not cover all the items",
+        )
+
+    def test_probe(self):
+        """
+        This method tests if the probed clusters hold at least the requested number of
+        candidates, and the item itself
+        """
+        for n_candidates in (1, 50, 1000):
+            candidates = self.index.probe(
+                query=self.unit_embeddings[7], n_candidates=n_candidates
+            )
+            self.assertGreaterEqual(
+                a=candidates.shape[0],
+                b=min(n_candidates, self.unit_embeddings.shape[0]),
+                msg=f"The index found {candidates.shape[0]} of {n_candidates} items",
+            )
+            self.assertIn(
+                member=7,
+                container=candidates.tolist(),
+                msg="The item itself is not in the closest cluster",
+            )
+
+    def test_similar_items_all_probed(self):
+        """
+        This method tests if the similar items found in the index are the exact ones
+        when all the clusters are probed
+        """
+        self.index.n_probe = self.index.centroids.shape[0]
+        item_ids = np.array([f"item{n}" for n in range(500)], dtype=object)
+        exact = SimilarItems(
+            num_items=10, unit_embeddings=self.unit_embeddings, item_ids=item_ids
+        )
+        approximate = SimilarItems(
+            num_items=10,
+            unit_embeddings=self.unit_embeddings,
+            item_ids=item_ids,
+            ann_index=self.index,
+        )
+        internal_ids = np.arange(0, 500, 25)
+        exact_ids, exact_scores = exact.top_similar_block(internal_ids=internal_ids)
+        ann_ids, ann_scores = approximate.top_similar_block(internal_ids=internal_ids)
+        self.assertTrue(
+            expr=np.array_equal(ann_ids, exact_ids),
+            msg=(
+                f"The similar items found in the index are\n{ann_ids}\nwhile the exact "
+                f"ones are\n{exact_ids}"
+            ),
+        )
+        self.assertTrue(
+            expr=np.allclose(ann_scores, exact_scores, atol=1e-5),
+            msg="The similarity scores found in the index are not the exact ones",
+        )
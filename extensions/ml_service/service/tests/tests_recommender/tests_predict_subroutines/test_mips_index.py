@@ -0,0 +1,139 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import unittest
+
+from service.recommender.predict_subroutines.mips_index import MIPSIndex
+from service.recommender.predict_subroutines.representation_scorer import (
+    RepresentationScorer,
+)
+from service.recommender.predict_subroutines.user_to_items import UserToItems
+
+
+class TestMIPSIndex(unittest.TestCase):
+    """
+    This class is set up to test units of the `MIPSIndex` class
+    """
+
+    def setUp(self):
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        rng = np.random.default_rng(seed=0)
+        self.n_items = 400
+        self.item_representations = (
+            rng.normal(scale=0.5, size=self.n_items).astype(np.float32),
+            rng.normal(size=(self.n_items, 8)).astype(np.float32),
+        )
+        self.user_representations = (
+            rng.normal(size=5).astype(np.float32),
+            rng.normal(size=(5, 8)).astype(np.float32),
+        )
+        self.longMessage = False
+
+    def test_augment_items(self):
+        """
+        This method tests if the augmented items are of unit length and rank the items
+        for a query in the order of their scores without the user bias
+        """
+        augmented = MIPSIndex.augment_items(
+            item_biases=self.item_representations[0],
+            item_embeddings=self.item_representations[1],
+        )
+        self.assertTrue(
+            expr=np.allclose(np.linalg.norm(augmented, axis=1), 1.0, atol=1e-5),
+            msg="The augmented items are not of unit length",
+        )
+        user_embedding = self.user_representations[1][0]
+        scores = (
+            self.item_representations[1].dot(user_embedding)
+            + self.item_representations[0]
+        )
+        inner_products = augmented.dot(
+            MIPSIndex.augment_query(user_embedding=user_embedding)
+        )
+        self.assertTrue(
+            expr=np.array_equal(np.argsort(-scores), np.argsort(-inner_products)),
+            msg="The augmented items do not rank the items in the order of the scores",
+        )
+
+    def test_get_items_all_probed(self):
+        """
+        This method tests if `UserToItems.get_items` recommends the exact items when all
+        the clusters of the index are probed
+        """
+        item_mapping = {f"container_course{n}": n for n in range(self.n_items)}
+        index = MIPSIndex.build(
+            item_representations=self.item_representations,
+            candidates=np.arange(self.n_items),
+            n_lists=10,
+            n_probe=10,
+        )
+        user_to_items_args = {
+            "u_mapping": {str(n): n for n in range(5)},
+            "i_mapping": item_mapping,
+            "item_type_map": {x: "container_course" for x in item_mapping},
+            "positive_inter_map": {"0": ["container_course3", "container_course9"]},
+            "model": RepresentationScorer(
+                user_representations=self.user_representations,
+                item_representations=self.item_representations,
+            ),
+        }
+        exact = UserToItems(**user_to_items_args)
+        approximate = UserToItems(
+            mips_indexes={"container_course": index},
+            user_embeddings=self.user_representations[1],
+            **user_to_items_args,
+        )
+        for internal_uid in range(5):
+            expected = exact.get_items(internal_uid=internal_uid)
+            computed = approximate.get_items(internal_uid=internal_uid)
+            self.assertEqual(
+                first=[x[0] for x in computed],
+                second=[x[0] for x in expected],
+                msg=(
+                    f"The items retrieved from the index are\n{computed}\nwhile the "
+                    f"exact ones are\n{expected}"
+                ),
+            )
+
+    def test_retrieve(self):
+        """
+        This method tests if the retrieved items hold the items of the highest and of
+        the lowest scores
+        """
+        candidates = np.arange(0, self.n_items, 2)
+        index = MIPSIndex.build(
+            item_representations=self.item_representations,
+            candidates=candidates,
+            n_lists=10,
+            n_probe=10,
+        )
+        user_embedding = self.user_representations[1][1]
+        retrieved = index.retrieve(user_embedding=user_embedding, n_candidates=20)
+        scores = (
+            self.item_representations[1][candidates].dot(user_embedding)
+            + self.item_representations[0][candidates]
+        )
+        for expected in (candidates[scores.argmax()], candidates[scores.argmin()]):
+            self.assertIn(
+                member=expected,
+                container=retrieved.tolist(),
+                msg=f"The item {expected} was not retrieved",
+            )
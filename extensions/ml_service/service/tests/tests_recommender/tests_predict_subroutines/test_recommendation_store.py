@@ -0,0 +1,107 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import unittest
+
+from service.recommender.predict_subroutines.recommendation_store import (
+    RecommendationStore,
+)
+
+
+class TestRecommendationStore(unittest.TestCase):
+    """
+    This class is set up to test units of the `RecommendationStore` class
+    """
+
+    def setUp(self):
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        self.item_ids = np.array(
+            ["engage_article1", "container_course2", "totara_playlist3"], dtype=object
+        )
+        self.ranked_ids = np.array([[1, 2], [2, 0], [0, 1]])
+        self.ranked_scores = np.array([[0.9, 0.1], [0.8, 0.2], [0.7, 0.3]])
+        self.store = RecommendationStore.from_ranked(
+            ranked_ids=self.ranked_ids,
+            ranked_scores=self.ranked_scores,
+            item_ids=self.item_ids,
+            depth=2,
+        )
+        self.longMessage = False
+
+    def test_clean_ids(self):
+        """
+        This method tests if the item type prefixes are removed from the item ids
+        """
+        computed = RecommendationStore.clean_ids(item_ids=self.item_ids).tolist()
+        self.assertEqual(
+            first=computed,
+            second=["1", "2", "3"],
+            msg=f"The cleaned item ids are {computed}",
+        )
+
+    def test_lookup(self):
+        """
+        This method tests if the store returns the best ranked items of a row
+        """
+        for n_items in (1, 2):
+            computed = self.store.lookup(row=1, n_items=n_items)
+            expected = [("3", 0.8), ("1", 0.2)][:n_items]
+            self.assertEqual(
+                first=[x[0] for x in computed],
+                second=[x[0] for x in expected],
+                msg=f"The stored items are {computed} while expected {expected}",
+            )
+            self.assertTrue(
+                expr=np.allclose([x[1] for x in computed], [x[1] for x in expected]),
+                msg=f"The stored scores are {computed} while expected {expected}",
+            )
+
+    def test_lookup_beyond_depth(self):
+        """
+        This method tests if the store does not serve more items than it ranked, or
+        rows it does not have
+        """
+        self.assertIsNone(
+            obj=self.store.lookup(row=0, n_items=3),
+            msg="The store served more items than its depth",
+        )
+        self.assertIsNone(
+            obj=self.store.lookup(row=3, n_items=1),
+            msg="The store served a row it does not have",
+        )
+
+    def test_lookup_complete_row(self):
+        """
+        This method tests if the store serves a request for more items than its depth
+        when the rows already hold all the items that are available
+        """
+        store = RecommendationStore.from_ranked(
+            ranked_ids=self.ranked_ids,
+            ranked_scores=self.ranked_scores,
+            item_ids=self.item_ids,
+            depth=5,
+        )
+        computed = store.lookup(row=2, n_items=4)
+        self.assertEqual(
+            first=[x[0] for x in computed],
+            second=["1", "2"],
+            msg=f"The stored items are {computed} while all the ranked were expected",
+        )
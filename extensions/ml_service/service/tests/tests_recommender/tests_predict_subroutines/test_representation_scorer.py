@@ -0,0 +1,119 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import unittest
+
+from service.recommender.prepare_serving import PrepareServing
+from service.recommender.predict_subroutines.representation_scorer import (
+    RepresentationScorer,
+)
+from service.tests.tests_recommender.generate_model import GenerateModel
+
+
+class TestRepresentationScorer(unittest.TestCase):
+    """
+    This class is set up to test units of the `RepresentationScorer` class
+    """
+
+    def setUp(self):
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        self.tenant_model = PrepareServing().prepare_tenant(
+            tenant_model=GenerateModel().get_tenant_model()
+        )
+        self.model = self.tenant_model["model"]
+        self.scorer = RepresentationScorer(
+            user_representations=self.tenant_model["user_representations"],
+            item_representations=self.tenant_model["item_representations"],
+        )
+        self.n_users = len(self.tenant_model["mappings"][0])
+        self.n_items = len(self.tenant_model["mappings"][2])
+        self.longMessage = False
+
+    def test_predict_single_user(self):
+        """
+        This method tests if the scores of a single user against the items are the
+        same as the ones computed by the `LightFM.predict` method
+        """
+        item_ids = np.arange(0, self.n_items, 2, dtype=np.int32)
+        for user_id in range(self.n_users):
+            expected = self.model.predict(
+                user_ids=user_id,
+                item_ids=item_ids,
+                user_features=self.tenant_model["user_features"],
+                item_features=self.tenant_model["item_features"],
+            )
+            computed = self.scorer.predict(user_ids=user_id, item_ids=item_ids)
+            self.assertTrue(
+                expr=np.allclose(computed, expected, rtol=1e-5, atol=1e-5),
+                msg=(
+                    f"The scores of the user {user_id} are\n{computed}\nwhile the "
+                    f"model computes\n{expected}"
+                ),
+            )
+
+    def test_predict_pairs(self):
+        """
+        This method tests if the scores of the user and item pairs are the same as the
+        ones computed by the `LightFM.predict` method
+        """
+        user_ids = np.repeat(np.arange(self.n_users, dtype=np.int32), 2)
+        item_ids = np.arange(user_ids.shape[0], dtype=np.int32) % self.n_items
+        expected = self.model.predict(
+            user_ids=user_ids,
+            item_ids=item_ids,
+            user_features=self.tenant_model["user_features"],
+            item_features=self.tenant_model["item_features"],
+        )
+        computed = self.scorer.predict(user_ids=user_ids, item_ids=item_ids)
+        self.assertTrue(
+            expr=np.allclose(computed, expected, rtol=1e-5, atol=1e-5),
+            msg=(
+                f"The scores of the user and item pairs are\n{computed}\nwhile the "
+                f"model computes\n{expected}"
+            ),
+        )
+        self.assertEqual(
+            first=computed.dtype,
+            second=np.float32,
+            msg=f"The scores are of type {computed.dtype} instead of float32",
+        )
+
+    def test_predict_block(self):
+        """
+        This method tests if the block of scores of many users against many items is
+        the same as scoring each user separately
+        """
+        user_ids = np.array([0, 3, 5], dtype=np.int32)
+        item_ids = np.array([1, 2, 4, 7], dtype=np.int32)
+        computed = self.scorer.predict_block(user_ids=user_ids, item_ids=item_ids)
+        expected = np.vstack(
+            [
+                self.scorer.predict(user_ids=user_id, item_ids=item_ids)
+                for user_id in user_ids
+            ]
+        )
+        self.assertTrue(
+            expr=np.allclose(computed, expected, rtol=1e-5, atol=1e-5),
+            msg=(
+                f"The block of scores is\n{computed}\nwhile scoring the users "
+                f"separately gives\n{expected}"
+            ),
+        )
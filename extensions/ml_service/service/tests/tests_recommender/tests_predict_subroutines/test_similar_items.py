@@ -69,10 +69,107 @@ class TestSimilarItems(unittest.TestCase):
         similar_items = scores[: self.similar_items.num_items]
         computed_items = self.similar_items.get_items(item_meta=test_item)
         self.assertEqual(
-            first=computed_items,
-            second=similar_items,
+            first=[x[0] for x in computed_items],
+            second=[x[0] for x in similar_items],
             msg=(
                 "The returned response from the method 'SimilarItems.get_items' is not "
                 "as expected"
             ),
         )
+        for computed_item, similar_item in zip(computed_items, similar_items):
+            self.assertAlmostEqual(
+                first=computed_item[1],
+                second=similar_item[1],
+                places=5,
+                msg=(
+                    f"The similarity score of the item {computed_item[0]} is "
+                    f"{computed_item[1]} while it was expected to be {similar_item[1]}"
+                ),
+            )
+
+    def test_get_items_all(self):
+        """
+        This method tests if the `get_items` method of the `SimilarItems` class returns
+        all the other items when more items are requested than are available
+        """
+        similar_items = SimilarItems(
+            item_mapping=self.mock_mapping,
+            item_representations=self.mock_item_representations,
+            num_items=self.test_items_n + 5,
+        )
+        computed_items = similar_items.get_items(item_meta=("item1", 0))
+        computed_ids = [x[0] for x in computed_items]
+        computed_scores = [x[1] for x in computed_items]
+        self.assertEqual(
+            first=sorted(computed_ids),
+            second=sorted(set(self.mock_mapping) - {"item1"}),
+            msg=(
+                "The method 'SimilarItems.get_items' did not return every other item "
+                "when more items were requested than are available"
+            ),
+        )
+        self.assertEqual(
+            first=computed_scores,
+            second=sorted(computed_scores, reverse=True),
+            msg="The similar items are not in descending order of their scores",
+        )
+
+    def test_normalise(self):
+        """
+        This method tests if the `normalise` method of the `SimilarItems` class scales
+        the rows to unit length and keeps the rows of zero length as zeros
+        """
+        embeddings = np.array([[3.0, 4.0], [0.0, 0.0]])
+        computed = SimilarItems.normalise(embeddings=embeddings)
+        self.assertTrue(
+            expr=np.allclose(computed, [[0.6, 0.8], [0.0, 0.0]])
+            and computed.dtype == np.float32,
+            msg=(
+                f"The normalised embeddings are {computed} while they were expected "
+                "to be [[0.6, 0.8], [0.0, 0.0]] of type float32"
+            ),
+        )
+
+    def test_get_items_batch(self):
+        """
+        This method tests if the `get_items_batch` method of the `SimilarItems` class
+        returns the same items for each item as the `get_items` method does, including
+        the blocks that are smaller than the configured block size
+        """
+        internal_ids = list(range(self.test_items_n)) * 15
+        computed = self.similar_items.get_items_batch(internal_ids=internal_ids)
+        self.assertEqual(
+            first=len(computed),
+            second=len(internal_ids),
+            msg=(
+                f"The method 'SimilarItems.get_items_batch' returned {len(computed)} "
+                f"lists of items for {len(internal_ids)} items"
+            ),
+        )
+        rev_mapping = {v: k for k, v in self.mock_mapping.items()}
+        for internal_id, computed_items in zip(internal_ids, computed):
+            expected_items = self.similar_items.get_items(
+                item_meta=(rev_mapping[internal_id], internal_id)
+            )
+            self.assertEqual(
+                first=[x[0] for x in computed_items],
+                second=[x[0] for x in expected_items],
+                msg=(
+                    f"The similar items of the item {internal_id} in batch are\n"
+                    f"{computed_items}\nwhile they were expected to be\n"
+                    f"{expected_items}"
+                ),
+            )
+            self.assertTrue(
+                expr=np.allclose(
+                    [x[1] for x in computed_items],
+                    [x[1] for x in expected_items],
+                    rtol=1e-5,
+                    atol=1e-5,
+                ),
+                msg=(
+                    f"The similarity scores of the item {internal_id} in batch are\n"
+                    f"{computed_items}\nwhile they were expected to be\n"
+                    f"{expected_items}"
+                ),
+            )
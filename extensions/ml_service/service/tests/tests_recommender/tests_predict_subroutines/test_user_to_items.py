@@ -22,7 +22,12 @@ from unittest.mock import Mock
 
 from service.recommender.config import Config
 from service.recommender.data_subroutines.data_loader import DataLoader
+from service.recommender.predict_subroutines.representation_scorer import (
+    RepresentationScorer,
+)
 from service.recommender.predict_subroutines.user_to_items import UserToItems
+from service.recommender.prepare_serving import PrepareServing
+from service.tests.tests_recommender.generate_model import GenerateModel
 from service.tests.tests_recommender.generate_data import GenerateData
 
 
@@ -63,8 +68,13 @@ class TestUserToItems(unittest.TestCase):
             dataframe=items_data[list(type_cols)]
         )
         self.model = Mock()
-        self.mock_predictions = np.random.rand(10)
-        self.model.predict.return_value = self.mock_predictions
+        self.mock_predictions = np.random.rand(len(items_map)).astype(np.float32)
+        self.model.predict.side_effect = lambda **kwargs: self.mock_predictions[
+            kwargs["item_ids"]
+        ].copy()
+        self.items_map = items_map
+        self.users_map = users_map
+        self.positive_inter_map = positive_inter_map
 
         self.user_to_items = UserToItems(
             u_mapping=users_map,
@@ -92,32 +102,219 @@ class TestUserToItems(unittest.TestCase):
             ),
         )
 
+    def test_predict_called_with_type_candidates(self):
+        """
+        This method tests if the `get_items` method of the `UserToItems` class scores
+        only the items of the requested type
+        """
+        item_type = "engage_article"
+        __ = self.user_to_items.get_items(internal_uid=5, item_type=item_type)
+        scored_ids = sorted(self.model.predict.call_args[1]["item_ids"].tolist())
+        expected_ids = sorted(
+            internal_id
+            for totara_id, internal_id in self.items_map.items()
+            if self.user_to_items.item_type_map[totara_id] == item_type
+        )
+        self.assertEqual(
+            first=scored_ids,
+            second=expected_ids,
+            msg=(
+                f"The 'LightFM' model object scored the items {scored_ids} while only "
+                f"the items {expected_ids} of type '{item_type}' were expected"
+            ),
+        )
+
+    def test_get_items_unknown_type(self):
+        """
+        This method tests if the `get_items` method of the `UserToItems` class returns
+        no items and does not call the model when no item has the requested type
+        """
+        computed_recommended_items = self.user_to_items.get_items(
+            internal_uid=5, item_type="no_such_type"
+        )
+        self.assertEqual(
+            first=computed_recommended_items,
+            second=[],
+            msg="Items were recommended for a type that has no items",
+        )
+        self.assertFalse(
+            expr=self.model.predict.called,
+            msg="The model was called for a type that has no items",
+        )
+
     def test_get_items_overall(self):
         """
         This method tests if the `get_items` method of the `UserToItems` class returns
-        a list of items as expected, i.e., after excluding the already seen items and
+        a list of items as expected, i.e., after penalising the already seen items and
         ordered as per their ranking/score for the given user
         """
         test_uid = 5
+        item_type = "container_course"
+        reduction_percentage = 0.3
         computed_recommended_items = self.user_to_items.get_items(
-            internal_uid=test_uid, reduction_percentage=0.3
+            internal_uid=test_uid,
+            item_type=item_type,
+            reduction_percentage=reduction_percentage,
         )
-        sorted_ids = self.mock_predictions.argsort()[::-1]
-        sorted_items = [
-            (
-                self.user_to_items.i_mapping_rev[x],
-                self.mock_predictions[x],
-                self.user_to_items.item_type_map[self.user_to_items.i_mapping_rev[x]],
-            )
-            for x in sorted_ids
+
+        users_map_rev = {v: k for k, v in self.users_map.items()}
+        seen_ids = self.positive_inter_map.get(users_map_rev[test_uid], [])
+        type_items = [
+            (totara_id, self.mock_predictions[internal_id])
+            for totara_id, internal_id in self.items_map.items()
+            if self.user_to_items.item_type_map[totara_id] == item_type
         ]
-        best_with_score = self.user_to_items.top_x_by_cat(sorted_items)
+        unseen_scores = [x[1] for x in type_items if x[0] not in seen_ids]
+        unseen_range = max(unseen_scores) - min(unseen_scores) if unseen_scores else 0
+        type_items = [
+            (x[0], x[1] - unseen_range * reduction_percentage)
+            if x[0] in seen_ids
+            else x
+            for x in type_items
+        ]
+        type_items.sort(key=lambda tup: tup[1], reverse=True)
+        best_with_score = [
+            (x[0].replace(item_type, ""), x[1])
+            for x in type_items[: self.user_to_items.num_items]
+        ]
+
         self.assertEqual(
-            first=computed_recommended_items,
-            second=best_with_score,
+            first=[x[0] for x in computed_recommended_items],
+            second=[x[0] for x in best_with_score],
             msg=(
                 "The response returned from the 'UserToItems.get_items' method is\n"
                 f"{computed_recommended_items}\n while the expected response was\n"
                 f"{best_with_score}"
             ),
         )
+        for computed_item, best_item in zip(
+            computed_recommended_items, best_with_score
+        ):
+            self.assertAlmostEqual(
+                first=computed_item[1],
+                second=best_item[1],
+                places=6,
+                msg=(
+                    f"The score of the item {computed_item[0]} is {computed_item[1]} "
+                    f"while it was expected to be {best_item[1]}"
+                ),
+            )
+
+    def test_index_by_type(self):
+        """
+        This method tests if the `index_by_type` method of the `UserToItems` class
+        groups the internal item ids by their types
+        """
+        item_mapping = {"course1": 0, "article1": 1, "course2": 2}
+        item_type_map = {
+            "course1": "container_course",
+            "article1": "engage_article",
+            "course2": "container_course",
+        }
+        computed = UserToItems.index_by_type(
+            item_mapping=item_mapping, item_type_map=item_type_map
+        )
+        self.assertEqual(
+            first={k: v.tolist() for k, v in computed.items()},
+            second={"container_course": [0, 2], "engage_article": [1]},
+            msg=f"The items grouped by type are {computed}",
+        )
+
+    def test_penalise_seen(self):
+        """
+        This method tests if the `penalise_seen` method of the `UserToItems` class
+        gives exactly the same scores as reducing the seen items one by one
+        """
+        predictions = np.random.rand(50).astype(np.float32)
+        seen_internal_id = [3, 7, 8, 21, 49]
+        reduction_percentage = 0.3
+
+        expected = predictions.copy()
+        unseen_internal_id = [
+            x for x in range(expected.shape[0]) if x not in seen_internal_id
+        ]
+        unseen_range = (
+            expected[unseen_internal_id].max() - expected[unseen_internal_id].min()
+        )
+        for j in range(expected.shape[0]):
+            if j in seen_internal_id:
+                expected[j] = expected[j] - unseen_range * reduction_percentage
+
+        computed = self.user_to_items.penalise_seen(
+            predictions=predictions.copy(),
+            seen_internal_id=np.array(seen_internal_id),
+            reduction_percentage=reduction_percentage,
+        )
+        self.assertTrue(
+            expr=np.array_equal(computed, expected),
+            msg=(
+                "The scores after penalising the seen items are\n"
+                f"{computed}\nwhile they were expected to be\n{expected}"
+            ),
+        )
+
+    def test_penalise_seen_nothing_seen(self):
+        """
+        This method tests if the `penalise_seen` method of the `UserToItems` class
+        keeps the scores as they are when the user has not seen any item
+        """
+        predictions = np.random.rand(10).astype(np.float32)
+        computed = self.user_to_items.penalise_seen(
+            predictions=predictions.copy(),
+            seen_internal_id=np.array([], dtype=np.int64),
+        )
+        self.assertTrue(
+            expr=np.array_equal(computed, predictions),
+            msg="The scores were changed while the user has not seen any item",
+        )
+
+    def test_get_items_batch(self):
+        """
+        This method tests if the `get_items_batch` method of the `UserToItems` class
+        recommends the same items to each user as the `get_items` method does
+        """
+        tenant_model = PrepareServing().prepare_tenant(
+            tenant_model=GenerateModel().get_tenant_model()
+        )
+        user_to_items = UserToItems(
+            u_mapping=tenant_model["mappings"][0],
+            i_mapping=tenant_model["mappings"][2],
+            item_type_map=tenant_model["item_type_map"],
+            positive_inter_map=tenant_model["positive_interactions_map"],
+            model=RepresentationScorer(
+                user_representations=tenant_model["user_representations"],
+                item_representations=tenant_model["item_representations"],
+            ),
+            num_items=3,
+        )
+        internal_uids = list(tenant_model["mappings"][0].values())
+        for item_type in ("container_course", "engage_article"):
+            computed = user_to_items.get_items_batch(
+                internal_uids=internal_uids, item_type=item_type
+            )
+            for internal_uid, computed_items in zip(internal_uids, computed):
+                expected_items = user_to_items.get_items(
+                    internal_uid=internal_uid, item_type=item_type
+                )
+                self.assertEqual(
+                    first=[x[0] for x in computed_items],
+                    second=[x[0] for x in expected_items],
+                    msg=(
+                        f"The batch recommendations for the user {internal_uid} are "
+                        f"{computed_items} while the single user ones are "
+                        f"{expected_items}"
+                    ),
+                )
+                self.assertTrue(
+                    expr=np.allclose(
+                        [x[1] for x in computed_items],
+                        [x[1] for x in expected_items],
+                        rtol=1e-5,
+                        atol=1e-5,
+                    ),
+                    msg=(
+                        f"The batch scores for the user {internal_uid} are "
+                        f"{computed_items} while the single user ones are "
+                        f"{expected_items}"
+                    ),
+                )
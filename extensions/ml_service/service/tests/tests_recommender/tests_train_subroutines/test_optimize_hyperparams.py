@@ -26,6 +26,7 @@ from service.recommender.train_subroutines.optimize_hyperparams import (
 from service.recommender.data_subroutines.data_loader import DataLoader
 from service.tests.tests_recommender.generate_data import GenerateData
 from service.recommender.config import Config
+from service.recommender.train_telemetry import TrainTelemetry
 
 
 class TestOptimizeHyperparams(unittest.TestCase):
@@ -203,6 +204,45 @@ class TestOptimizeHyperparams(unittest.TestCase):
             ),
         )
 
+    def test_simulated_annealing_batches(self) -> None:
+        """
+        This method tests if the method `OptimizeHyperparams.simulated_annealing`
+        evaluates each proposed point only once, with a share of the threads for each of
+        the candidates evaluated at the same time
+        """
+        with patch.object(
+            target=self.optimizer,
+            attribute="compute_performance",
+            side_effect=lambda epochs, comps, num_threads: epochs / 100 + comps / 1000,
+        ) as mock_performance:
+            epochs, comps, scores = self.optimizer.simulated_annealing(
+                n_iterations=40, step_size=0.02, temp=1, batch_size=4
+            )
+        points = [
+            (x[1]["epochs"], x[1]["comps"]) for x in mock_performance.call_args_list
+        ]
+        self.assertEqual(
+            first=len(points),
+            second=len(set(points)),
+            msg=f"The same hyper-parameters were evaluated more than once: {points}",
+        )
+        self.assertLess(
+            a=len(points),
+            b=41,
+            msg=f"{len(points)} points were evaluated while some were proposed again",
+        )
+        threads = {x[1]["num_threads"] for x in mock_performance.call_args_list}
+        self.assertEqual(
+            first=threads,
+            second={1},
+            msg=f"The candidates were evaluated with {threads} threads each",
+        )
+        self.assertEqual(
+            first=scores[-1],
+            second=max(scores),
+            msg="The last score is not the best one",
+        )
+
     @patch(
         "service.recommender.train_subroutines.optimize_hyperparams.OptimizeHyperparams"
         ".simulated_annealing"
@@ -212,21 +252,24 @@ class TestOptimizeHyperparams(unittest.TestCase):
         This method tests if the returned `epochs`, `comps` and `scores` from the
         `run_optimization` method of the `OptimizeHyperparams` class are as expected.
         And it tests if the method `simulated_annealing` has been called with the
-        arguments as expected
+        arguments as expected when it is the configured search
         """
         mock_response = ([3, 9, 8], [70, 60, 55], [-1, -0.5, -0.25])
         mock_simulated_annealing.return_value = mock_response
 
+        self.optimizer.search = "annealing"
         computed_response = self.optimizer.run_optimization()
 
         self.assertEqual(
             first=mock_simulated_annealing.call_args,
-            second=unittest.mock.call(n_iterations=30, step_size=0.2, temp=5),
+            second=unittest.mock.call(
+                n_iterations=30, step_size=0.2, temp=5, batch_size=4
+            ),
             msg=(
                 "The method 'OptimizeHyperparams.simulated_annealing' called with\n"
                 f"{mock_simulated_annealing.call_args}\n"
                 "while it was expected to be called with\n"
-                f"call(n_iterations=30, step_size=0.2, temp=5)"
+                "call(n_iterations=30, step_size=0.2, temp=5, batch_size=4)"
             ),
         )
 
@@ -239,3 +282,79 @@ class TestOptimizeHyperparams(unittest.TestCase):
                 f"{mock_response}"
             ),
         )
+
+    @patch(
+        "service.recommender.train_subroutines.optimize_hyperparams.OptimizeHyperparams"
+        ".successive_halving"
+    )
+    def test_run_optimization_halving(self, mock_successive_halving) -> None:
+        """
+        This method tests if the `run_optimization` method of the `OptimizeHyperparams`
+        class runs the successive halving by default, with the configured arguments
+        """
+        mock_response = ([1, 2], [25, 36], [0.5, 0.75])
+        mock_successive_halving.return_value = mock_response
+        computed_response = self.optimizer.run_optimization()
+        self.assertEqual(
+            first=(mock_successive_halving.call_args, computed_response),
+            second=(unittest.mock.call(n_candidates=8, eta=2), mock_response),
+            msg=(
+                "The method 'OptimizeHyperparams.successive_halving' was called with "
+                f"{mock_successive_halving.call_args} and the response is "
+                f"{computed_response}"
+            ),
+        )
+
+    def test_successive_halving(self) -> None:
+        """
+        This method tests if the method `OptimizeHyperparams.successive_halving` scores
+        a single model per number of components at each checkpoint, resuming its
+        training, and only keeps training the best half of them
+        """
+        telemetry = TrainTelemetry()
+        self.optimizer.telemetry = telemetry
+        epochs, comps, scores = self.optimizer.successive_halving(n_candidates=4, eta=2)
+        evaluations = [
+            (x["epochs"], x["n_components"], x["trained_epochs"])
+            for x in telemetry.records
+        ]
+        checkpoints = self.optimizer.checkpoints(1, 20, eta=2)
+        self.assertEqual(
+            first=checkpoints,
+            second=[1, 2, 4, 8, 16, 20],
+            msg=f"The checkpoints are {checkpoints}",
+        )
+        self.assertEqual(
+            first=[sum(1 for x in evaluations if x[0] == e) for e in checkpoints],
+            second=[4, 2, 1, 1, 1, 1],
+            msg=f"The evaluated candidates are {evaluations}",
+        )
+        self.assertTrue(
+            expr=all(
+                trained == ([0] + checkpoints)[checkpoints.index(e)]
+                for e, __, trained in evaluations
+            ),
+            msg=f"The training of the models was not resumed: {evaluations}",
+        )
+        self.assertEqual(
+            first=scores[-1],
+            second=max(x["score"] for x in telemetry.records),
+            msg="The last score is not the best one",
+        )
+        self.assertIn(
+            member=(epochs[-1], comps[-1]),
+            container=[(x[0], x[1]) for x in evaluations],
+            msg="The best hyper-parameters were not evaluated",
+        )
+
+    def test_successive_halving_eta(self) -> None:
+        """
+        This method tests if the method `OptimizeHyperparams.successive_halving` refuses
+        a factor that would neither grow the epochs nor shrink the candidates
+        """
+        for eta in [1, 0, 1.5]:
+            with self.assertRaises(
+                expected_exception=ValueError,
+                msg=f"The successive halving ran with the factor {eta}",
+            ):
+                self.optimizer.successive_halving(n_candidates=4, eta=eta)
@@ -0,0 +1,136 @@
+"""
+This file is part of Totara Enterprise Extensions.
+
+Copyright (C) 2021 onward Totara Learning Solutions LTD
+
+Totara Enterprise Extensions is provided only to Totara
+Learning Solutions LTD's customers and partners, pursuant to
+the terms and conditions of a separate agreement with Totara
+Learning Solutions LTD or its affiliate.
+
+If you do not have an agreement with Totara Learning Solutions
+LTD, you may not access, use, modify, or distribute this software.
+Please contact [licensing@totaralearning.com] for more information.
+
+@author Amjad Ali <amjad.ali@totaralearning.com>
+@package ml_service
+"""
+
+import numpy as np
+import unittest
+
+from service.recommender.data_subroutines.data_loader import DataLoader
+from service.recommender.train_subroutines.build_model import BuildModel
+from service.recommender.train_subroutines.warm_start_model import WarmStartModel
+from service.tests.tests_recommender.generate_data import GenerateData
+
+
+class TestWarmStartModel(unittest.TestCase):
+    """
+    The test object to test units of the class `WarmStartModel`
+    """
+
+    def setUp(self):
+        """
+        Hook method for setting up the fixture before exercising it
+        """
+        data_generator = GenerateData()
+        self.processed_data = DataLoader("mf").prepare_sparse_matrices(
+            interactions_df=data_generator.get_interactions(),
+            users_data=data_generator.get_users(),
+            items_data=data_generator.get_items(),
+        )
+        model = BuildModel(
+            processed_data=self.processed_data,
+            num_threads=2,
+            optimized_hyperparams={"epochs": 2, "no_components": 10},
+        ).build_model()
+        for name in ["user_embeddings", "item_embeddings", "item_biases"]:
+            # The arrays of the saved models are mapped read only
+            getattr(model, name).flags.writeable = False
+        self.previous_model = {
+            "model": model,
+            "mappings": self.processed_data["mappings"],
+        }
+        self.longMessage = False
+
+    def test_align(self):
+        """
+        This method tests if the known rows are moved to their new position and the new
+        rows are initialised as LightFM does
+        """
+        embeddings = np.arange(6, dtype=np.float32).reshape(3, 2)
+        biases = np.array([1, 2, 3], dtype=np.float32)
+        aligned, n_new = WarmStartModel.align(
+            old_labels=["a", "b", "c"],
+            new_labels=["c", "x", "a"],
+            arrays={"item_embeddings": embeddings, "item_biases": biases},
+            no_components=2,
+            random_state=np.random.RandomState(1),
+        )
+        self.assertEqual(
+            first=(n_new, aligned["item_biases"].tolist()),
+            second=(1, [3, 0, 1]),
+            msg=f"The biases were aligned into {aligned['item_biases']}",
+        )
+        self.assertTrue(
+            expr=np.array_equal(aligned["item_embeddings"][[0, 2]], embeddings[[2, 0]]),
+            msg="The known embeddings were not moved to their new position",
+        )
+        self.assertTrue(
+            expr=np.all(np.abs(aligned["item_embeddings"][1]) <= 0.25)
+            and np.any(aligned["item_embeddings"][1] != 0),
+            msg="The embeddings of the new label were not initialised",
+        )
+
+    def test_build_model(self):
+        """
+        This method tests if the previous model is copied, continued from its
+        representations and left untouched
+        """
+        warm_start = WarmStartModel(
+            processed_data=self.processed_data,
+            previous_model=self.previous_model,
+            num_threads=2,
+        )
+        previous_embeddings = self.previous_model["model"].item_embeddings.copy()
+        started = warm_start.warm_start()
+        self.assertTrue(
+            expr=np.array_equal(started.item_embeddings, previous_embeddings),
+            msg="The model did not start from the previous representations",
+        )
+        model = warm_start.build_model()
+        self.assertIsNot(
+            expr1=model,
+            expr2=self.previous_model["model"],
+            msg="The previous model was updated instead of a copy",
+        )
+        self.assertTrue(
+            expr=np.array_equal(
+                self.previous_model["model"].item_embeddings, previous_embeddings
+            )
+            and not np.array_equal(model.item_embeddings, previous_embeddings),
+            msg="The training did not continue on a copy of the representations",
+        )
+
+    def test_too_many_new(self):
+        """
+        This method tests if no model is returned when too many users are new to the
+        previous model
+        """
+        user_mapping = {
+            f"old_{user_id}": internal_id
+            for user_id, internal_id in self.processed_data["mappings"][0].items()
+        }
+        self.previous_model["mappings"] = (user_mapping,) + self.processed_data[
+            "mappings"
+        ][1:]
+        model = WarmStartModel(
+            processed_data=self.processed_data,
+            previous_model=self.previous_model,
+            num_threads=2,
+        ).build_model()
+        self.assertIsNone(
+            obj=model,
+            msg="The model was updated while all its users are new",
+        )
@@ -41,6 +41,8 @@ $python_command -m nltk.downloader stopwords -d $ML_MODELS_DIR
 if [[ "$ML_DEV" == "1" ]]; then
   cd service
   FLASK_ENV="Development" $python_command -m flask run --host=0.0.0.0
+elif [[ "${ML_WORKERS:-1}" -gt 1 ]]; then
+  $python_command -m service.serve
 else
   $python_command -m waitress --listen="${ML_BIND:-*:5000}" --call "service.app:create_app"
 fi